@@ -28,10 +28,6 @@ DEBUG = bool(int(os.environ.get('DEBUG', 0)))
 
 ALLOWED_HOSTS = ["*"]
 # ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '').split(',')
-print(f"Django ALLOWED_HOSTS: {ALLOWED_HOSTS}")
-
-
-
 
 
 # Application definition
@@ -49,18 +45,29 @@ INSTALLED_APPS = [
     'drf_spectacular',
     'user',
     'recipe',
+    'benchmark',
 ]
 
+# The Browser* middleware are Django's session, CSRF, auth, messages and
+# clickjacking middleware, skipped for LEAN_MIDDLEWARE_PATHS.
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.compression.CompressionMiddleware',
+    'core.middleware.BrowserSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.BrowserCsrfViewMiddleware',
+    'core.middleware.BrowserAuthenticationMiddleware',
+    'core.middleware.BrowserMessageMiddleware',
+    'core.middleware.BrowserXFrameOptionsMiddleware',
+    'core.profiling.SamplingProfilerMiddleware',
+    'core.slow_queries.SlowQueryMiddleware',
 ]
 
+# Token-authenticated routes that never use sessions or cookies.
+LEAN_MIDDLEWARE_PATHS = ['/api/', '/healthz', '/readyz']
+# Browser pages under those paths that keep the full middleware.
+LEAN_MIDDLEWARE_EXCLUDE = ['/api/docs/']
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -138,6 +145,14 @@ MEDIA_URL = '/static/media/'
 STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media'
 
+# Media is served by nginx from an internal location once Django has
+# checked access, see core/media.py. Without the proxy Django streams it.
+MEDIA_ACCEL_REDIRECT = bool(int(
+    os.environ.get('MEDIA_ACCEL_REDIRECT', 0 if DEBUG else 1)
+))
+MEDIA_ACCEL_PREFIX = '/protected/media/'
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -152,3 +167,96 @@ REST_FRAMEWORK = {
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
+
+# Prebuilt OpenAPI schema, see core/schema.py
+SCHEMA_FILE = os.environ.get('SCHEMA_FILE', str(BASE_DIR / 'openapi.json'))
+SCHEMA_CACHE_MAX_AGE = int(os.environ.get('SCHEMA_CACHE_MAX_AGE', 86400))
+
+# Sampling profiler, see core/profiling.py. Profiles stay out of /vol/web,
+# which the proxy serves publicly under /static.
+PROFILER = {
+    'ENABLED': bool(int(os.environ.get('PROFILER_ENABLED', 0))),
+    'SAMPLE_RATE': float(os.environ.get('PROFILER_SAMPLE_RATE', 0)),
+    'INTERVAL': float(os.environ.get('PROFILER_INTERVAL', 0.005)),
+    'DIR': os.environ.get('PROFILER_DIR', '/vol/logs/profiles'),
+    'MAX_FILES': int(os.environ.get('PROFILER_MAX_FILES', 200)),
+}
+
+# Slow-query log, see core/slow_queries.py. Like profiles, it is kept on
+# the private /vol/logs volume.
+SLOW_QUERY = {
+    'ENABLED': bool(int(os.environ.get('SLOW_QUERY_ENABLED', 0))),
+    'THRESHOLD_MS': float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200)),
+    'EXPLAIN': bool(int(os.environ.get('SLOW_QUERY_EXPLAIN', 1))),
+    'LOG_FILE': os.environ.get(
+        'SLOW_QUERY_LOG_FILE', '/vol/logs/slow_queries.log'
+    ),
+    'LOG_MAX_BYTES': int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', 10485760)),
+    'LOG_BACKUP_COUNT': int(os.environ.get('SLOW_QUERY_LOG_BACKUP_COUNT', 5)),
+}
+
+# Response compression when not behind the nginx proxy, see
+# core/compression.py. Brotli is used if the brotli package is installed.
+# HTML is left out so CSRF tokens on admin pages are never compressed.
+COMPRESSION = {
+    'ENABLED': bool(int(os.environ.get('COMPRESSION_ENABLED', 0))),
+    'MIN_SIZE': int(os.environ.get('COMPRESSION_MIN_SIZE', 1024)),
+    'GZIP_LEVEL': int(os.environ.get('COMPRESSION_GZIP_LEVEL', 5)),
+    'BROTLI_QUALITY': int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 6)),
+    'CONTENT_TYPES': [
+        'application/json',
+        'application/vnd.oai.openapi',
+        'application/vnd.oai.openapi+json',
+    ],
+}
+
+# Orphaned image collection, see core/images.py
+IMAGE_GC = {
+    'GRACE_SECONDS': int(os.environ.get('IMAGE_GC_GRACE_SECONDS', 3600)),
+    'BATCH_SIZE': int(os.environ.get('IMAGE_GC_BATCH_SIZE', 1000)),
+    'WORKERS': int(os.environ.get('IMAGE_GC_WORKERS', 4)),
+}
+
+# Resized image renditions, see core/renditions.py
+RENDITIONS = {
+    'DIR': 'renditions',
+    'WIDTHS': [160, 320, 640, 1280],
+    'FORMATS': ['jpeg', 'png', 'webp'],
+    'QUALITY': int(os.environ.get('RENDITIONS_QUALITY', 80)),
+    'MAX_BYTES': int(os.environ.get('RENDITIONS_MAX_BYTES', 1024 ** 3)),
+    'EVICT_FRACTION': 0.05,
+    # Rendered by a background job after each upload.
+    'PRERENDER': [(320, 'webp'), (640, 'webp')],
+}
+
+# Background jobs, see core/jobs.py
+TASKS = {
+    'MAX_ATTEMPTS': int(os.environ.get('TASKS_MAX_ATTEMPTS', 5)),
+    'BACKOFF_BASE': float(os.environ.get('TASKS_BACKOFF_BASE', 5)),
+    'BACKOFF_MAX': float(os.environ.get('TASKS_BACKOFF_MAX', 3600)),
+    'POLL_INTERVAL': float(os.environ.get('TASKS_POLL_INTERVAL', 1)),
+    'LOCK_TIMEOUT': int(os.environ.get('TASKS_LOCK_TIMEOUT', 3600)),
+    'REQUEUE_INTERVAL': float(os.environ.get('TASKS_REQUEUE_INTERVAL', 60)),
+    # Lifetime of the signed job links handed out by DELETE /me.
+    'TOKEN_MAX_AGE': int(os.environ.get('TASKS_TOKEN_MAX_AGE', 7 * 86400)),
+}
+
+# Rows deleted per transaction by background deletes, see core/deletion.py
+DELETION_BATCH_SIZE = int(os.environ.get('DELETION_BATCH_SIZE', 500))
+
+# In-memory pantry matching indexes, see core/pantry.py
+PANTRY_INDEX = {
+    'MAX_USERS': int(os.environ.get('PANTRY_INDEX_MAX_USERS', 1000)),
+}
+
+# Precomputed similar recipes, see core/similarity.py
+SIMILAR_RECIPES = {
+    'TOP_K': int(os.environ.get('SIMILAR_RECIPES_TOP_K', 20)),
+    # Seconds to wait for more edits before refreshing a user's recipes.
+    'DELAY': int(os.environ.get('SIMILAR_RECIPES_DELAY', 10)),
+}
+
+# Cached tag and ingredient filter counts, see core/facets.py
+FACETS = {
+    'CACHE_TIMEOUT': int(os.environ.get('FACETS_CACHE_TIMEOUT', 300)),
+}
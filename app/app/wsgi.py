@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# Import the URLconf, and with it every view and serializer, now so a
+# preforking server shares them with its workers instead of each worker
+# importing them on its first request.
+from django.db import connections  # noqa: E402
+from django.urls import get_resolver  # noqa: E402
+
+get_resolver().url_patterns
+connections.close_all()
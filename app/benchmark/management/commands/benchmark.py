@@ -0,0 +1,116 @@
+"""
+Django command to benchmark the REST API.
+"""
+import json
+import platform
+import subprocess
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmark import runner, seed
+from benchmark.scenarios import Account, DEFAULT_MIX, SCENARIOS
+from benchmark.transports import HTTPTransport, InProcessTransport
+
+
+def parse_mix(value):
+    """Parse 'name=weight,...' into a dict of scenario weights."""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in SCENARIOS:
+            raise CommandError(f'Unknown scenario {name}')
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """Seed benchmark data and report per-scenario latencies as JSON."""
+
+    help = 'Seed data, run a mixed API workload and report JSON results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=100,
+                            help='Recipes per user.')
+        parser.add_argument('--tags', type=int, default=20,
+                            help='Tags per user.')
+        parser.add_argument('--ingredients', type=int, default=50,
+                            help='Ingredients per user.')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument(
+            '--mix',
+            type=parse_mix,
+            default=DEFAULT_MIX,
+            help='Scenario weights, e.g. "list=5,detail=5,token_login=1".',
+        )
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server. Runs in-process if unset.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report here.')
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Delete benchmark data before seeding.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['reset']:
+            seed.reset()
+
+        self.stderr.write('Seeding benchmark data...')
+        start = time.perf_counter()
+        seeded = seed.seed(
+            options['users'], options['recipes'], options['tags'],
+            options['ingredients'], seed=options['seed'],
+        )
+        seed_time = time.perf_counter() - start
+        accounts = [Account(user, token) for user, token in seeded]
+
+        if options['url']:
+            def make_transport():
+                return HTTPTransport(options['url'])
+        else:
+            make_transport = InProcessTransport
+
+        self.stderr.write('Running workload...')
+        scenarios, wall_time = runner.run(
+            make_transport, accounts, options['mix'], options['requests'],
+            concurrency=options['concurrency'], seed=options['seed'],
+        )
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'transport': 'http' if options['url'] else 'in-process',
+                'users': options['users'],
+                'recipes_per_user': options['recipes'],
+                'tags_per_user': options['tags'],
+                'ingredients_per_user': options['ingredients'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'mix': options['mix'],
+                'seed_seconds': round(seed_time, 3),
+                'wall_seconds': round(wall_time, 3),
+            },
+            'scenarios': scenarios,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
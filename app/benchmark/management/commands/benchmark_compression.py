@@ -0,0 +1,96 @@
+"""
+Django command to measure compression of representative API payloads.
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.urls import reverse
+
+from benchmark import seed
+from benchmark.transports import InProcessTransport
+from core import compression
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """Report size, CPU time and transfer time per compression level."""
+
+    help = 'Measure gzip/brotli ratios and timings on recipe payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='10,100,1000',
+            help='Comma separated recipe counts for the list payload.',
+        )
+        parser.add_argument(
+            '--bandwidth-kbps', type=float, default=1600,
+            help='Link speed used to estimate transfer time (1600 = 3G).',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def _payloads(self, sizes):
+        payloads = {}
+        try:
+            with transaction.atomic():
+                for size in sizes:
+                    seed.reset()
+                    (user, token), = seed.seed(
+                        users=1, recipes=size, tags=20, ingredients=50,
+                        links=5,
+                    )
+                    status_code, body = InProcessTransport().request(
+                        'GET', reverse('recipe:recipe-list'), token
+                    )
+                    payloads[f'recipe_list_{size}'] = body
+                raise Rollback
+        except Rollback:
+            pass
+        return payloads
+
+    def _time(self, content, encoding, config, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            compressed = compression.compress(content, encoding, config)
+        return compressed, (time.perf_counter() - start) / repeat
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        bytes_per_ms = options['bandwidth_kbps'] * 1000 / 8 / 1000
+        settings = [('identity', None)]
+        settings += [('gzip', level) for level in (1, 5, 6, 9)]
+        if compression.brotli is not None:
+            settings += [('br', quality) for quality in (1, 4, 6, 11)]
+
+        report = {}
+        for name, content in self._payloads(sizes).items():
+            rows = []
+            for encoding, level in settings:
+                if encoding == 'identity':
+                    body, cpu = content, 0
+                else:
+                    config = {'GZIP_LEVEL': level, 'BROTLI_QUALITY': level}
+                    body, cpu = self._time(
+                        content, encoding, config, options['repeat']
+                    )
+                transfer_ms = len(body) / bytes_per_ms
+                rows.append({
+                    'encoding': encoding,
+                    'level': level,
+                    'bytes': len(body),
+                    'ratio': round(len(content) / len(body), 2),
+                    'compress_ms': round(cpu * 1000, 3),
+                    'transfer_ms': round(transfer_ms, 1),
+                    'total_ms': round(cpu * 1000 + transfer_ms, 1),
+                })
+            report[name] = rows
+
+        self.stdout.write(json.dumps({
+            'bandwidth_kbps': options['bandwidth_kbps'],
+            'payloads': report,
+        }, indent=2))
@@ -0,0 +1,103 @@
+"""
+Django command to measure per-request middleware overhead.
+"""
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from benchmark.runner import percentile
+from core.middleware import LeanPathMixin
+
+
+def stock_middleware(middleware):
+    """Swap the core.middleware Browser* classes for their Django parents."""
+    stock = []
+    for path in middleware:
+        cls = import_string(path)
+        if issubclass(cls, LeanPathMixin):
+            base = cls.__mro__[2]
+            path = f'{base.__module__}.{base.__name__}'
+        stock.append(path)
+    return stock
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """Compare request latency for the stock and lean middleware."""
+
+    help = 'Time an API request through the stock and lean middleware.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--path', default=None,
+                            help='Defaults to the tag list endpoint.')
+
+    def _client(self, middleware):
+        with override_settings(MIDDLEWARE=middleware):
+            client = Client()
+            # Build the handler now, while the override is active.
+            client.handler.load_middleware()
+        client.cookies['sessionid'] = 'benchmark'
+        return client
+
+    def _summary(self, latencies):
+        latencies.sort()
+        return {
+            'mean_us': round(sum(latencies) / len(latencies) * 1e6, 1),
+            'p50_us': round(percentile(latencies, 50) * 1e6, 1),
+            'p99_us': round(percentile(latencies, 99) * 1e6, 1),
+        }
+
+    def _time(self, clients, path, token, requests):
+        """Alternate between clients so drift affects both equally."""
+        latencies = {name: [] for name in clients}
+        for _ in range(requests):
+            for name, client in clients.items():
+                start = time.perf_counter()
+                client.get(path, HTTP_AUTHORIZATION=f'Token {token}')
+                latencies[name].append(time.perf_counter() - start)
+        return {
+            name: self._summary(values) for name, values in latencies.items()
+        }
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        path = options['path'] or reverse('recipe:tag-list')
+        report = {}
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create_user(
+                    'middleware@bench.example.com', 'benchpass123'
+                )
+                token = Token.objects.create(user=user).key
+                clients = {
+                    'stock': self._client(
+                        stock_middleware(settings.MIDDLEWARE)
+                    ),
+                    'lean': self._client(settings.MIDDLEWARE),
+                }
+                self._time(clients, path, token, 50)
+                report.update(self._time(
+                    clients, path, token, options['requests']
+                ))
+                raise Rollback
+        except Rollback:
+            pass
+
+        report['saved_mean_us'] = round(
+            report['stock']['mean_us'] - report['lean']['mean_us'], 1
+        )
+        report['path'] = path
+        report['requests'] = options['requests']
+        self.stdout.write(json.dumps(report, indent=2))
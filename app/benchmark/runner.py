@@ -0,0 +1,100 @@
+"""
+Drive a weighted mix of scenarios and summarise their latencies.
+"""
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.db import connections
+
+from benchmark.scenarios import SCENARIOS
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarise(latencies, errors, wall_time):
+    """Build the per-scenario report from raw latencies in seconds."""
+    report = {}
+    for name in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies.get(name, []))
+        count = len(values)
+        report[name] = {
+            'requests': count,
+            'errors': errors.get(name, 0),
+            'throughput_rps': round(count / wall_time, 2) if wall_time else 0,
+            'mean_ms': round(sum(values) / count * 1000, 3) if count else None,
+        }
+        for pct in (50, 95, 99):
+            value = percentile(values, pct)
+            report[name][f'p{pct}_ms'] = (
+                round(value * 1000, 3) if value is not None else None
+            )
+    return report
+
+
+def run(make_transport, accounts, mix, requests, concurrency=1, seed=0):
+    """
+    Send requests split over concurrency threads, choosing scenarios by
+    the weights in mix. Return (report, wall time in seconds).
+    """
+    names = [name for name in mix if mix[name] > 0]
+    weights = [mix[name] for name in names]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def worker(index, count, threaded=True):
+        rng = random.Random(seed + index)
+        transport = make_transport()
+        local_latencies = defaultdict(list)
+        local_errors = defaultdict(int)
+        try:
+            for _ in range(count):
+                name = rng.choices(names, weights)[0]
+                account = rng.choice(accounts)
+                start = time.perf_counter()
+                try:
+                    status_code, _ = SCENARIOS[name](transport, account, rng)
+                except Exception:
+                    status_code = None
+                elapsed = time.perf_counter() - start
+                if status_code is None or status_code >= 400:
+                    local_errors[name] += 1
+                else:
+                    local_latencies[name].append(elapsed)
+        finally:
+            if threaded:
+                connections.close_all()
+        with lock:
+            for name, values in local_latencies.items():
+                latencies[name].extend(values)
+            for name, value in local_errors.items():
+                errors[name] += value
+
+    per_thread = [requests // concurrency] * concurrency
+    for i in range(requests % concurrency):
+        per_thread[i] += 1
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        worker(0, per_thread[0], threaded=False)
+    else:
+        threads = [
+            threading.Thread(target=worker, args=(i, count))
+            for i, count in enumerate(per_thread)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall_time = time.perf_counter() - start
+
+    return summarise(latencies, errors, wall_time), wall_time
@@ -0,0 +1,103 @@
+"""
+Benchmark scenarios. Each one sends a single request for a seeded user.
+"""
+import io
+
+from django.urls import reverse
+from PIL import Image
+
+from benchmark.seed import PASSWORD
+from core.models import (
+    Recipe,
+    Tag,
+)
+
+
+def _jpeg():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), color=(200, 120, 40)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class Account:
+    """A seeded user along with the ids scenarios pick from."""
+
+    def __init__(self, user, token):
+        self.email = user.email
+        self.token = token
+        self.recipe_ids = list(
+            Recipe.objects.filter(user=user).values_list('id', flat=True)
+        )
+        self.tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)
+        )
+
+
+def list_recipes(transport, account, rng):
+    return transport.request(
+        'GET', reverse('recipe:recipe-list'), account.token
+    )
+
+
+def list_filtered(transport, account, rng):
+    tag_ids = rng.sample(account.tag_ids, min(2, len(account.tag_ids)))
+    path = reverse('recipe:recipe-list') + '?tags=' + ','.join(
+        str(tag_id) for tag_id in tag_ids
+    )
+    return transport.request('GET', path, account.token)
+
+
+def detail(transport, account, rng):
+    recipe_id = rng.choice(account.recipe_ids)
+    return transport.request(
+        'GET', reverse('recipe:recipe-detail', args=[recipe_id]),
+        account.token,
+    )
+
+
+def create_nested(transport, account, rng):
+    payload = {
+        'title': 'Benchmark recipe',
+        'time_minutes': rng.randint(5, 120),
+        'price': '9.99',
+        'tags': [{'name': f'Tag {rng.randint(0, 20)}'}, {'name': 'Bench'}],
+        'ingredients': [{'name': f'Ingredient {rng.randint(0, 20)}'}],
+    }
+    return transport.request(
+        'POST', reverse('recipe:recipe-list'), account.token, data=payload
+    )
+
+
+def upload_image(transport, account, rng, _image=_jpeg()):
+    recipe_id = rng.choice(account.recipe_ids)
+    return transport.request(
+        'POST', reverse('recipe:recipe-upload-image', args=[recipe_id]),
+        account.token,
+        files={'image': ('bench.jpg', _image, 'image/jpeg')},
+    )
+
+
+def token_login(transport, account, rng):
+    return transport.request(
+        'POST', reverse('user:token'),
+        data={'email': account.email, 'password': PASSWORD},
+    )
+
+
+SCENARIOS = {
+    'list': list_recipes,
+    'list_filtered': list_filtered,
+    'detail': detail,
+    'create_nested': create_nested,
+    'upload_image': upload_image,
+    'token_login': token_login,
+}
+
+DEFAULT_MIX = {
+    'list': 20,
+    'list_filtered': 30,
+    'detail': 30,
+    'create_nested': 10,
+    'upload_image': 5,
+    'token_login': 5,
+}
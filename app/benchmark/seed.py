@@ -0,0 +1,102 @@
+"""
+Seed and clean up benchmark data.
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from rest_framework.authtoken.models import Token
+
+from core import counters
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+
+EMAIL_DOMAIN = 'bench.example.com'
+PASSWORD = 'benchpass123'
+
+
+def bench_users():
+    return get_user_model().objects.filter(
+        email__endswith=f'@{EMAIL_DOMAIN}'
+    )
+
+
+def reset():
+    """Delete every benchmark user and their data."""
+    bench_users().delete()
+
+
+@transaction.atomic
+def seed(users, recipes, tags, ingredients, links=3, seed=0):
+    """
+    Create benchmark users, each with recipes linked to a few of their
+    tags and ingredients. Return a list of (user, token key) pairs.
+    """
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+    User = get_user_model()
+    User.objects.bulk_create([
+        User(email=f'user{i}@{EMAIL_DOMAIN}', password=password)
+        for i in range(users)
+    ], ignore_conflicts=True)
+
+    seeded = []
+    for user in bench_users().order_by('id')[:users]:
+        missing = recipes - Recipe.objects.filter(user=user).count()
+        if missing > 0:
+            _seed_user(user, missing, tags, ingredients, links, rng)
+        token, _ = Token.objects.get_or_create(user=user)
+        seeded.append((user, token.key))
+    return seeded
+
+
+def _seed_user(user, count, tags, ingredients, links, rng):
+    Tag.objects.bulk_create([
+        Tag(user=user, name=f'Tag {i}') for i in range(tags)
+    ])
+    Ingredient.objects.bulk_create([
+        Ingredient(user=user, name=f'Ingredient {i}')
+        for i in range(ingredients)
+    ])
+    Recipe.objects.bulk_create([
+        Recipe(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=rng.randint(5, 120),
+            price=Decimal(rng.randint(100, 5000)) / 100,
+        )
+        for i in range(count)
+    ])
+    tag_ids = list(Tag.objects.filter(user=user).values_list('id', flat=True))
+    ingredient_ids = list(
+        Ingredient.objects.filter(user=user).values_list('id', flat=True)
+    )
+    recipe_ids = Recipe.objects.filter(
+        user=user).order_by('-id').values_list('id', flat=True)[:count]
+
+    tag_links, ingredient_links = [], []
+    for recipe_id in recipe_ids:
+        for tag_id in rng.sample(tag_ids, min(links, len(tag_ids))):
+            tag_links.append(
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            )
+        for ingredient_id in rng.sample(
+            ingredient_ids, min(links, len(ingredient_ids))
+        ):
+            ingredient_links.append(Recipe.ingredients.through(
+                recipe_id=recipe_id, ingredient_id=ingredient_id
+            ))
+    Recipe.tags.through.objects.bulk_create(tag_links, batch_size=5000)
+    Recipe.ingredients.through.objects.bulk_create(
+        ingredient_links, batch_size=5000
+    )
+    # The links bypass the ORM, so count them afterwards.
+    for model in (Tag, Ingredient):
+        counters.reconcile(model, queryset=model.objects.filter(user=user))
@@ -0,0 +1,68 @@
+"""
+Tests for the benchmark suite.
+"""
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from benchmark import runner, seed
+from benchmark.management.commands.benchmark import parse_mix
+from core.models import Ingredient, Recipe, Tag
+
+
+class BenchmarkTests(TestCase):
+    """Test seeding and running the benchmark."""
+
+    def test_seed_is_idempotent(self):
+        """Test seeding tops up to the requested scale only once."""
+        seed.seed(users=2, recipes=5, tags=3, ingredients=3)
+        seed.seed(users=2, recipes=5, tags=3, ingredients=3)
+
+        self.assertEqual(seed.bench_users().count(), 2)
+        self.assertEqual(Recipe.objects.count(), 10)
+
+    def test_seed_counts_links(self):
+        """Test seeded tags and ingredients count their recipes."""
+        seed.seed(users=1, recipes=5, tags=3, ingredients=3, links=2)
+
+        for model, field in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+            for obj in model.objects.all():
+                self.assertEqual(
+                    obj.recipe_count,
+                    Recipe.objects.filter(**{field: obj}).count(),
+                )
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = list(range(1, 101))
+
+        self.assertEqual(runner.percentile(values, 50), 50)
+        self.assertEqual(runner.percentile(values, 99), 99)
+        self.assertEqual(runner.percentile([7], 95), 7)
+        self.assertIsNone(runner.percentile([], 50))
+
+    def test_parse_mix_rejects_unknown_scenario(self):
+        """Test an unknown scenario name is an error."""
+        with self.assertRaises(CommandError):
+            parse_mix('list=1,nope=2')
+
+    def test_command_reports_json(self):
+        """Test the command reports latencies for every scenario run."""
+        out = StringIO()
+        call_command(
+            'benchmark', users=2, recipes=3, tags=3, ingredients=3,
+            requests=40, stdout=out, stderr=StringIO(),
+            mix=parse_mix('list=1,list_filtered=1,detail=1,'
+                          'create_nested=1,upload_image=1,token_login=1'),
+        )
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(report['meta']['transport'], 'in-process')
+        for name, result in report['scenarios'].items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertIn('p99_ms', result)
+        total = sum(r['requests'] for r in report['scenarios'].values())
+        self.assertEqual(total, 40)
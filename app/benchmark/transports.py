@@ -0,0 +1,88 @@
+"""
+Ways of sending benchmark requests to the API.
+"""
+import json
+import uuid
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+
+
+class InProcessTransport:
+    """Call the API through Django's test client, without a server."""
+
+    def __init__(self):
+        self.client = APIClient()
+
+    def request(self, method, path, token=None, data=None, files=None):
+        headers = {}
+        if token:
+            headers['HTTP_AUTHORIZATION'] = f'Token {token}'
+        if files:
+            data = dict(data or {})
+            for name, (filename, content, content_type) in files.items():
+                data[name] = SimpleUploadedFile(
+                    filename, content, content_type=content_type
+                )
+            res = getattr(self.client, method.lower())(
+                path, data, format='multipart', **headers
+            )
+        elif data is not None:
+            res = getattr(self.client, method.lower())(
+                path, data, format='json', **headers
+            )
+        else:
+            res = self.client.generic(method, path, **headers)
+        return res.status_code, res.content
+
+
+class HTTPTransport:
+    """Call the API over HTTP on a running server."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _encode_multipart(self, data, files):
+        boundary = uuid.uuid4().hex
+        parts = []
+        for name, value in (data or {}).items():
+            parts.append(
+                f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f'{value}\r\n'.encode()
+            )
+        for name, (filename, content, content_type) in files.items():
+            parts.append(
+                f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"; '
+                f'filename="{filename}"\r\n'
+                f'Content-Type: {content_type}\r\n\r\n'.encode()
+                + content + b'\r\n'
+            )
+        parts.append(f'--{boundary}--\r\n'.encode())
+        return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+    def request(self, method, path, token=None, data=None, files=None):
+        headers = {'Accept': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        body = None
+        if files:
+            body, headers['Content-Type'] = self._encode_multipart(
+                data, files
+            )
+        elif data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+
+        req = Request(
+            self.base_url + path, data=body, headers=headers, method=method
+        )
+        try:
+            with urlopen(req, timeout=self.timeout) as res:
+                return res.status, res.read()
+        except HTTPError as e:
+            return e.code, e.read()
@@ -5,7 +5,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 
-from core import models
+from core import jobs, models
 
 
 class UserAdmin(BaseUserAdmin):
@@ -48,3 +48,33 @@ admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Recipe)
 admin.site.register(models.Tag)
 admin.site.register(models.Ingredient)
+
+
+@admin.register(models.ImageBlob)
+class ImageBlobAdmin(admin.ModelAdmin):
+    """Read-only view of shared image files."""
+    ordering = ['-created_at']
+    list_display = ['name', 'ref_count', 'created_at']
+    readonly_fields = ['name', 'ref_count', 'created_at']
+
+
+@admin.register(models.Job)
+class JobAdmin(admin.ModelAdmin):
+    """Background jobs with a retry action."""
+    ordering = ['-id']
+    list_display = [
+        'id', 'task', 'status', 'attempts', 'run_at', 'locked_by',
+        'finished_at',
+    ]
+    list_filter = ['status', 'task']
+    search_fields = ['task', 'locked_by']
+    readonly_fields = [
+        'task', 'payload', 'attempts', 'locked_by', 'locked_at',
+        'last_error', 'result', 'created_at', 'finished_at',
+    ]
+    actions = ['retry_jobs']
+
+    @admin.action(description='Retry selected jobs now')
+    def retry_jobs(self, request, queryset):
+        count = jobs.retry(queryset)
+        self.message_user(request, f'Queued {count} jobs.')
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core import signals
+        signals.connect()
+        # Subscribe to core.changes in every process that writes,
+        # workers included.
+        from core import pantry, similarity  # noqa: F401
@@ -0,0 +1,133 @@
+"""
+Per-user data versions and a change feed for in-process indexes.
+
+User.data_version is bumped once per transaction that changes a user's
+recipes, tags or ingredients, inside that transaction. Anything derived
+from a user's data (see core/pantry.py) can be labelled with the version
+it was built from and trusted while request.user.data_version matches.
+
+The bump costs one UPDATE by primary key per user and transaction, not
+per write. It is what lets other processes, and caches shared between
+them (core/facets.py), notice a change without a message bus, and the
+row lock it takes keeps a user's version in step with their data when
+two of their writes race. Those writes queue on the lock until commit;
+one person's edits rarely overlap, and knowing whether any process holds
+derived data for the user would need shared state of its own, so every
+change bumps.
+
+Processes also want to keep their own indexes current without a rebuild.
+Changes are recorded as small operations and handed to subscribers after
+commit, together with the number of version bumps they account for, so an
+index can follow its own process's writes and still notice anyone else's.
+"""
+import threading
+import weakref
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from core.models import User
+
+
+LINK = 'link'
+UNLINK = 'unlink'
+CLEAR_RECIPE = 'clear_recipe'
+DROP_RECIPE = 'drop_recipe'
+DROP_INGREDIENT = 'drop_ingredient'
+TAG_LINK = 'tag_link'
+TAG_UNLINK = 'tag_unlink'
+CLEAR_RECIPE_TAGS = 'clear_recipe_tags'
+DROP_TAG = 'drop_tag'
+
+subscribers = []
+
+_lock = threading.Lock()
+
+
+_local = threading.local()
+
+
+class _Marker:
+    """An on_commit no-op that Django discards with its savepoint."""
+
+    def __call__(self):
+        pass
+
+
+class _Pending:
+    """
+    Changes of one transaction, flushed to subscribers on commit.
+
+    Each record() call queues a _Marker with on_commit and keeps only a
+    weak reference to it. Django holds the marker until the transaction
+    commits and drops it when its savepoint or the transaction is rolled
+    back, so a dead reference means the change it stands for was undone.
+    The _Pending itself is queued the same way, ahead of its markers.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.done = False
+
+    def add(self, user_id, ops, bumped):
+        marker = _Marker()
+        transaction.on_commit(marker)
+        self.entries.append((user_id, list(ops), bumped, weakref.ref(marker)))
+
+    def live(self):
+        return [
+            (user_id, ops, bumped)
+            for user_id, ops, bumped, marker in self.entries
+            if marker() is not None
+        ]
+
+    def bumped(self, user_id):
+        return any(
+            bumped and other == user_id for other, ops, bumped in self.live()
+        )
+
+    def __call__(self):
+        # Markers queued after this one have not run yet, so live() still
+        # tells the committed changes from the rolled back ones.
+        self.done = True
+        changed = {}
+        for user_id, ops, bumped in self.live():
+            changed.setdefault(user_id, []).extend(ops)
+        with _lock:
+            for subscriber in subscribers:
+                for user_id, ops in changed.items():
+                    subscriber(user_id, ops)
+
+
+def _pending():
+    """Return the collector for the current transaction, if still queued."""
+    ref = getattr(_local, 'pending', None)
+    pending = ref() if ref is not None else None
+    if pending is None or pending.done:
+        return None
+    return pending
+
+
+def record(user_id, ops=()):
+    """Note that user_id's data changed, optionally with index ops."""
+    if not connection.in_atomic_block:
+        with transaction.atomic():
+            return record(user_id, ops)
+
+    pending = _pending()
+    if pending is None:
+        pending = _Pending()
+        transaction.on_commit(pending)
+        _local.pending = weakref.ref(pending)
+    bump = not pending.bumped(user_id)
+    if bump:
+        User.objects.filter(id=user_id).update(
+            data_version=F('data_version') + 1
+        )
+    pending.add(user_id, ops, bump)
+
+
+def subscribe(func):
+    """Call func(user_id, ops) after each commit changing user_id's data."""
+    subscribers.append(func)
+    return func
@@ -0,0 +1,92 @@
+"""
+Optional response compression for deployments without the nginx proxy.
+"""
+import gzip
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+_qvalue = re.compile(r'^q=([0-9.]+)$', re.I)
+
+
+def compress(content, encoding, config):
+    """Compress content with the given encoding at the configured level."""
+    if encoding == 'br':
+        return brotli.compress(content, quality=config['BROTLI_QUALITY'])
+    return gzip.compress(content, compresslevel=config['GZIP_LEVEL'], mtime=0)
+
+
+def parse_accept_encoding(accept_encoding):
+    """Return {coding: q} for an Accept-Encoding header."""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            match = _qvalue.match(param.replace(' ', ''))
+            if match:
+                try:
+                    q = float(match.group(1))
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    """Return 'br', 'gzip' or None; a q of 0 refuses that coding."""
+    accepted = parse_accept_encoding(accept_encoding)
+    default = accepted.get('*', 0.0)
+    if brotli is not None and accepted.get('br', default) > 0:
+        return 'br'
+    if accepted.get('gzip', default) > 0:
+        return 'gzip'
+    return None
+
+
+class CompressionMiddleware:
+    """Compress large JSON responses with brotli or gzip."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        config = settings.COMPRESSION
+        if not config['ENABLED']:
+            return response
+        if (response.streaming
+                or response.has_header('Content-Encoding')
+                or len(response.content) < config['MIN_SIZE']):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if content_type not in config['CONTENT_TYPES']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding, config)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,92 @@
+"""
+Denormalized Tag.recipe_count and Ingredient.recipe_count.
+
+Counts are adjusted with relative updates in the transaction that writes
+the through rows: m2m signals cover the ORM, Recipe deletes go through
+unlink_recipes(), and bulk writes (cloning, the batched link actions)
+call adjust() themselves. Writers racing on the same link can still
+leave a count off by one, and raw writes such as seed_data skip it
+entirely; reconcile() (manage.py reconcile_counts) recounts from the
+through tables.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest
+
+from core.models import Ingredient, Recipe, Tag
+
+
+def links(model):
+    """Return the through model and its column for Tag or Ingredient."""
+    field = {Tag: 'tags', Ingredient: 'ingredients'}[model]
+    return getattr(Recipe, field).through, f'{model._meta.model_name}_id'
+
+
+def adjust(model, deltas):
+    """Add deltas[pk] to the recipe_count of each row, in one query."""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    # Clamped, so a count that drifted low fails no CHECK constraint.
+    model.objects.filter(pk__in=deltas).update(
+        recipe_count=Greatest(F('recipe_count') + Case(
+            *[When(pk=pk, then=Value(delta))
+              for pk, delta in deltas.items()],
+            output_field=IntegerField(),
+        ), 0),
+    )
+
+
+def _count(model, **filters):
+    through, column = links(model)
+    return Subquery(
+        through.objects.filter(**{column: OuterRef('pk')}, **filters)
+        .order_by().values(column).annotate(n=Count('*')).values('n'),
+        output_field=IntegerField(),
+    )
+
+
+def unlink_recipes(recipe_ids, models=(Tag, Ingredient)):
+    """Release the counts held by recipes about to lose all links."""
+    for model in models:
+        through, column = links(model)
+        model.objects.filter(pk__in=through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values(column)).update(
+            recipe_count=Greatest(F('recipe_count') - _count(
+                model, recipe_id__in=recipe_ids,
+            ), 0),
+        )
+
+
+def reconcile(model, batch_size=None, queryset=None):
+    """
+    Recount recipe_count from the through table, batch_size rows per
+    transaction. Returns the number of rows that had drifted.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    if queryset is None:
+        queryset = model.objects.all()
+    actual = Coalesce(_count(model), 0)
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    fixed = 0
+    last = 0
+    while True:
+        batch = list(pks.filter(pk__gt=last)[:batch_size])
+        if not batch:
+            return fixed
+        with transaction.atomic():
+            fixed += model.objects.filter(pk__in=batch).annotate(
+                actual=actual,
+            ).exclude(recipe_count=F('actual')).update(recipe_count=actual)
+        last = batch[-1]
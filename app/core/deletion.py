@@ -0,0 +1,77 @@
+"""
+Batched deletion for large accounts.
+
+Deleting a user in one go lets Django's collector load every related
+recipe, tag and ingredient and delete them in a single transaction,
+which for large accounts runs for minutes and holds locks throughout.
+These helpers delete a bounded batch of primary keys per transaction
+instead, so memory stays flat and other requests only ever wait for one
+batch. Deleting through the ORM keeps signals such as the image
+reference counts working.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from core.models import Ingredient, Recipe, Tag
+
+
+def delete_in_batches(queryset, batch_size=None, on_batch=None):
+    """
+    Delete every row of queryset, batch_size rows per transaction.
+
+    on_batch(deleted) is called after each committed batch. Returns the
+    number of rows deleted.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    model = queryset.model
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    deleted = 0
+    while True:
+        batch = list(pks[:batch_size])
+        if not batch:
+            return deleted
+        with transaction.atomic():
+            model.objects.filter(pk__in=batch).delete()
+        deleted += len(batch)
+        if on_batch is not None:
+            on_batch(deleted)
+
+
+def delete_recipes(queryset, batch_size=None, on_progress=None):
+    """Delete recipes in batches, reporting {'deleted', 'total'}."""
+    total = queryset.count()
+
+    def on_batch(deleted):
+        if on_progress is not None:
+            on_progress({'deleted': deleted, 'total': total})
+
+    return delete_in_batches(queryset, batch_size, on_batch)
+
+
+def delete_user(user, batch_size=None, on_progress=None):
+    """
+    Delete user and everything they own in short transactions.
+
+    Recipes go first, then tags and ingredients, so each batch only has
+    to clear rows that are already unreferenced. on_progress receives
+    {model: {'deleted', 'total'}} after every batch.
+    """
+    querysets = {
+        'recipes': Recipe.objects.filter(user=user),
+        'tags': Tag.objects.filter(user=user),
+        'ingredients': Ingredient.objects.filter(user=user),
+    }
+    progress = {
+        name: {'deleted': 0, 'total': queryset.count()}
+        for name, queryset in querysets.items()
+    }
+    for name, queryset in querysets.items():
+        def on_batch(deleted, name=name):
+            progress[name]['deleted'] = deleted
+            if on_progress is not None:
+                on_progress(progress)
+
+        delete_in_batches(queryset, batch_size, on_batch)
+
+    user.delete()
+    return progress
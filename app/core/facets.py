@@ -0,0 +1,99 @@
+"""
+Tag and ingredient counts for the recipe list filters.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from core.models import Ingredient, Recipe, Tag
+
+
+def _filter_sql(field, count):
+    links = getattr(Recipe, field).through._meta.db_table
+    column = f'{field[:-1]}_id'
+    placeholders = ', '.join(['%s'] * count)
+    return f'''
+        AND EXISTS (
+            SELECT 1 FROM {links} f
+            WHERE f.recipe_id = r.id AND f.{column} IN ({placeholders})
+        )'''
+
+
+def _count_sql(field, model):
+    links = getattr(Recipe, field).through._meta.db_table
+    column = f'{field[:-1]}_id'
+    return f'''
+        SELECT '{field}', o.id, o.name, COUNT(*)
+        FROM matched m
+        JOIN {links} l ON l.recipe_id = m.id
+        JOIN {model._meta.db_table} o ON o.id = l.{column}
+        GROUP BY o.id, o.name'''
+
+
+def _sql(tag_count, ingredient_count):
+    where = ''
+    if tag_count:
+        where += _filter_sql('tags', tag_count)
+    if ingredient_count:
+        where += _filter_sql('ingredients', ingredient_count)
+    # One statement: the matching recipes once, a row per tag and per
+    # ingredient with their recipe counts, and a totals row.
+    return f'''
+        WITH matched AS (
+            SELECT r.id FROM {Recipe._meta.db_table} r
+            WHERE r.user_id = %s{where}
+        )
+        {_count_sql('tags', Tag)}
+        UNION ALL
+        {_count_sql('ingredients', Ingredient)}
+        UNION ALL
+        SELECT NULL, NULL, NULL, COUNT(*) FROM matched
+    '''
+
+
+def _compute(user, tag_ids, ingredient_ids):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _sql(len(tag_ids), len(ingredient_ids)),
+            [user.id, *tag_ids, *ingredient_ids],
+        )
+        rows = cursor.fetchall()
+
+    result = {'recipe_count': 0, 'tags': [], 'ingredients': []}
+    for kind, id, name, count in rows:
+        if kind is None:
+            result['recipe_count'] = count
+        else:
+            result[kind].append(
+                {'id': id, 'name': name, 'recipe_count': count}
+            )
+    for kind in ('tags', 'ingredients'):
+        result[kind].sort(
+            key=lambda item: (-item['recipe_count'], item['name'].lower())
+        )
+    return result
+
+
+def facets(user, tag_ids=(), ingredient_ids=()):
+    """
+    Return how many of the user's recipes matching the list filters have
+    each tag and each ingredient, most used first.
+
+    Results are cached under the user's data_version, which every change
+    to their recipes, tags or ingredients bumps, so they are never stale.
+    """
+    tag_ids = sorted(set(tag_ids))
+    ingredient_ids = sorted(set(ingredient_ids))
+    filters = '{}|{}'.format(
+        ','.join(map(str, tag_ids)), ','.join(map(str, ingredient_ids)),
+    )
+    # Hashed, as long id lists would pass memcached's key length limit.
+    digest = hashlib.sha1(filters.encode()).hexdigest()
+    key = f'facets:{user.id}:{user.data_version}:{digest}'
+    result = cache.get(key)
+    if result is None:
+        result = _compute(user, tag_ids, ingredient_ids)
+        cache.set(key, result, settings.FACETS['CACHE_TIMEOUT'])
+    return result
@@ -0,0 +1,55 @@
+"""
+Cheap liveness and readiness checks.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import OperationalError
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from psycopg2 import OperationalError as Psycopg2OpError
+
+
+# Once migrations are applied they stay applied for this code version.
+_migrated = set()
+
+
+def probe_database(alias=DEFAULT_DB_ALIAS):
+    """Run a trivial query, raising OperationalError if unreachable."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def pending_migrations(alias=DEFAULT_DB_ALIAS):
+    """Return the migrations not yet applied to the database."""
+    if alias in _migrated:
+        return []
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    pending = [migration for migration, backwards in plan]
+    if not pending:
+        _migrated.add(alias)
+    return pending
+
+
+@never_cache
+def healthz(request):
+    """Liveness: the process is up and serving requests."""
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+def readyz(request):
+    """Readiness: the database is reachable and fully migrated."""
+    try:
+        probe_database()
+        pending = pending_migrations()
+    except (Psycopg2OpError, OperationalError):
+        return JsonResponse(
+            {'status': 'unavailable', 'database': 'unreachable'}, status=503
+        )
+    if pending:
+        return JsonResponse({
+            'status': 'unavailable',
+            'pending_migrations': [str(m) for m in pending],
+        }, status=503)
+    return JsonResponse({'status': 'ok'})
@@ -0,0 +1,186 @@
+"""
+Reference counting and garbage collection for recipe images.
+
+Files are content addressed (see core/storage.py) so several recipes may
+share one. ImageBlob counts references; when a count drops to zero the
+file is removed once the transaction commits, under the blob's row
+lock. An upload reusing the file takes that lock too (see lock()), so
+it either counts its reference first and keeps the file, or finds the
+file gone and writes it again. scan() reclaims files that never got a
+blob, skipping those written within IMAGE_GC['GRACE_SECONDS'] whose
+upload may not have committed yet.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import (
+    Case, F, PositiveIntegerField, Value, When,
+)
+
+from core.models import ImageBlob, Recipe
+
+
+def image_storage():
+    return Recipe._meta.get_field('image').storage
+
+
+def incref(name):
+    """Record one more reference to the media file name."""
+    if name:
+        incref_many({name: 1})
+
+
+def incref_many(counts):
+    """Add counts[name] references to each name, in two queries."""
+    counts = {name: count for name, count in counts.items() if name}
+    if not counts:
+        return
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=name) for name in counts], ignore_conflicts=True,
+    )
+    ImageBlob.objects.filter(name__in=counts).update(
+        ref_count=F('ref_count') + Case(
+            *[When(name=name, then=Value(count))
+              for name, count in counts.items()],
+            output_field=PositiveIntegerField(),
+        ),
+    )
+
+
+def lock(name):
+    """
+    Hold the ImageBlob row of name until the transaction ends.
+
+    ContentAddressedStorage calls this before reusing an existing file,
+    so collect() cannot delete the file before the new reference is
+    counted. Outside a transaction there is nothing to hold; Recipe.save
+    opens one so the stored file and its count commit together.
+    """
+    if connection.in_atomic_block:
+        ImageBlob.objects.select_for_update().filter(name=name).first()
+
+
+def decref(name):
+    """Drop one reference and collect the file after commit if unused."""
+    if not name:
+        return
+    ImageBlob.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1,
+    )
+    transaction.on_commit(lambda: collect(name))
+
+
+def collect(name):
+    """Delete name and its ImageBlob if nothing references it."""
+    with transaction.atomic():
+        blob = (
+            ImageBlob.objects.select_for_update()
+            .filter(name=name, ref_count=0).first()
+        )
+        if blob is None:
+            return False
+        image_storage().delete(name)
+        blob.delete()
+    return True
+
+
+def walk(root):
+    """Yield (name, path, mtime) for regular files below root, lazily."""
+    stack = ['']
+    while stack:
+        relative = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, relative))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = os.path.join(relative, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    yield name, entry.path, entry.stat().st_mtime
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def sweep_batch(files, prefix, grace, now, dry_run=False):
+    """Delete the files in one batch that no recipe references."""
+    candidates = {
+        prefix + name: path for name, path, mtime in files
+        if now - mtime >= grace
+    }
+    referenced = set(
+        Recipe.objects.filter(image__in=list(candidates))
+        .values_list('image', flat=True)
+    )
+    orphans = sorted(set(candidates) - referenced)
+    if not dry_run:
+        for name in orphans:
+            try:
+                os.remove(candidates[name])
+            except FileNotFoundError:
+                pass
+        ImageBlob.objects.filter(name__in=orphans).delete()
+    return len(files), orphans
+
+
+def _sweep_in_thread(*args):
+    try:
+        return sweep_batch(*args)
+    finally:
+        connection.close()
+
+
+def scan(directory='uploads/recipe', batch_size=None, workers=None,
+         grace=None, dry_run=False):
+    """
+    Reclaim files under MEDIA_ROOT/directory that no recipe references.
+
+    The directory is walked lazily and checked against Recipe.image one
+    batch at a time, with batches spread over a thread pool. Returns the
+    number of files seen and the names removed.
+    """
+    config = settings.IMAGE_GC
+    batch_size = batch_size or config['BATCH_SIZE']
+    workers = workers or config['WORKERS']
+    grace = config['GRACE_SECONDS'] if grace is None else grace
+    now = time.time()
+    root = os.path.join(settings.MEDIA_ROOT, directory)
+    prefix = directory.rstrip('/') + '/'
+
+    seen, removed = 0, []
+    if workers <= 1:
+        for batch in batched(walk(root), batch_size):
+            count, orphans = sweep_batch(batch, prefix, grace, now, dry_run)
+            seen += count
+            removed += orphans
+        return seen, removed
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for batch in batched(walk(root), batch_size):
+            pending.append(pool.submit(
+                _sweep_in_thread, batch, prefix, grace, now, dry_run,
+            ))
+            # Bound the number of batches held in memory.
+            if len(pending) >= workers * 2:
+                count, orphans = pending.pop(0).result()
+                seen += count
+                removed += orphans
+        for future in pending:
+            count, orphans = future.result()
+            seen += count
+            removed += orphans
+    return seen, removed
@@ -0,0 +1,189 @@
+"""
+Database backed background jobs.
+
+Jobs are rows in core_job. Workers (manage.py run_worker) claim due rows
+with SELECT ... FOR UPDATE SKIP LOCKED, so several workers can poll the
+same table without a broker and without blocking each other. Tasks are
+plain functions registered with @task in an app's tasks.py; they are
+called as func(job, **payload). Failed jobs are retried with exponential
+backoff until max_attempts.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+TOKEN_SALT = 'core.jobs.token'
+
+
+def task(name):
+    """Register the decorated function as the task called name."""
+    def decorator(func):
+        registry[name] = func
+        func.task_name = name
+        return func
+    return decorator
+
+
+def autodiscover():
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, payload=None, run_at=None, max_attempts=None,
+            owner=None):
+    """
+    Queue task name with payload, in the current transaction.
+
+    The job is only visible to workers once the caller commits, so work
+    queued from a request never runs against rows that were rolled back.
+    """
+    name = getattr(name, 'task_name', name)
+    return Job.objects.create(
+        task=name,
+        payload=payload or {},
+        owner=owner,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.TASKS['MAX_ATTEMPTS'],
+    )
+
+
+def sign(job):
+    """Return a token that grants read access to job alone."""
+    return signing.dumps(job.id, salt=TOKEN_SALT)
+
+
+def unsign(token):
+    """Return the job id a sign() token was issued for, or None."""
+    try:
+        return signing.loads(
+            token, salt=TOKEN_SALT, max_age=settings.TASKS['TOKEN_MAX_AGE'],
+        )
+    except signing.BadSignature:
+        return None
+
+
+def claim(worker, limit=1):
+    """Lock up to limit due jobs for worker and return them."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_at__lte=now)
+            .order_by('run_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        # The status check keeps claims exclusive on backends without
+        # row locks, where two workers may select the same ids.
+        Job.objects.filter(id__in=ids, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now,
+        )
+        return list(
+            Job.objects.filter(
+                id__in=ids, status=Job.RUNNING, locked_by=worker,
+            ).order_by('run_at', 'id')
+        )
+
+
+def report(job, **progress):
+    """Merge progress into the job row, visible while it runs."""
+    job.progress = {**job.progress, **progress}
+    job.locked_at = timezone.now()
+    Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+        progress=job.progress, locked_at=job.locked_at,
+    )
+
+
+def heartbeat(workers):
+    """Keep the jobs held by workers from looking abandoned."""
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_by__in=workers,
+    ).update(locked_at=timezone.now())
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number attempts, with jitter."""
+    config = settings.TASKS
+    delay = config['BACKOFF_BASE'] * 2 ** (attempts - 1)
+    delay = min(config['BACKOFF_MAX'], delay)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def run(job):
+    """
+    Run a claimed job and record its outcome.
+
+    The outcome is only written while the job is still locked by the
+    worker that claimed it; a job requeued by requeue_stale() meanwhile
+    belongs to whoever claimed it next.
+    """
+    worker = job.locked_by
+    job.attempts += 1
+    job.save(update_fields=['attempts'])
+    try:
+        func = registry[job.task]
+        result = func(job, **job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=backoff(job.attempts)
+            )
+            logger.warning('Job %s failed, retrying at %s', job, job.run_at)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+            logger.error('Job %s failed permanently', job)
+    else:
+        job.status = Job.DONE
+        job.result = result
+        job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.locked_at = None
+    fields = [
+        'status', 'run_at', 'result', 'last_error', 'finished_at',
+        'locked_by', 'locked_at',
+    ]
+    updated = Job.objects.filter(
+        id=job.id, status=Job.RUNNING, locked_by=worker,
+    ).update(**{field: getattr(job, field) for field in fields})
+    if not updated:
+        logger.warning('Job %s was requeued while %s ran it', job, worker)
+    return job
+
+
+def requeue_stale(timeout=None):
+    """Return jobs locked for longer than timeout to the queue."""
+    if timeout is None:
+        timeout = settings.TASKS['LOCK_TIMEOUT']
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_by='', locked_at=None,
+        last_error='Worker lost the job.', finished_at=timezone.now(),
+    )
+    return stale.update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+def retry(queryset):
+    """Queue failed or finished jobs to run again now."""
+    return queryset.exclude(status=Job.RUNNING).update(
+        status=Job.QUEUED, run_at=timezone.now(), attempts=0,
+        finished_at=None,
+    )
@@ -0,0 +1,43 @@
+"""
+Django command to prebuild the OpenAPI schema served at /api/schema/.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import schema
+
+
+class Command(BaseCommand):
+    """Generate the schema artifact, or check that it is current."""
+
+    help = 'Generate the OpenAPI schema artifact served by the API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            help='Artifact path, defaults to the SCHEMA_FILE setting.',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Fail if the artifact differs from live generation.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        path = options['file'] or settings.SCHEMA_FILE
+        artifact = schema.build_artifact(schema.generate_schema())
+
+        if options['check']:
+            existing = schema.read_artifact(path)
+            if existing != artifact:
+                raise CommandError(
+                    f'{path} is out of date, run build_schema to update it.'
+                )
+            self.stdout.write(self.style.SUCCESS(f'{path} is up to date.'))
+            return
+
+        schema.write_artifact(artifact, path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote schema version {artifact['version']} to {path}"
+        ))
@@ -0,0 +1,32 @@
+"""
+Django command to rebuild the precomputed similar recipes.
+"""
+from django.core.management.base import BaseCommand
+
+from core import similarity
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Recompute every neighbour row, e.g. after seeding or a restore."""
+
+    help = 'Rebuild the similar recipe tables of all or some users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='Only rebuild this user id. May be repeated.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        users = options['users']
+        if not users:
+            users = Recipe.objects.order_by('user_id').values_list(
+                'user_id', flat=True).distinct()
+        total = 0
+        for user_id in users:
+            total += similarity.refresh(user_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt neighbours of {total} recipes.'
+        ))
@@ -0,0 +1,53 @@
+"""
+Django command to reclaim image files no recipe references.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import images
+
+
+class Command(BaseCommand):
+    """Walk the media directory and delete unreferenced images."""
+
+    help = 'Delete recipe image files that no recipe references.'
+
+    def add_arguments(self, parser):
+        config = settings.IMAGE_GC
+        parser.add_argument(
+            '--directory', default='uploads/recipe',
+            help='Directory below MEDIA_ROOT to scan.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=config['BATCH_SIZE'],
+            help='Files checked against the database per query.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=config['WORKERS'],
+            help='Batches checked in parallel.',
+        )
+        parser.add_argument(
+            '--grace', type=int, default=config['GRACE_SECONDS'],
+            help='Skip files modified within this many seconds.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report orphans without deleting them.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        seen, removed = images.scan(
+            directory=options['directory'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            grace=options['grace'],
+            dry_run=options['dry_run'],
+        )
+        if options['verbosity'] > 1:
+            for name in removed:
+                self.stdout.write(name)
+        verb = 'Found' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {len(removed)} orphaned of {seen} files.'
+        ))
@@ -0,0 +1,72 @@
+"""
+Django command to list and export captured request profiles.
+"""
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    """List profiles or export them as collapsed stacks."""
+
+    help = 'List captured request profiles or export collapsed stacks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--export',
+            metavar='NAME',
+            help='Export one profile as collapsed stacks.',
+        )
+        parser.add_argument(
+            '--export-all',
+            action='store_true',
+            help='Merge every profile into one set of collapsed stacks.',
+        )
+        parser.add_argument(
+            '--path',
+            help='Only merge profiles whose request path contains this.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the export to a file instead of stdout.',
+        )
+
+    def _write(self, text, output):
+        if output:
+            with open(output, 'w') as f:
+                f.write(text)
+        else:
+            self.stdout.write(text, ending='')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        names = profiling.list_profiles()
+
+        if options['export']:
+            if options['export'] not in names:
+                raise CommandError(f"Unknown profile {options['export']}")
+            data = profiling.load_profile(options['export'])
+            self._write(profiling.to_collapsed(data), options['output'])
+            return
+
+        if options['export_all']:
+            merged = Counter()
+            for name in names:
+                data = profiling.load_profile(name)
+                if options['path'] and options['path'] not in data['path']:
+                    continue
+                merged.update(data['stacks'])
+            self._write(
+                profiling.to_collapsed({'stacks': merged}), options['output']
+            )
+            return
+
+        for name in names:
+            data = profiling.load_profile(name)
+            self.stdout.write(
+                f"{name}  {data['method']} {data['path']}  "
+                f"{data['status']}  {data['duration_ms']}ms  "
+                f"{data['samples']} samples"
+            )
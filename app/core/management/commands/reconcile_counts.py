@@ -0,0 +1,28 @@
+"""
+Django command to recount recipes per tag and ingredient.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import counters
+from core.models import Ingredient, Tag
+
+
+class Command(BaseCommand):
+    """Fix drift in Tag.recipe_count and Ingredient.recipe_count."""
+
+    help = 'Recount recipe_count on tags and ingredients.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.DELETION_BATCH_SIZE,
+            help='Rows recounted per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        for model in (Tag, Ingredient):
+            fixed = counters.reconcile(model, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Fixed {fixed} {model._meta.verbose_name_plural}.'
+            ))
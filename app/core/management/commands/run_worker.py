@@ -0,0 +1,123 @@
+"""
+Django command to run background jobs.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+
+from core import jobs
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Claim and run queued jobs on a pool of threads."""
+
+    help = 'Run queued background jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=2,
+            help='Jobs run at the same time by this process.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.TASKS['POLL_INTERVAL'],
+            help='Seconds to sleep when the queue is empty.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once no jobs are due instead of polling.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        jobs.autodiscover()
+        self.stop = threading.Event()
+        previous = {
+            signum: signal.signal(signum, lambda *args: self.stop.set())
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        self.requeue_stale()
+        workers = [
+            f'{name}:{index}' for index in range(options['concurrency'])
+        ]
+        threads = [
+            threading.Thread(
+                target=self.work, args=(worker, options), daemon=True,
+            )
+            for worker in workers
+        ]
+        for thread in threads:
+            thread.start()
+        interval = settings.TASKS['REQUEUE_INTERVAL']
+        next_requeue = time.monotonic() + interval
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+                    # Refresh this process's locks, then take back the
+                    # jobs of workers that died while it runs.
+                    if time.monotonic() >= next_requeue:
+                        self.heartbeat(workers)
+                        self.requeue_stale()
+                        next_requeue = time.monotonic() + interval
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS('Worker stopped.'))
+
+    def heartbeat(self, workers):
+        """Mark this process's running jobs as still alive."""
+        try:
+            jobs.heartbeat(workers)
+        except DatabaseError:
+            logger.exception('Could not refresh job locks')
+        finally:
+            connection.close()
+
+    def requeue_stale(self):
+        """Return jobs held by dead workers to the queue."""
+        try:
+            count = jobs.requeue_stale()
+        except DatabaseError:
+            logger.exception('Could not requeue stale jobs')
+        else:
+            if count:
+                logger.warning('Requeued %s stale jobs', count)
+        finally:
+            connection.close()
+
+    def work(self, worker, options):
+        """Run jobs one at a time until stopped."""
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    claimed = jobs.claim(worker)
+                except DatabaseError:
+                    logger.exception('%s could not claim jobs', worker)
+                    connection.close()
+                    self.stop.wait(options['poll_interval'])
+                    continue
+                if not claimed:
+                    if options['once']:
+                        return
+                    self.stop.wait(options['poll_interval'])
+                    continue
+                for job in claimed:
+                    job = jobs.run(job)
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f'{worker} {job}')
+        finally:
+            connection.close()
@@ -0,0 +1,298 @@
+"""
+Django command to generate synthetic data for scale testing.
+"""
+import bisect
+import io
+import itertools
+import multiprocessing
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from core import counters
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+
+WORDS = [
+    'Spicy', 'Roasted', 'Garlic', 'Lemon', 'Honey', 'Smoked', 'Crispy',
+    'Creamy', 'Herb', 'Ginger', 'Chili', 'Sesame', 'Maple', 'Miso',
+]
+DISHES = [
+    'Chicken', 'Noodles', 'Curry', 'Salad', 'Tacos', 'Soup', 'Risotto',
+    'Salmon', 'Tofu', 'Pasta', 'Burger', 'Pancakes', 'Stew', 'Dumplings',
+]
+
+
+def zipf_cumulative(n, s):
+    """Cumulative Zipf weights for ranks 1..n with exponent s."""
+    return list(itertools.accumulate(1 / k ** s for k in range(1, n + 1)))
+
+
+def sample_zipf(rng, cumulative, k):
+    """Pick k distinct indexes, favouring low ranks."""
+    k = min(k, len(cumulative))
+    chosen = set()
+    attempts = 0
+    while len(chosen) < k and attempts < 20 * k:
+        value = rng.random() * cumulative[-1]
+        chosen.add(bisect.bisect_left(cumulative, value))
+        attempts += 1
+    if len(chosen) < k:
+        rest = [i for i in range(len(cumulative)) if i not in chosen]
+        chosen.update(rng.sample(rest, k - len(chosen)))
+    return sorted(chosen)
+
+
+def recipe_count(rng, distribution, mean):
+    if distribution == 'fixed':
+        return mean
+    if distribution == 'uniform':
+        return rng.randint(0, 2 * mean)
+    return int(rng.expovariate(1 / mean)) if mean else 0
+
+
+class OrmWriter:
+    """Insert rows with bulk_create."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+
+    def insert(self, model, objs):
+        model.objects.bulk_create(objs, batch_size=self.batch_size)
+        if objs and objs[0].pk is None:
+            # Backends that don't return ids: the new rows are the newest.
+            ids = list(model.objects.order_by('-id').values_list(
+                'id', flat=True)[:len(objs)])
+            for obj, pk in zip(objs, reversed(ids)):
+                obj.pk = pk
+
+    def link(self, through, field_a, field_b, pairs):
+        through.objects.bulk_create(
+            [through(**{field_a: a, field_b: b}) for a, b in pairs],
+            batch_size=self.batch_size,
+        )
+
+
+class CopyWriter:
+    """Insert rows with PostgreSQL COPY, reserving ids up front."""
+
+    def _copy(self, table, columns, rows):
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(self._escape(v) for v in row) + '\n')
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f'COPY {table} ({", ".join(columns)}) FROM STDIN', buffer
+            )
+
+    @staticmethod
+    def _escape(value):
+        if value is None:
+            return r'\N'
+        return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+
+    def insert(self, model, objs):
+        if not objs:
+            return
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+                "FROM generate_series(1, %s)",
+                [table, len(objs)],
+            )
+            for obj, (pk,) in zip(objs, cursor.fetchall()):
+                obj.pk = pk
+        fields = model._meta.concrete_fields
+        self._copy(
+            table,
+            [f.column for f in fields],
+            ([f.get_db_prep_save(getattr(obj, f.attname), connection)
+              for f in fields] for obj in objs),
+        )
+
+    def link(self, through, field_a, field_b, pairs):
+        self._copy(
+            through._meta.db_table,
+            [through._meta.get_field(field_a).column,
+             through._meta.get_field(field_b).column],
+            pairs,
+        )
+
+
+def seed_chunk(options, start, end):
+    """Generate users start..end and everything they own."""
+    User = get_user_model()
+    writer = (CopyWriter() if options['copy']
+              else OrmWriter(options['batch_size']))
+    tag_weights = zipf_cumulative(options['tags_per_user'], options['zipf'])
+    ingredient_weights = zipf_cumulative(
+        options['ingredients_per_user'], options['zipf']
+    )
+
+    with transaction.atomic():
+        users, rngs = [], []
+        for index in range(start, end):
+            rngs.append(random.Random(options['seed'] * 1000003 + index))
+            users.append(User(
+                email=f"user{index}@{options['email_domain']}",
+                name=f'User {index}',
+                password=options['password_hash'],
+            ))
+        writer.insert(User, users)
+
+        tags, ingredients, recipes = [], [], []
+        for user in users:
+            tags.extend(
+                Tag(user_id=user.pk, name=f'Tag {i}')
+                for i in range(options['tags_per_user'])
+            )
+            ingredients.extend(
+                Ingredient(user_id=user.pk, name=f'Ingredient {i}')
+                for i in range(options['ingredients_per_user'])
+            )
+        writer.insert(Tag, tags)
+        writer.insert(Ingredient, ingredients)
+
+        owners = []
+        for i, (user, rng) in enumerate(zip(users, rngs)):
+            count = recipe_count(
+                rng, options['distribution'], options['recipes_per_user']
+            )
+            for _ in range(count):
+                recipes.append(Recipe(
+                    user_id=user.pk,
+                    title=f'{rng.choice(WORDS)} {rng.choice(DISHES)}',
+                    time_minutes=rng.randint(5, 180),
+                    price=Decimal(rng.randint(100, 9999)) / 100,
+                ))
+                owners.append(i)
+        writer.insert(Recipe, recipes)
+
+        tag_pairs, ingredient_pairs = [], []
+        per_tag = options['tags_per_user']
+        per_ingredient = options['ingredients_per_user']
+        for recipe, owner in zip(recipes, owners):
+            rng = rngs[owner]
+            for i in sample_zipf(rng, tag_weights,
+                                 options['tags_per_recipe']):
+                tag_pairs.append((recipe.pk, tags[owner * per_tag + i].pk))
+            for i in sample_zipf(rng, ingredient_weights,
+                                 options['ingredients_per_recipe']):
+                ingredient_pairs.append(
+                    (recipe.pk, ingredients[owner * per_ingredient + i].pk)
+                )
+        writer.link(Recipe.tags.through, 'recipe_id', 'tag_id', tag_pairs)
+        writer.link(Recipe.ingredients.through, 'recipe_id',
+                    'ingredient_id', ingredient_pairs)
+        # The links bypass the ORM, so count them afterwards.
+        for model in (Tag, Ingredient):
+            counters.reconcile(
+                model, queryset=model.objects.filter(user__in=users),
+            )
+
+    return end - start, len(recipes)
+
+
+def _seed_chunk_star(args):
+    try:
+        return seed_chunk(*args)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """Generate deterministic users, recipes, tags and ingredients."""
+
+    help = 'Generate deterministic synthetic data for scale testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes-per-user', type=int, default=100,
+                            help='Mean number of recipes per user.')
+        parser.add_argument(
+            '--distribution',
+            choices=['fixed', 'uniform', 'exponential'],
+            default='exponential',
+            help='Distribution of recipes per user around the mean.',
+        )
+        parser.add_argument('--tags-per-user', type=int, default=30)
+        parser.add_argument('--ingredients-per-user', type=int, default=80)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Zipf exponent for tag and ingredient popularity.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=100,
+                            help='Users generated per transaction.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows per INSERT when not using COPY.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Parallel worker processes.')
+        parser.add_argument('--copy', action='store_true',
+                            help='Load with COPY (PostgreSQL only).')
+        parser.add_argument('--email-domain', default='seed.example.com')
+        parser.add_argument('--password', default='seedpass123')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy requires PostgreSQL.')
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            raise CommandError('--workers requires a server database.')
+        if get_user_model().objects.filter(
+            email__endswith=f"@{options['email_domain']}"
+        ).exists():
+            raise CommandError(
+                f"Users @{options['email_domain']} already exist, "
+                'pass a different --email-domain.'
+            )
+
+        options['password_hash'] = make_password(options['password'])
+        chunk = options['chunk_size']
+        jobs = [
+            (options, start, min(start + chunk, options['users']))
+            for start in range(0, options['users'], chunk)
+        ]
+
+        started = time.perf_counter()
+        users = recipes = 0
+        if options['workers'] > 1:
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with context.Pool(options['workers']) as pool:
+                results = pool.imap_unordered(_seed_chunk_star, jobs)
+                for chunk_users, chunk_recipes in results:
+                    users += chunk_users
+                    recipes += chunk_recipes
+                    self._progress(users, recipes, started)
+        else:
+            for job in jobs:
+                chunk_users, chunk_recipes = seed_chunk(*job)
+                users += chunk_users
+                recipes += chunk_recipes
+                self._progress(users, recipes, started)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {users} users and {recipes} recipes in '
+            f'{time.perf_counter() - started:.1f}s'
+        ))
+
+    def _progress(self, users, recipes, started):
+        self.stdout.write(
+            f'{users} users, {recipes} recipes '
+            f'({time.perf_counter() - started:.1f}s)'
+        )
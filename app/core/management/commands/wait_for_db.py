@@ -1,25 +1,68 @@
 """
 Django command to wait for the database to be available.
 """
+import random
 import time
 from psycopg2 import OperationalError as Psycopg2OpError
 
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from core import health
 
 
 class Command(BaseCommand):
     """Django command to wait for database."""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Give up after this many seconds, 0 waits forever.',
+        )
+        parser.add_argument(
+            '--initial-delay', type=float, default=0.1,
+            help='First retry delay in seconds, doubled on each attempt.',
+        )
+        parser.add_argument(
+            '--max-delay', type=float, default=5,
+            help='Upper bound for a single retry delay in seconds.',
+        )
+        parser.add_argument(
+            '--migrations', action='store_true',
+            help='Also wait until every migration has been applied.',
+        )
+
+    def probe(self, migrations):
+        """Return True once the database is reachable (and migrated)."""
+        health.probe_database()
+        return not (migrations and health.pending_migrations())
+
     def handle(self, *args, **options):
         """Entrypoint for command"""
         self.stdout.write('Waiting for database...')
-        db_up = False
-        while db_up is False:
+        deadline = time.monotonic() + options['timeout']
+        attempt = 0
+        while True:
             try:
-                self.check(databases=['default'])
-                db_up = True
+                if self.probe(options['migrations']):
+                    break
+                reason = 'Migrations pending'
             except (Psycopg2OpError, OperationalError):
-                self.stdout.write('Database unavailable, waiting for 1 second...')  # noqa
-                time.sleep(1)
+                reason = 'Database unavailable'
+
+            # Full jitter keeps many replicas from retrying in lockstep.
+            delay = random.uniform(0, min(
+                options['max_delay'],
+                options['initial_delay'] * 2 ** attempt,
+            ))
+            if options['timeout']:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"{reason}, gave up after {options['timeout']}s."
+                    )
+                delay = min(delay, remaining)
+            self.stdout.write(f'{reason}, retrying in {delay:.2f}s...')
+            time.sleep(delay)
+            attempt += 1
         self.stdout.write(self.style.SUCCESS('Database available!'))
@@ -0,0 +1,46 @@
+"""
+Serving protected media files.
+"""
+import mimetypes
+import os
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import patch_cache_control
+
+
+def media_version(name):
+    """Return the URL version of a content-hash named media file."""
+    return os.path.splitext(os.path.basename(name))[0][:16]
+
+
+def serve_media(name, content_type=None, immutable=False):
+    """
+    Return a response for the media file at name, relative to MEDIA_ROOT.
+
+    Behind nginx the response is empty and carries X-Accel-Redirect, so
+    nginx sends the bytes from an internal location. Pass immutable only
+    when the requested URL carries the file's media_version(); other URLs
+    may point at different content later and are revalidated.
+    """
+    if content_type is None:
+        content_type = mimetypes.guess_type(name)[0]
+    content_type = content_type or 'application/octet-stream'
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + name
+    else:
+        response = FileResponse(
+            open(os.path.join(settings.MEDIA_ROOT, name), 'rb'),
+            content_type=content_type,
+        )
+    if immutable:
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=settings.MEDIA_CACHE_MAX_AGE,
+            immutable=True,
+        )
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,61 @@
+"""
+Browser-only middleware that is skipped for token-authenticated API paths.
+
+The API authenticates with tokens, so sessions, CSRF, messages, the
+session backed request.user and clickjacking headers only matter for
+the admin and the API docs page. Each class below behaves exactly like
+its Django parent except for requests under
+settings.LEAN_MIDDLEWARE_PATHS, less the browser pages in
+settings.LEAN_MIDDLEWARE_EXCLUDE.
+"""
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.clickjacking import XFrameOptionsMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+
+
+def is_lean_path(request):
+    path = request.path_info
+    return (
+        path.startswith(tuple(settings.LEAN_MIDDLEWARE_PATHS))
+        and not path.startswith(tuple(settings.LEAN_MIDDLEWARE_EXCLUDE))
+    )
+
+
+class LeanPathMixin:
+    """Pass lean path requests straight to the next middleware."""
+
+    def __call__(self, request):
+        if is_lean_path(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class BrowserSessionMiddleware(LeanPathMixin, SessionMiddleware):
+    pass
+
+
+class BrowserAuthenticationMiddleware(LeanPathMixin,
+                                      AuthenticationMiddleware):
+    pass
+
+
+class BrowserMessageMiddleware(LeanPathMixin, MessageMiddleware):
+    pass
+
+
+class BrowserXFrameOptionsMiddleware(LeanPathMixin,
+                                     XFrameOptionsMiddleware):
+    pass
+
+
+class BrowserCsrfViewMiddleware(LeanPathMixin, CsrfViewMiddleware):
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_lean_path(request):
+            return None
+        return super().process_view(
+            request, callback, callback_args, callback_kwargs
+        )
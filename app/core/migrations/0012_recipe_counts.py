@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-19 11:25
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_links(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    for name, field in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', name)
+        through = getattr(Recipe, field).through
+        column = f'{name.lower()}_id'
+        count = Subquery(
+            through.objects.filter(**{column: OuterRef('pk')})
+            .order_by().values(column).annotate(n=Count('*')).values('n'),
+            output_field=IntegerField(),
+        )
+        model.objects.update(recipe_count=Coalesce(count, 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'recipe_count', 'id'], name='ingredient_user_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'recipe_count', 'id'], name='tag_user_count_idx'),
+        ),
+        migrations.RunPython(
+            count_existing_links, migrations.RunPython.noop,
+        ),
+    ]
@@ -5,13 +5,16 @@ import uuid
 import os
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+from core.storage import ContentAddressedStorage
+
 
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image."""
@@ -48,17 +51,37 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Bumped by core.changes whenever the user's recipe data changes.
+    data_version = models.PositiveBigIntegerField(default=0)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def delete(self):
+        # Cascaded link rows send no signals, so release their counts
+        # here, with one query per table for the whole queryset. The
+        # rows are locked first, so a similar recipes refresh either
+        # commits its rows before they are collected or skips them.
+        from core import counters
+        with transaction.atomic(savepoint=False):
+            ids = list(self.order_by('pk').select_for_update().values_list(
+                'pk', flat=True,
+            ))
+            counters.unlink_recipes(ids)
+            return super().delete()
+
+
 class Recipe(models.Model):
     """Recipe object."""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # Covered by the (user, id) index below.
+        db_index=False,
     )
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -67,11 +90,50 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=ContentAddressedStorage(),
+    )
+
+    class Meta:
+        # One per list ordering, ending in id for a total order. Each
+        # also serves the range filter on its field.
+        indexes = [
+            models.Index(
+                fields=['user', 'id'], name='recipe_user_id_idx',
+            ),
+            models.Index(
+                fields=['user', 'title', 'id'], name='recipe_user_title_idx',
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'], name='recipe_user_price_idx',
+            ),
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='recipe_user_time_idx',
+            ),
+        ]
+
+    objects = RecipeQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # An image file is stored in pre_save and counted in post_save;
+        # one transaction lets the storage hold the blob lock in between.
+        with transaction.atomic(savepoint=False):
+            return super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        from core import counters
+        with transaction.atomic(savepoint=False):
+            # Locked first for the same reason as RecipeQuerySet.delete.
+            Recipe.objects.select_for_update().filter(pk=self.pk).exists()
+            counters.unlink_recipes([self.pk])
+            return super().delete(*args, **kwargs)
+
 
 class Tag(models.Model):
     """Tag for filtering recipes"""
@@ -80,6 +142,16 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Maintained by core/counters.py.
+    recipe_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe_count', 'id'],
+                name='tag_user_count_idx',
+            ),
+        ]
 
     def __str__(self):
         return str(self.name)
@@ -92,6 +164,97 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Maintained by core/counters.py.
+    recipe_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe_count', 'id'],
+                name='ingredient_user_count_idx',
+            ),
+        ]
 
     def __str__(self):
         return str(self.name)
+
+
+class SimilarRecipe(models.Model):
+    """Precomputed neighbour of a recipe, see core/similarity.py."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbour_of',
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'rank'], name='unique_similar_rank',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} -> {self.similar_id} ({self.score:.2f})'
+
+
+class ImageBlob(models.Model):
+    """Reference count for a content-addressed media file."""
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.ref_count})'
+
+
+class Job(models.Model):
+    """Background job, claimed by workers with SKIP LOCKED."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, blank=True)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='jobs',
+    )
+    progress = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=QUEUED,
+    )
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.task}#{self.pk} ({self.status})'
@@ -0,0 +1,135 @@
+"""
+"What can I cook" matching with per-user in-memory bitsets.
+
+Each user's recipes are kept as integer bitmasks over their ingredients,
+so comparing a recipe to a pantry is an AND and a popcount. An index is
+built with one query the first time a user asks, labelled with their
+User.data_version, and then follows this process's writes through
+core.changes. A version mismatch means another process wrote, and the
+index is rebuilt. Indexes for the least recently used users are dropped
+past PANTRY_INDEX['MAX_USERS'].
+"""
+import heapq
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from core import changes
+from core.models import Recipe
+
+
+def _count_bits(value):
+    return bin(value).count('1')
+
+
+# int.bit_count() is ten times faster but only exists from Python 3.10.
+_popcount = getattr(int, 'bit_count', _count_bits)
+
+
+class PantryIndex:
+    """Recipe to ingredient membership of one user as bitmasks."""
+
+    def __init__(self, version, pairs=()):
+        self.version = version
+        self.bits = {}
+        self.masks = {}
+        self.lock = threading.Lock()
+        for recipe_id, ingredient_id in pairs:
+            self._link(recipe_id, ingredient_id)
+
+    @classmethod
+    def build(cls, user):
+        pairs = Recipe.ingredients.through.objects.filter(
+            recipe__user=user
+        ).values_list('recipe_id', 'ingredient_id')
+        return cls(user.data_version, pairs.iterator())
+
+    def _bit(self, ingredient_id):
+        bit = self.bits.get(ingredient_id)
+        if bit is None:
+            bit = self.bits[ingredient_id] = 1 << len(self.bits)
+        return bit
+
+    def _link(self, recipe_id, ingredient_id):
+        self.masks[recipe_id] = (
+            self.masks.get(recipe_id, 0) | self._bit(ingredient_id)
+        )
+
+    def apply(self, ops):
+        """Apply core.changes operations from a committed transaction."""
+        with self.lock:
+            for op, *args in ops:
+                if op == changes.LINK:
+                    self._link(*args)
+                elif op == changes.UNLINK:
+                    recipe_id, ingredient_id = args
+                    bit = self.bits.get(ingredient_id, 0)
+                    if recipe_id in self.masks:
+                        self.masks[recipe_id] &= ~bit
+                elif op in (changes.CLEAR_RECIPE, changes.DROP_RECIPE):
+                    self.masks.pop(args[0], None)
+                elif op == changes.DROP_INGREDIENT:
+                    bit = self.bits.get(args[0])
+                    if bit is None:
+                        continue
+                    for recipe_id, mask in self.masks.items():
+                        if mask & bit:
+                            self.masks[recipe_id] = mask & ~bit
+            self.version += 1
+
+    def match(self, ingredient_ids, limit=20, max_missing=None):
+        """
+        Return up to limit (recipe_id, missing, total) tuples, fully
+        makeable recipes first, then by fewest missing ingredients.
+        """
+        pantry = 0
+        for ingredient_id in ingredient_ids:
+            pantry |= self.bits.get(ingredient_id, 0)
+        wanted = ~pantry
+        with self.lock:
+            scored = (
+                (_popcount(mask & wanted), -_popcount(mask), -recipe_id)
+                for recipe_id, mask in self.masks.items() if mask
+            )
+            if max_missing is not None:
+                scored = (row for row in scored if row[0] <= max_missing)
+            best = heapq.nsmallest(limit, scored)
+        return [
+            (-negative_id, missing, -negative_total)
+            for missing, negative_total, negative_id in best
+        ]
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(user):
+    """Return an index for user that reflects their current data."""
+    with _indexes_lock:
+        index = _indexes.get(user.id)
+        if index is not None and index.version == user.data_version:
+            _indexes.move_to_end(user.id)
+            return index
+
+    index = PantryIndex.build(user)
+    with _indexes_lock:
+        _indexes[user.id] = index
+        _indexes.move_to_end(user.id)
+        while len(_indexes) > settings.PANTRY_INDEX['MAX_USERS']:
+            _indexes.popitem(last=False)
+    return index
+
+
+def reset():
+    with _indexes_lock:
+        _indexes.clear()
+
+
+@changes.subscribe
+def _follow_changes(user_id, ops):
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+    if index is not None:
+        index.apply(ops)
@@ -0,0 +1,169 @@
+"""
+On-demand sampling profiler for production requests.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_QUERY_PARAM = '_profile'
+PROFILE_SUFFIX = '.profile.json'
+
+
+class StackSampler:
+    """Periodically sample the stack of one thread into collapsed stacks."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.stacks[self._collapse(frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(frame):
+        """Return the frame's stack as a root-first ';' separated string."""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(
+                f'{code.co_name} '
+                f'({os.path.basename(code.co_filename)}:{frame.f_lineno})'
+            )
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+
+def profile_dir():
+    return settings.PROFILER['DIR']
+
+
+def list_profiles():
+    """Return profile file names, oldest first."""
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    names = [n for n in os.listdir(directory) if n.endswith(PROFILE_SUFFIX)]
+    return sorted(names)
+
+
+def load_profile(name):
+    with open(os.path.join(profile_dir(), name)) as f:
+        return json.load(f)
+
+
+def write_profile(data):
+    """Write a profile and drop the oldest ones beyond the ring size."""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    name = f'{time.time_ns():020d}-{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}'
+    tmp_path = os.path.join(directory, f'.{name}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, os.path.join(directory, name))
+
+    names = list_profiles()
+    for old in names[:max(len(names) - settings.PROFILER['MAX_FILES'], 0)]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except FileNotFoundError:
+            pass
+    return name
+
+
+def to_collapsed(data):
+    """Render a profile as flamegraph.pl compatible collapsed stacks."""
+    return ''.join(
+        f'{stack} {count}\n' for stack, count in data['stacks'].items()
+    )
+
+
+class SamplingProfilerMiddleware:
+    """Profile staff opt-in requests and a random sample of all requests."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _opted_in(self, request):
+        if not (request.META.get(PROFILE_HEADER) == '1'
+                or request.GET.get(PROFILE_QUERY_PARAM) == '1'):
+            return False
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            try:
+                result = TokenAuthentication().authenticate(request)
+            except AuthenticationFailed:
+                return False
+            user = result[0] if result else None
+        return bool(user and user.is_staff)
+
+    def _should_profile(self, request):
+        config = settings.PROFILER
+        if not config['ENABLED']:
+            return False
+        if self._opted_in(request):
+            return True
+        rate = config['SAMPLE_RATE']
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if not self._should_profile(request):
+            return self.get_response(request)
+
+        sampler = StackSampler(
+            threading.get_ident(), settings.PROFILER['INTERVAL']
+        )
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        try:
+            write_profile({
+                'method': request.method,
+                'path': request.path,
+                'view': match.view_name if match else None,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 3),
+                'interval_ms': settings.PROFILER['INTERVAL'] * 1000,
+                'samples': sampler.samples,
+                'timestamp': time.time(),
+                'stacks': dict(sampler.stacks),
+            })
+        except Exception:
+            # Profiling must never fail the request it observed.
+            logger.exception('Could not write profile')
+        return response
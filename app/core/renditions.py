@@ -0,0 +1,160 @@
+"""
+Resized recipe image renditions with a size-bounded disk cache.
+
+Renditions live under MEDIA_ROOT/RENDITIONS['DIR'] so they can be served
+like any other media file. The cache key is the source name, width and
+format; sources are content addressed, so a key never goes stale. Each
+render holds an flock on a per-key lock file, so concurrent identical
+requests in any worker render once. Hits refresh the file mtime, and
+evict() removes the least recently used files once the directory grows
+past RENDITIONS['MAX_BYTES'].
+"""
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+
+FORMAT_EXTENSIONS = {'jpeg': '.jpg', 'png': '.png', 'webp': '.webp'}
+EXTENSION_FORMATS = {'.jpg': 'jpeg', '.jpeg': 'jpeg', '.png': 'png',
+                     '.webp': 'webp'}
+
+_written = 0
+_written_lock = threading.Lock()
+
+
+def cache_root():
+    return os.path.join(settings.MEDIA_ROOT, settings.RENDITIONS['DIR'])
+
+
+def source_format(name):
+    """Return the rendition format matching the source file extension."""
+    ext = os.path.splitext(name)[1].lower()
+    return EXTENSION_FORMATS.get(ext, 'jpeg')
+
+
+def rendition_name(source, width, fmt):
+    """Return the cache name for source at width in fmt, below MEDIA_ROOT."""
+    key = hashlib.sha256(f'{source}:{width}:{fmt}'.encode()).hexdigest()
+    return os.path.join(
+        settings.RENDITIONS['DIR'], key[:2],
+        f'{key}{FORMAT_EXTENSIONS[fmt]}',
+    )
+
+
+def resize(source_path, width, fmt, output):
+    """Write source_path scaled down to width (0 keeps it) in fmt."""
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if width and image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA')
+        image.save(output, format=fmt.upper(),
+                   quality=settings.RENDITIONS['QUALITY'])
+
+
+def get_rendition(source, width, fmt):
+    """
+    Return the cache name of the rendition, rendering it on a miss.
+    Raises FileNotFoundError if the source file is gone.
+    """
+    name = rendition_name(source, width, fmt)
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    if _touch(path):
+        return name
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            # Another request may have rendered it while we waited.
+            if _touch(path):
+                return name
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(path), suffix='.part'
+            )
+            try:
+                with os.fdopen(fd, 'wb') as tmp:
+                    resize(
+                        os.path.join(settings.MEDIA_ROOT, source),
+                        width, fmt, tmp,
+                    )
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            _remove(path + '.lock')
+
+    _record_write(os.path.getsize(path))
+    return name
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _record_write(size):
+    """Run evict() once this process has written EVICT_FRACTION of the cap."""
+    global _written
+    config = settings.RENDITIONS
+    with _written_lock:
+        _written += size
+        due = _written >= config['MAX_BYTES'] * config['EVICT_FRACTION']
+        if due:
+            _written = 0
+    if due:
+        evict()
+
+
+def evict(max_bytes=None):
+    """
+    Delete least recently used renditions until the cache is 90% of
+    max_bytes. Returns the number of bytes freed.
+    """
+    if max_bytes is None:
+        max_bytes = settings.RENDITIONS['MAX_BYTES']
+    files = []
+    total = 0
+    for directory, _, filenames in os.walk(cache_root()):
+        for filename in filenames:
+            if filename.endswith(('.lock', '.part')):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    if total <= max_bytes:
+        return 0
+
+    target = max_bytes * 0.9
+    freed = 0
+    for mtime, size, path in sorted(files):
+        if total - freed <= target:
+            break
+        _remove(path)
+        freed += size
+    return freed
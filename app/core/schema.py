@@ -0,0 +1,117 @@
+"""
+Precomputed OpenAPI schema served with ETag and cache headers.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.utils.encoders import JSONEncoder
+
+
+_lock = threading.Lock()
+_artifact = None
+_rendered = {}
+
+
+def generate_schema():
+    """Introspect the API and return the OpenAPI schema."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    # Round trip through JSON so lazy strings match a loaded artifact.
+    return json.loads(json.dumps(schema, cls=JSONEncoder))
+
+
+def build_artifact(schema):
+    """Wrap a schema with a version derived from its content."""
+    body = json.dumps(schema, separators=(',', ':'))
+    version = hashlib.sha256(body.encode()).hexdigest()[:20]
+    return {'version': version, 'schema': schema}
+
+
+def write_artifact(artifact, path=None):
+    path = path or settings.SCHEMA_FILE
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(artifact, f)
+    os.replace(tmp_path, path)
+
+
+def read_artifact(path=None):
+    path = path or settings.SCHEMA_FILE
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def get_artifact():
+    """Return the schema artifact, generating it once if none was built."""
+    global _artifact
+    if _artifact is None:
+        with _lock:
+            if _artifact is None:
+                _artifact = (read_artifact()
+                             or build_artifact(generate_schema()))
+    return _artifact
+
+
+def reset():
+    """Forget the loaded artifact and rendered copies."""
+    global _artifact
+    with _lock:
+        _artifact = None
+        _rendered.clear()
+
+
+def _opaque(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(etag, if_none_match):
+    """
+    Compare an ETag with an If-None-Match header, weakly as RFC 7232
+    requires, so a W/ tag set by CompressionMiddleware still matches.
+    """
+    tags = parse_etags(if_none_match)
+    if '*' in tags:
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in tags}
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """Serve the prebuilt schema instead of introspecting every request."""
+
+    def _get_schema_response(self, request):
+        if request.GET.get('lang'):
+            return super()._get_schema_response(request)
+
+        artifact = get_artifact()
+        etag = f'"{artifact["version"]}"'
+        if etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            renderer = request.accepted_renderer
+            key = (artifact['version'], renderer.media_type)
+            if key not in _rendered:
+                _rendered[key] = renderer.render(
+                    artifact['schema'], renderer_context={}
+                )
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type += f'; charset={renderer.charset}'
+            response = HttpResponse(_rendered[key], content_type=content_type)
+
+        response['ETag'] = etag
+        patch_cache_control(
+            response, public=True, max_age=settings.SCHEMA_CACHE_MAX_AGE
+        )
+        return response
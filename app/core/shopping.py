@@ -0,0 +1,60 @@
+"""
+Shopping list aggregation over many recipes.
+"""
+from decimal import Decimal
+
+from django.db import connection
+
+from core.models import Ingredient, Recipe
+
+
+def _sql(count):
+    recipes = Recipe._meta.db_table
+    links = Recipe.ingredients.through._meta.db_table
+    ingredients = Ingredient._meta.db_table
+    placeholders = ', '.join(['%s'] * count)
+    # One statement: a row per ingredient, plus a totals row whose id is
+    # NULL. The totals come from the recipe table itself so recipes
+    # without ingredients still count and prices are not multiplied by
+    # the join.
+    return f'''
+        SELECT i.id, i.name, COUNT(*), NULL, NULL
+        FROM {recipes} r
+        JOIN {links} ri ON ri.recipe_id = r.id
+        JOIN {ingredients} i ON i.id = ri.ingredient_id
+        WHERE r.user_id = %s AND r.id IN ({placeholders})
+        GROUP BY i.id, i.name
+        UNION ALL
+        SELECT NULL, NULL, COUNT(*), SUM(r.price), SUM(r.time_minutes)
+        FROM {recipes} r
+        WHERE r.user_id = %s AND r.id IN ({placeholders})
+    '''
+
+
+def shopping_list(user, recipe_ids):
+    """
+    Return the ingredients of the user's recipes in recipe_ids with how
+    many of them use each, and the recipes' total price and time.
+    """
+    ids = sorted(set(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(_sql(len(ids)), [user.id, *ids, user.id, *ids])
+        rows = cursor.fetchall()
+
+    ingredients = []
+    totals = None
+    for ingredient_id, name, count, price, minutes in rows:
+        if ingredient_id is None:
+            totals = count, price, minutes
+        else:
+            ingredients.append({
+                'id': ingredient_id, 'name': name, 'recipe_count': count,
+            })
+    ingredients.sort(key=lambda item: (item['name'].lower(), item['id']))
+    count, price, minutes = totals
+    return {
+        'recipe_count': count,
+        'total_price': Decimal(str(price or 0)).quantize(Decimal('0.01')),
+        'total_time_minutes': minutes or 0,
+        'ingredients': ingredients,
+    }
@@ -0,0 +1,139 @@
+"""
+Signal handlers keeping derived data in step with the models.
+
+ImageBlob counts follow Recipe.image, Tag and Ingredient recipe counts
+follow the through tables, and every change to a user's recipes, tags
+and ingredients is recorded with core.changes.
+"""
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+)
+
+from core import changes, counters, images
+from core.models import Ingredient, Recipe, Tag
+
+
+def _image_name(instance):
+    # Read the raw attribute so deferred fields are not loaded.
+    image = instance.__dict__.get('image')
+    return getattr(image, 'name', image) or ''
+
+
+def remember_image(sender, instance, **kwargs):
+    instance._original_image = _image_name(instance)
+
+
+def count_image(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_original_image', '')
+    new = _image_name(instance)
+    if old != new:
+        images.incref(new)
+        images.decref(old)
+    instance._original_image = new
+
+
+def release_image(sender, instance, **kwargs):
+    images.decref(_image_name(instance))
+
+
+def record_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        changes.record(instance.user_id)
+
+
+def record_recipe_delete(sender, instance, **kwargs):
+    changes.record(instance.user_id, [(changes.DROP_RECIPE, instance.pk)])
+
+
+def record_ingredient_delete(sender, instance, **kwargs):
+    changes.record(
+        instance.user_id, [(changes.DROP_INGREDIENT, instance.pk)]
+    )
+
+
+def record_tag_delete(sender, instance, **kwargs):
+    changes.record(instance.user_id, [(changes.DROP_TAG, instance.pk)])
+
+
+def _record_links(instance, action, reverse, pk_set, link, unlink, clear,
+                  drop):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if action == 'pre_clear':
+        op = drop if reverse else clear
+        changes.record(instance.user_id, [(op, instance.pk)])
+        return
+    op = link if action == 'post_add' else unlink
+    if reverse:
+        ops = [(op, recipe_id, instance.pk) for recipe_id in pk_set]
+    else:
+        ops = [(op, instance.pk, other_id) for other_id in pk_set]
+    changes.record(instance.user_id, ops)
+
+
+def record_tags_change(sender, instance, action, reverse, pk_set,
+                       **kwargs):
+    _record_links(
+        instance, action, reverse, pk_set, changes.TAG_LINK,
+        changes.TAG_UNLINK, changes.CLEAR_RECIPE_TAGS, changes.DROP_TAG,
+    )
+
+
+def record_ingredients_change(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    _record_links(
+        instance, action, reverse, pk_set, changes.LINK, changes.UNLINK,
+        changes.CLEAR_RECIPE, changes.DROP_INGREDIENT,
+    )
+
+
+def count_links(sender, instance, action, reverse, model, pk_set,
+                **kwargs):
+    counted = model if not reverse else type(instance)
+    through, column = counters.links(counted)
+    if action == 'post_add':
+        if reverse:
+            counters.adjust(counted, {instance.pk: len(pk_set)})
+        else:
+            counters.adjust(counted, {pk: 1 for pk in pk_set})
+    elif action == 'pre_remove':
+        # pk_set holds the ids asked for, which need not be linked.
+        if reverse:
+            removed = through.objects.filter(
+                **{column: instance.pk}, recipe_id__in=pk_set,
+            ).count()
+            counters.adjust(counted, {instance.pk: -removed})
+        else:
+            linked = through.objects.filter(
+                recipe_id=instance.pk, **{f'{column}__in': pk_set},
+            ).values_list(column, flat=True)
+            counters.adjust(counted, {pk: -1 for pk in linked})
+    elif action == 'pre_clear':
+        if reverse:
+            counted.objects.filter(pk=instance.pk).update(recipe_count=0)
+        else:
+            counters.unlink_recipes([instance.pk], [counted])
+
+
+def connect():
+    post_init.connect(remember_image, sender=Recipe)
+    post_save.connect(count_image, sender=Recipe)
+    post_delete.connect(release_image, sender=Recipe)
+
+    post_save.connect(record_change, sender=Recipe)
+    post_delete.connect(record_recipe_delete, sender=Recipe)
+    for model in (Tag, Ingredient):
+        post_save.connect(record_change, sender=model)
+    post_delete.connect(record_tag_delete, sender=Tag)
+    post_delete.connect(record_ingredient_delete, sender=Ingredient)
+    m2m_changed.connect(record_tags_change, sender=Recipe.tags.through)
+    m2m_changed.connect(
+        record_ingredients_change, sender=Recipe.ingredients.through
+    )
+    for through in (Recipe.tags.through, Recipe.ingredients.through):
+        m2m_changed.connect(count_links, sender=through)
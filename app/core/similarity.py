@@ -0,0 +1,222 @@
+"""
+Precomputed similar recipes.
+
+Recipes are compared by the Jaccard similarity of their tag and
+ingredient sets. Each recipe's SIMILAR_RECIPES['TOP_K'] best neighbours
+are stored as SimilarRecipe rows ranked from 0, so a lookup is one
+indexed read. Rows are computed in a background job from an inverted
+index of the user's links: a recipe is only scored against recipes that
+share a feature with it, which is the sparse product of the recipe x
+feature matrix with its transpose, one row at a time.
+
+Link changes are followed through core.changes. They are merged into one
+queued job per user, which recomputes the changed recipes and the ones
+whose neighbours they may enter or leave. A deleted recipe's rows go
+with it, so lists it was on are one short until their next refresh.
+"""
+import heapq
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from core import changes, jobs
+from core.models import Job, Recipe, SimilarRecipe, User
+
+
+logger = logging.getLogger(__name__)
+
+TASK = 'recipe.refresh_similar'
+
+_LINK_OPS = {
+    changes.LINK, changes.UNLINK, changes.CLEAR_RECIPE,
+    changes.TAG_LINK, changes.TAG_UNLINK, changes.CLEAR_RECIPE_TAGS,
+}
+_DROP_OPS = {changes.DROP_INGREDIENT, changes.DROP_TAG}
+
+
+def features(user_id):
+    """Return {recipe_id: {('tags' | 'ingredients', id), ...}} for a user."""
+    result = defaultdict(set)
+    for field in ('tags', 'ingredients'):
+        through = getattr(Recipe, field).through
+        column = f'{field[:-1]}_id'
+        rows = through.objects.filter(
+            recipe__user_id=user_id
+        ).values_list('recipe_id', column)
+        for recipe_id, other_id in rows.iterator():
+            result[recipe_id].add((field, other_id))
+    return result
+
+
+def _postings(recipe_features):
+    postings = defaultdict(list)
+    for recipe_id, owned in recipe_features.items():
+        for feature in owned:
+            postings[feature].append(recipe_id)
+    return postings
+
+
+def neighbours(recipe_features, recipe_ids, k, postings=None):
+    """
+    Return {recipe_id: [(score, similar_id), ...]} with up to k of the
+    most similar recipes for each of recipe_ids, best first.
+    """
+    if postings is None:
+        postings = _postings(recipe_features)
+    result = {}
+    for recipe_id in recipe_ids:
+        owned = recipe_features.get(recipe_id, ())
+        shared = Counter()
+        for feature in owned:
+            shared.update(postings[feature])
+        shared.pop(recipe_id, None)
+        size = len(owned)
+        result[recipe_id] = heapq.nlargest(k, (
+            (count / (size + len(recipe_features[other]) - count), other)
+            for other, count in shared.items()
+        ))
+    return result
+
+
+def _lock(user_id, recipe_ids):
+    """
+    Serialize refreshes of user_id until commit and return the ids of
+    recipe_ids that still exist, key-share locked so they can't go away.
+    """
+    if connection.vendor != 'postgresql':
+        return set(Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('id', flat=True))
+    with connection.cursor() as cursor:
+        # Only refreshes take advisory locks, so the user id is the key.
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [user_id])
+        cursor.execute(
+            f'SELECT id FROM {Recipe._meta.db_table} WHERE id = ANY(%s) '
+            f'ORDER BY id FOR KEY SHARE',
+            [sorted(recipe_ids)],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def refresh(user_id, recipe_ids=None):
+    """
+    Recompute the neighbour rows of user_id's recipes.
+
+    With recipe_ids, only the rows those recipes' links can affect are
+    rewritten: their own, those of recipes sharing a feature with them,
+    and those of recipes that currently list them. Returns the number of
+    recipes recomputed.
+
+    Neighbours are computed without holding any lock. Only the rewrite
+    is serialized per user, with the recipes it links key-share locked,
+    so rows are never written for a recipe deleted meanwhile (deletes
+    lock their recipes first, see RecipeQuerySet.delete). If the user's
+    data changed during the computation, the refresh is queued again
+    rather than written over a newer one.
+    """
+    version = User.objects.filter(
+        id=user_id
+    ).values_list('data_version', flat=True).first()
+    if version is None:
+        return 0
+    recipe_features = features(user_id)
+    postings = _postings(recipe_features)
+    affected = None
+    if recipe_ids is not None:
+        changed = set(recipe_ids)
+        affected = set(changed)
+        for recipe_id in changed:
+            for feature in recipe_features.get(recipe_id, ()):
+                affected.update(postings[feature])
+        affected.update(SimilarRecipe.objects.filter(
+            similar_id__in=changed
+        ).values_list('recipe_id', flat=True))
+        if len(affected) > len(recipe_features) // 2:
+            # Cheaper to rewrite everything than to list the ids.
+            affected = None
+
+    targets = recipe_features if affected is None else affected
+    computed = neighbours(
+        recipe_features, targets, settings.SIMILAR_RECIPES['TOP_K'],
+        postings,
+    )
+    linked = set(computed).union(*(
+        (similar_id for score, similar_id in best)
+        for best in computed.values()
+    ))
+
+    with transaction.atomic():
+        live = _lock(user_id, linked)
+        current = User.objects.filter(
+            id=user_id
+        ).values_list('data_version', flat=True).first()
+        if current != version:
+            if current is not None:
+                schedule(user_id, recipe_ids)
+            return 0
+        stale = SimilarRecipe.objects.filter(recipe__user_id=user_id)
+        if affected is not None:
+            stale = SimilarRecipe.objects.filter(recipe_id__in=affected)
+        stale.delete()
+        SimilarRecipe.objects.bulk_create([
+            SimilarRecipe(
+                recipe_id=recipe_id, similar_id=similar_id, rank=rank,
+                score=score,
+            )
+            for recipe_id, best in computed.items() if recipe_id in live
+            for rank, (score, similar_id) in enumerate(
+                pair for pair in best if pair[1] in live
+            )
+        ], batch_size=1000)
+    return len(computed)
+
+
+def schedule(user_id, recipe_ids=None):
+    """
+    Queue a refresh of recipe_ids, or of every recipe if None.
+
+    A refresh already queued for the user is widened instead, so a burst
+    of edits costs one job. The row lock keeps a worker from claiming the
+    job while its payload is being merged.
+    """
+    ids = None if recipe_ids is None else sorted(set(recipe_ids))
+    with transaction.atomic():
+        job = Job.objects.select_for_update().filter(
+            task=TASK, status=Job.QUEUED, payload__user_id=user_id,
+        ).first()
+        if job is None:
+            delay = timedelta(seconds=settings.SIMILAR_RECIPES['DELAY'])
+            return jobs.enqueue(
+                TASK, {'user_id': user_id, 'ids': ids},
+                run_at=timezone.now() + delay,
+            )
+        queued = job.payload['ids']
+        if queued is not None:
+            job.payload['ids'] = (
+                None if ids is None else sorted(set(queued) | set(ids))
+            )
+            job.save(update_fields=['payload'])
+        return job
+
+
+@changes.subscribe
+def _follow_changes(user_id, ops):
+    recipe_ids = set()
+    for op, *args in ops:
+        if op in _DROP_OPS:
+            recipe_ids = None
+            break
+        if op in _LINK_OPS:
+            recipe_ids.add(args[0])
+    if recipe_ids == set():
+        return
+    try:
+        schedule(user_id, recipe_ids)
+    except DatabaseError:
+        # The data is already committed; `manage.py build_similar` will
+        # catch the neighbours up.
+        logger.exception('Could not schedule similar recipes refresh')
@@ -0,0 +1,165 @@
+"""
+Slow-query log with asynchronous EXPLAIN capture.
+"""
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from contextlib import ExitStack
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('core.slow_queries')
+
+_queue = queue.Queue(maxsize=1000)
+_worker = None
+_worker_lock = threading.Lock()
+
+_LOCKING_CLAUSE = re.compile(
+    r'\bFOR\s+(UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)\b', re.I,
+)
+
+
+def _configure_logger():
+    log_file = settings.SLOW_QUERY['LOG_FILE']
+    if not log_file or any(
+        isinstance(h, RotatingFileHandler) for h in logger.handlers
+    ):
+        return
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    handler = RotatingFileHandler(
+        log_file,
+        maxBytes=settings.SLOW_QUERY['LOG_MAX_BYTES'],
+        backupCount=settings.SLOW_QUERY['LOG_BACKUP_COUNT'],
+    )
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def analyzable(sql):
+    """
+    Return whether EXPLAIN ANALYZE may run sql again.
+
+    ANALYZE executes the statement on another connection, so only plain
+    SELECTs qualify: a WITH may hide a data-modifying CTE, and a locking
+    SELECT (such as the job claim) would take rows from other workers.
+    """
+    return (
+        sql.lstrip().upper().startswith('SELECT')
+        and not _LOCKING_CLAUSE.search(sql)
+    )
+
+
+def explain(alias, sql, params):
+    """Return the query plan for a statement, or None if unsupported."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return None
+    options = 'ANALYZE, BUFFERS, ' if analyzable(sql) else ''
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN ({options}FORMAT TEXT) {sql}', params)
+        return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+def process(entry):
+    """Capture the plan for a slow query and write it to the log."""
+    # Params can hold token keys and password hashes; only the SQL with
+    # its placeholders is logged.
+    params = entry.pop('params', None)
+    if settings.SLOW_QUERY['EXPLAIN']:
+        try:
+            entry['plan'] = explain(entry['alias'], entry['sql'], params)
+        except Exception as e:
+            entry['plan'] = None
+            entry['explain_error'] = str(e)
+    logger.info(json.dumps(entry, default=str))
+
+
+def _run():
+    while True:
+        entry = _queue.get()
+        try:
+            process(entry)
+        except Exception:
+            logger.exception('Failed to record slow query')
+        finally:
+            connections.close_all()
+            _queue.task_done()
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _configure_logger()
+            _worker = threading.Thread(
+                target=_run, name='slow-query-log', daemon=True
+            )
+            _worker.start()
+
+
+def flush():
+    """Block until every queued slow query has been recorded."""
+    _queue.join()
+
+
+def submit(entry):
+    """Queue a slow query without blocking the request."""
+    _ensure_worker()
+    try:
+        _queue.put_nowait(entry)
+    except queue.Full:
+        pass
+
+
+class SlowQueryMiddleware:
+    """Time every query of a request and queue slow ones for logging."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SLOW_QUERY['ENABLED']:
+            return self.get_response(request)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(
+                    self._wrapper(request, connection.alias)
+                ))
+            return self.get_response(request)
+
+    def _wrapper(self, request, alias):
+        threshold = settings.SLOW_QUERY['THRESHOLD_MS'] / 1000
+
+        def wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = time.perf_counter() - start
+                if duration >= threshold and not many:
+                    match = getattr(request, 'resolver_match', None)
+                    submit({
+                        'alias': alias,
+                        'duration_ms': round(duration * 1000, 3),
+                        'sql': sql,
+                        'params': (
+                            params if isinstance(params, (dict, type(None)))
+                            else list(params)
+                        ),
+                        'view': match.view_name if match else None,
+                        'method': request.method,
+                        'path': request.path,
+                    })
+
+        return wrapper
@@ -0,0 +1,62 @@
+"""
+Content-addressed file storage.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Store each file under the SHA-256 of its content, so identical
+    uploads share one file: <dir>/<hash[:2]>/<hash><ext>.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from content, an existing file is a match.
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        tmp_dir = self.path('tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+
+            hexdigest = digest.hexdigest()
+            name = os.path.join(
+                directory, hexdigest[:2], f'{hexdigest}{ext}'
+            )
+            full_path = self.path(name)
+            # Taken before the existence check, so a concurrent
+            # images.collect() deletes the file either before the check
+            # or not at all.
+            from core import images
+            images.lock(name)
+            if os.path.exists(full_path):
+                os.remove(tmp_path)
+                # Refresh mtime so garbage collection treats it as new.
+                os.utime(full_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(tmp_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
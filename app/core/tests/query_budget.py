@@ -0,0 +1,107 @@
+"""
+Helpers for asserting per-endpoint query budgets.
+"""
+import difflib
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+
+FIXTURE_SIZES = (1, 10, 100)
+
+
+def seed_recipes(user, count, tags=2, ingredients=2):
+    """Top up user's recipes to count, each with tags and ingredients."""
+    existing = Recipe.objects.filter(user=user).count()
+    missing = count - existing
+    if missing <= 0:
+        return
+    recipes = Recipe.objects.bulk_create([
+        Recipe(
+            user=user,
+            title=f'Recipe {existing + i}',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+        for i in range(missing)
+    ])
+    tag_objs = Tag.objects.bulk_create([
+        Tag(user=user, name=f'Tag {existing + i}') for i in range(tags)
+    ])
+    ingredient_objs = Ingredient.objects.bulk_create([
+        Ingredient(user=user, name=f'Ingredient {existing + i}')
+        for i in range(ingredients)
+    ])
+    if not recipes[0].pk:
+        recipes = Recipe.objects.filter(user=user).order_by('-id')[:missing]
+        tag_objs = Tag.objects.filter(user=user).order_by('-id')[:tags]
+        ingredient_objs = Ingredient.objects.filter(
+            user=user).order_by('-id')[:ingredients]
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk)
+        for recipe in recipes for tag in tag_objs
+    ])
+    Recipe.ingredients.through.objects.bulk_create([
+        Recipe.ingredients.through(
+            recipe_id=recipe.pk, ingredient_id=ingredient.pk
+        )
+        for recipe in recipes for ingredient in ingredient_objs
+    ])
+
+
+def _format_queries(queries):
+    return [f'{i + 1}. {sql}' for i, sql in enumerate(queries)]
+
+
+class QueryBudgetMixin:
+    """Assert that an endpoint stays within a fixed number of queries."""
+
+    fixture_sizes = FIXTURE_SIZES
+
+    def assertQueryBudget(self, budget, seed, request, status_code=None):
+        """
+        Call seed(size) then request(seeded) for every fixture size and
+        fail if any run issues more than budget queries.
+        """
+        captured = {}
+        for size in self.fixture_sizes:
+            seeded = seed(size)
+            with CaptureQueriesContext(connection) as ctx:
+                res = request(seeded)
+            if status_code is not None:
+                self.assertEqual(res.status_code, status_code)
+            captured[size] = [q['sql'] for q in ctx.captured_queries]
+
+        over = [s for s, q in captured.items() if len(q) > budget]
+        if not over:
+            return
+
+        baseline_size = self.fixture_sizes[0]
+        baseline = _format_queries(captured[baseline_size])
+        lines = [
+            f'Query budget of {budget} exceeded: ' + ', '.join(
+                f'{s} fixtures -> {len(q)} queries'
+                for s, q in captured.items()
+            ),
+        ]
+        for size in over:
+            lines.append('')
+            if size == baseline_size:
+                lines.append(f'Queries for {size} fixtures:')
+                lines.extend(baseline)
+                continue
+            lines.extend(difflib.unified_diff(
+                baseline,
+                _format_queries(captured[size]),
+                fromfile=f'{baseline_size} fixtures',
+                tofile=f'{size} fixtures',
+                lineterm='',
+            ))
+        self.fail('\n'.join(lines))
@@ -1,35 +1,138 @@
 """
 Test custom Django management commands.
 """
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
 
+from core.models import Recipe, Tag
 
-@patch('core.management.commands.wait_for_db.Command.check')
+
+@patch('core.management.commands.wait_for_db.Command.probe')
 class CommandTests(SimpleTestCase):
     """Test commands."""
 
-    def test_wait_for_db_ready(self, patched_check):
+    def test_wait_for_db_ready(self, patched_probe):
         """Test waiting for database if database ready."""
-        patched_check.return_value = True
+        patched_probe.return_value = True
 
-        call_command('wait_for_db')
+        call_command('wait_for_db', stdout=StringIO())
 
-        patched_check.assert_called_once_with(databases=['default'])
+        patched_probe.assert_called_once_with(False)
 
     @patch('time.sleep')
-    def test_wait_for_db_delay(self, patched_sleep, patched_check):
+    def test_wait_for_db_delay(self, patched_sleep, patched_probe):
         """Test waiting for database when getting OperationalError"""
-        patched_check.side_effect = [Psycopg2OpError] * 2 + \
+        patched_probe.side_effect = [Psycopg2OpError] * 2 + \
             [OperationalError] * 3 + [True]
 
-        call_command('wait_for_db')
+        call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(patched_probe.call_count, 6)
+        self.assertEqual(patched_sleep.call_count, 5)
+
+    @patch('random.uniform', side_effect=lambda low, high: high)
+    @patch('time.sleep')
+    def test_wait_for_db_backoff(self, patched_sleep, patched_uniform,
+                                 patched_probe):
+        """Test retry delays double up to the maximum delay."""
+        patched_probe.side_effect = [OperationalError] * 5 + [True]
+
+        call_command('wait_for_db', initial_delay=1, max_delay=5,
+                     timeout=0, stdout=StringIO())
+
+        delays = [c.args[0] for c in patched_sleep.call_args_list]
+        self.assertEqual(delays, [1, 2, 4, 5, 5])
+
+    @patch('time.monotonic')
+    @patch('time.sleep')
+    def test_wait_for_db_deadline(self, patched_sleep, patched_monotonic,
+                                  patched_probe):
+        """Test giving up once the deadline has passed."""
+        patched_probe.side_effect = OperationalError
+        patched_monotonic.side_effect = [0, 1, 2, 11]
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=10, stdout=StringIO())
+
+        self.assertEqual(patched_probe.call_count, 3)
+
+    @patch('time.sleep')
+    def test_wait_for_db_migrations(self, patched_sleep, patched_probe):
+        """Test --migrations is passed through to the probe."""
+        patched_probe.side_effect = [False, True]
+
+        call_command('wait_for_db', migrations=True, stdout=StringIO())
+
+        patched_probe.assert_called_with(True)
+        self.assertEqual(patched_sleep.call_count, 1)
+
+
+class SeedDataTests(TestCase):
+    """Test the seed_data command."""
+
+    def _seed(self, domain, **options):
+        params = {
+            'users': 5,
+            'recipes_per_user': 4,
+            'tags_per_user': 6,
+            'ingredients_per_user': 8,
+            'tags_per_recipe': 2,
+            'ingredients_per_recipe': 3,
+            'chunk_size': 2,
+            'email_domain': domain,
+            'stdout': StringIO(),
+        }
+        params.update(options)
+        call_command('seed_data', **params)
+        return Recipe.objects.filter(
+            user__email__endswith=f'@{domain}'
+        ).order_by('id')
+
+    def _shape(self, recipes):
+        return [
+            (r.title, r.time_minutes, r.price,
+             sorted(t.name for t in r.tags.all()),
+             sorted(i.name for i in r.ingredients.all()))
+            for r in recipes
+        ]
+
+    def test_seed_data_fixed_counts(self):
+        """Test every user gets the requested fan-out."""
+        recipes = self._seed('a.example.com', distribution='fixed')
+
+        self.assertEqual(recipes.count(), 20)
+        self.assertEqual(
+            Tag.objects.filter(user__email__endswith='@a.example.com').count(),
+            30,
+        )
+        for recipe in recipes:
+            self.assertEqual(recipe.tags.count(), 2)
+            self.assertEqual(recipe.ingredients.count(), 3)
+            self.assertEqual(recipe.tags.exclude(user=recipe.user).count(), 0)
+        self.assertEqual(
+            sum(Tag.objects.filter(
+                user__email__endswith='@a.example.com'
+            ).values_list('recipe_count', flat=True)),
+            40,
+        )
+
+    def test_seed_data_deterministic(self):
+        """Test the same seed produces the same data."""
+        first = self._seed('a.example.com', seed=7)
+        second = self._seed('b.example.com', seed=7)
+
+        self.assertEqual(self._shape(first), self._shape(second))
+
+    def test_seed_data_existing_domain_error(self):
+        """Test seeding twice into the same domain is refused."""
+        self._seed('a.example.com')
 
-        self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
-        # patched_sleep
+        with self.assertRaises(CommandError):
+            self._seed('a.example.com')
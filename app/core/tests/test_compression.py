@@ -0,0 +1,107 @@
+"""
+Tests for the response compression middleware.
+"""
+import gzip
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import compression
+from core.models import Tag
+
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def compression_settings(**params):
+    config = {
+        'ENABLED': True,
+        'MIN_SIZE': 1024,
+        'GZIP_LEVEL': 5,
+        'BROTLI_QUALITY': 6,
+        'CONTENT_TYPES': ['application/json'],
+    }
+    config.update(params)
+    return override_settings(COMPRESSION=config)
+
+
+class CompressionTests(TestCase):
+    """Test compressing API responses."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        Tag.objects.bulk_create([
+            Tag(user=self.user, name=f'Tag number {i}') for i in range(100)
+        ])
+
+    def test_gzip_large_json(self):
+        """Test large JSON responses are gzipped when accepted."""
+        with compression_settings():
+            res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        body = gzip.decompress(res.content)
+        self.assertIn(b'Tag number 99', body)
+        self.assertEqual(int(res['Content-Length']), len(res.content))
+
+    @skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        """Test brotli is chosen over gzip when both are accepted."""
+        with compression_settings():
+            res = self.client.get(
+                TAGS_URL, HTTP_ACCEPT_ENCODING='gzip, deflate, br'
+            )
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        body = compression.brotli.decompress(res.content)
+        self.assertIn(b'Tag number 99', body)
+
+    def test_small_response_not_compressed(self):
+        """Test responses under MIN_SIZE are sent as is."""
+        with compression_settings(MIN_SIZE=100000):
+            res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_not_accepted(self):
+        """Test nothing is compressed without Accept-Encoding."""
+        with compression_settings():
+            res = self.client.get(TAGS_URL)
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_zero_q_value_refused(self):
+        """Test a coding with q=0 is never used."""
+        with compression_settings():
+            res = self.client.get(
+                TAGS_URL, HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0'
+            )
+
+        self.assertNotIn('Content-Encoding', res)
+
+    def test_choose_encoding_q_values(self):
+        """Test q-values and the wildcard are respected."""
+        self.assertEqual(
+            compression.choose_encoding('br;q=0, gzip;q=0.5'), 'gzip'
+        )
+        self.assertIsNone(compression.choose_encoding('gzip; q=0.000'))
+        self.assertIsNone(compression.choose_encoding('*;q=0, identity'))
+        self.assertEqual(compression.choose_encoding('*, br;q=0'), 'gzip')
+
+    def test_disabled(self):
+        """Test the middleware does nothing when disabled."""
+        with compression_settings(ENABLED=False):
+            res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
@@ -0,0 +1,99 @@
+"""
+Tests for the recipe counts on tags and ingredients.
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import cloning, counters
+from core.models import Ingredient, Recipe, Tag
+from recipe.tests.test_recipe_api import create_recipe
+
+
+class RecipeCountTests(TestCase):
+    """Test recipe_count follows the through tables."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.r1 = create_recipe(user=self.user)
+        self.r2 = create_recipe(user=self.user)
+
+    def assertCounts(self, **expected):
+        for name, count in expected.items():
+            obj = getattr(self, name)
+            obj.refresh_from_db()
+            self.assertEqual(obj.recipe_count, count, name)
+
+    def test_add_remove_and_clear(self):
+        """Test adding, removing and clearing links from recipes."""
+        self.r1.tags.add(self.vegan, self.quick)
+        self.r2.tags.add(self.vegan)
+        self.assertCounts(vegan=2, quick=1)
+
+        self.r1.tags.remove(self.vegan)
+        self.r2.tags.remove(self.quick)
+        self.assertCounts(vegan=1, quick=1)
+
+        self.r1.tags.clear()
+        self.assertCounts(vegan=1, quick=0)
+
+    def test_reverse_add_remove_and_clear(self):
+        """Test changing links from the tag's side."""
+        self.vegan.recipe_set.add(self.r1, self.r2)
+        self.assertCounts(vegan=2)
+
+        self.vegan.recipe_set.remove(self.r1)
+        self.assertCounts(vegan=1)
+
+        self.vegan.recipe_set.clear()
+        self.assertCounts(vegan=0)
+
+    def test_recipe_delete(self):
+        """Test deleting recipes releases their counts."""
+        for recipe in (self.r1, self.r2):
+            recipe.tags.add(self.vegan)
+            recipe.ingredients.add(self.rice)
+
+        self.r1.delete()
+        self.assertCounts(vegan=1, rice=1)
+
+        Recipe.objects.filter(user=self.user).delete()
+        self.assertCounts(vegan=0, rice=0)
+
+    def test_clone(self):
+        """Test cloned links are counted."""
+        self.r1.tags.add(self.vegan)
+        self.r1.ingredients.add(self.rice)
+
+        cloning.clone_recipes([self.r1, self.r1])
+
+        self.assertCounts(vegan=3, rice=3)
+
+    def test_reconcile(self):
+        """Test drifted counts are recounted."""
+        self.r1.tags.add(self.vegan)
+        Tag.objects.filter(pk=self.vegan.pk).update(recipe_count=7)
+        Tag.objects.filter(pk=self.quick.pk).update(recipe_count=2)
+
+        fixed = counters.reconcile(Tag, batch_size=1)
+
+        self.assertEqual(fixed, 2)
+        self.assertCounts(vegan=1, quick=0)
+
+    def test_reconcile_command(self):
+        """Test the command reports what it fixed."""
+        Ingredient.objects.filter(pk=self.rice.pk).update(recipe_count=3)
+        out = StringIO()
+
+        call_command('reconcile_counts', stdout=out)
+
+        self.assertIn('Fixed 0 tags.', out.getvalue())
+        self.assertIn('Fixed 1 ingredients.', out.getvalue())
+        self.assertCounts(rice=0)
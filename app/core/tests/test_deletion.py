@@ -0,0 +1,64 @@
+"""
+Tests for batched deletion.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import deletion
+from core.models import Ingredient, Recipe, Tag
+from core.tests.query_budget import seed_recipes
+
+
+class DeletionTests(TestCase):
+    """Test deleting large accounts in batches."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123',
+        )
+        seed_recipes(self.user, 7)
+        seed_recipes(self.other, 2)
+
+    def test_delete_in_batches(self):
+        """Test rows are deleted batch by batch with progress."""
+        batches = []
+
+        deleted = deletion.delete_in_batches(
+            Recipe.objects.filter(user=self.user),
+            batch_size=3,
+            on_batch=batches.append,
+        )
+
+        self.assertEqual(deleted, 7)
+        self.assertEqual(batches, [3, 6, 7])
+        self.assertEqual(Recipe.objects.filter(user=self.other).count(), 2)
+
+    def test_batch_queries_are_bounded(self):
+        """Test each batch costs the same number of queries."""
+        queryset = Recipe.objects.filter(user=self.user)
+        with self.assertNumQueries(13):
+            deletion.delete_in_batches(queryset, batch_size=7)
+
+    def test_delete_user(self):
+        """Test a user and everything they own are deleted."""
+        reports = []
+
+        progress = deletion.delete_user(
+            self.user, batch_size=4,
+            on_progress=lambda p: reports.append(
+                {name: dict(counts) for name, counts in p.items()}
+            ),
+        )
+
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        for model in (Recipe, Tag, Ingredient):
+            self.assertFalse(model.objects.filter(user=self.user).exists())
+            self.assertTrue(model.objects.filter(user=self.other).exists())
+        self.assertEqual(progress['recipes'], {'deleted': 7, 'total': 7})
+        self.assertEqual(reports[0]['recipes'], {'deleted': 4, 'total': 7})
+        self.assertEqual(reports[0]['tags']['deleted'], 0)
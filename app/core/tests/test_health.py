@@ -0,0 +1,54 @@
+"""
+Tests for the health check endpoints.
+"""
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthTests(TestCase):
+    """Test liveness and readiness endpoints."""
+
+    def test_healthz(self):
+        """Test liveness needs no database or auth."""
+        with self.assertNumQueries(0):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    def test_readyz_ok(self):
+        """Test readiness when migrated and reachable."""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('Set-Cookie', res)
+
+    def test_readyz_cached_migration_check(self):
+        """Test only a trivial query runs once migrations are known."""
+        self.client.get(READYZ_URL)
+
+        with self.assertNumQueries(1):
+            self.client.get(READYZ_URL)
+
+    @patch('core.health.probe_database', side_effect=OperationalError)
+    def test_readyz_database_unreachable(self, patched_probe):
+        """Test readiness fails when the database is unreachable."""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['database'], 'unreachable')
+
+    @patch('core.health.pending_migrations', return_value=['core.0099'])
+    def test_readyz_pending_migrations(self, patched_pending):
+        """Test readiness fails while migrations are pending."""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['pending_migrations'], ['core.0099'])
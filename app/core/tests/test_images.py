@@ -0,0 +1,274 @@
+"""
+Tests for content-addressed image storage and reference counting.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core import cloning, images, models
+from core.storage import ContentAddressedStorage
+from recipe.tests.test_recipe_api import create_recipe
+
+
+# SQLite's shared in-memory test database fails with "table is locked"
+# instead of waiting, so threads only contend on PostgreSQL.
+THREADS = 3 if connection.vendor == 'postgresql' else 1
+NO_GRACE = {'GRACE_SECONDS': 0, 'BATCH_SIZE': 2, 'WORKERS': 1}
+
+
+class ImageStorageMixin:
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.user = models.User.objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def ref_count(self, name):
+        return models.ImageBlob.objects.get(name=name).ref_count
+
+    def set_image(self, recipe, data, filename='photo.JPG'):
+        recipe.image.save(filename, ContentFile(data))
+        return recipe.image.name
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def write_orphan(self, name, age=0):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'orphan')
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+
+class ImageStorageTestBase(ImageStorageMixin, TestCase):
+    pass
+
+
+class ContentAddressedStorageTests(ImageStorageTestBase):
+    """Test files are stored under the hash of their content."""
+
+    def test_name_is_content_hash(self):
+        """Test the stored name is derived from the SHA-256 of the bytes."""
+        storage = ContentAddressedStorage()
+        name = storage.save('uploads/recipe/photo.JPG', ContentFile(b'abc'))
+
+        digest = hashlib.sha256(b'abc').hexdigest()
+        self.assertEqual(
+            name, f'uploads/recipe/{digest[:2]}/{digest}.jpg'
+        )
+        with storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'abc')
+        self.assertEqual(os.listdir(storage.path('tmp')), [])
+
+    def test_identical_content_shares_file(self):
+        """Test saving the same bytes twice keeps a single file."""
+        storage = ContentAddressedStorage()
+        first = storage.save('uploads/recipe/a.jpg', ContentFile(b'same'))
+        second = storage.save('uploads/recipe/b.jpg', ContentFile(b'same'))
+        other = storage.save('uploads/recipe/c.jpg', ContentFile(b'diff'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        directory = os.path.dirname(storage.path(first))
+        self.assertEqual(os.listdir(directory), [os.path.basename(first)])
+
+
+class ImageRefCountTests(ImageStorageTestBase):
+    """Test ImageBlob counts follow Recipe.image."""
+
+    def test_shared_image_counted_per_recipe(self):
+        """Test two recipes with the same bytes hold two references."""
+        first = create_recipe(user=self.user)
+        second = create_recipe(user=self.user)
+
+        name = self.set_image(first, b'photo')
+        self.assertEqual(self.set_image(second, b'photo'), name)
+
+        self.assertEqual(self.ref_count(name), 2)
+
+    def test_replacing_image_moves_reference(self):
+        """Test replacing an image releases the old reference."""
+        recipe = create_recipe(user=self.user)
+        old = self.set_image(recipe, b'old')
+        new = self.set_image(recipe, b'new')
+
+        self.assertEqual(self.ref_count(old), 0)
+        self.assertEqual(self.ref_count(new), 1)
+
+    def test_saving_unchanged_image_keeps_count(self):
+        """Test saving other fields does not touch the count."""
+        recipe = create_recipe(user=self.user)
+        name = self.set_image(recipe, b'photo')
+
+        recipe = models.Recipe.objects.get(id=recipe.id)
+        recipe.title = 'Renamed'
+        recipe.save()
+
+        self.assertEqual(self.ref_count(name), 1)
+
+    def test_clone_adds_references(self):
+        """Test clones share the image and count as references."""
+        recipe = create_recipe(user=self.user)
+        name = self.set_image(recipe, b'photo')
+
+        copies = cloning.clone_recipes([recipe, recipe])
+
+        self.assertEqual([copy.image.name for copy in copies], [name, name])
+        self.assertEqual(self.ref_count(name), 3)
+
+    def test_delete_releases_reference(self):
+        """Test deleting a recipe, directly or by cascade, decrements."""
+        recipe = create_recipe(user=self.user)
+        name = self.set_image(recipe, b'photo')
+        self.set_image(create_recipe(user=self.user), b'photo')
+
+        recipe.delete()
+        self.assertEqual(self.ref_count(name), 1)
+
+        self.user.delete()
+        self.assertEqual(self.ref_count(name), 0)
+
+
+@override_settings(IMAGE_GC=NO_GRACE)
+class ImageCollectionTests(ImageStorageTestBase):
+    """Test unreferenced files are deleted once the change commits."""
+
+    def test_replaced_image_deleted_on_commit(self):
+        """Test the previous file is removed after replacing an image."""
+        recipe = create_recipe(user=self.user)
+        old = self.set_image(recipe, b'old')
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.set_image(recipe, b'new')
+        self.assertTrue(self.exists(old))
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(self.exists(old))
+        self.assertFalse(models.ImageBlob.objects.filter(name=old).exists())
+        self.assertTrue(self.exists(recipe.image.name))
+
+    def test_shared_file_kept_until_last_reference(self):
+        """Test a shared file survives until its last recipe is gone."""
+        recipe = create_recipe(user=self.user)
+        name = self.set_image(recipe, b'photo')
+        self.set_image(create_recipe(user=self.user), b'photo')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertTrue(self.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertFalse(self.exists(name))
+
+    def test_reused_file_locked_before_check(self):
+        """Test saving a known file locks its blob before reusing it."""
+        name = self.set_image(create_recipe(user=self.user), b'photo')
+        recipe = create_recipe(user=self.user)
+        recipe.image = ContentFile(b'photo', name='photo.JPG')
+
+        with CaptureQueriesContext(connection) as queries:
+            recipe.save()
+
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertIn('"core_imageblob"', sql[0])
+        if connection.features.has_select_for_update:
+            self.assertIn('FOR UPDATE', sql[0])
+        self.assertEqual(recipe.image.name, name)
+        self.assertEqual(self.ref_count(name), 2)
+
+    @override_settings(IMAGE_GC=dict(NO_GRACE, GRACE_SECONDS=3600))
+    def test_recent_file_collected_on_commit(self):
+        """Test the scan's grace window does not delay collection."""
+        recipe = create_recipe(user=self.user)
+        name = self.set_image(recipe, b'photo')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+
+        self.assertFalse(self.exists(name))
+        self.assertFalse(models.ImageBlob.objects.filter(name=name).exists())
+
+
+@override_settings(IMAGE_GC=NO_GRACE)
+class ImageScanTests(ImageStorageTestBase):
+    """Test the gc_images command."""
+
+    def test_walk_streams_nested_files(self):
+        """Test walk yields files from nested directories only."""
+        self.write_orphan('uploads/recipe/aa/one.jpg')
+        self.write_orphan('uploads/recipe/two.jpg')
+        os.symlink(
+            self.media_root,
+            os.path.join(self.media_root, 'uploads/recipe/loop'),
+        )
+
+        root = os.path.join(self.media_root, 'uploads/recipe')
+        names = sorted(name for name, path, mtime in images.walk(root))
+
+        self.assertEqual(names, ['aa/one.jpg', 'two.jpg'])
+
+    def test_scan_removes_only_orphans(self):
+        """Test referenced and recent files are kept."""
+        name = self.set_image(create_recipe(user=self.user), b'photo')
+        self.write_orphan('uploads/recipe/ab/orphan.jpg', age=7200)
+        self.write_orphan('uploads/recipe/legacy.jpg', age=7200)
+        self.write_orphan('uploads/recipe/fresh.jpg')
+
+        out = StringIO()
+        call_command('gc_images', grace=60, workers=1, stdout=out)
+
+        self.assertIn('Removed 2 orphaned of 4 files', out.getvalue())
+        self.assertTrue(self.exists(name))
+        self.assertTrue(self.exists('uploads/recipe/fresh.jpg'))
+        self.assertFalse(self.exists('uploads/recipe/ab/orphan.jpg'))
+        self.assertFalse(self.exists('uploads/recipe/legacy.jpg'))
+
+    def test_dry_run_keeps_files(self):
+        """Test --dry-run only reports orphans."""
+        self.write_orphan('uploads/recipe/orphan.jpg')
+
+        out = StringIO()
+        call_command('gc_images', dry_run=True, workers=1, stdout=out)
+
+        self.assertIn('Found 1 orphaned of 1 files', out.getvalue())
+        self.assertTrue(self.exists('uploads/recipe/orphan.jpg'))
+
+
+@override_settings(IMAGE_GC=NO_GRACE)
+class ParallelImageScanTests(ImageStorageMixin, TransactionTestCase):
+    """Test scanning batches on several threads."""
+
+    def test_parallel_scan(self):
+        """Test orphans are found across batches on worker threads."""
+        recipe = create_recipe(user=self.user)
+        names = [self.set_image(recipe, b'first')]
+        names.append(self.set_image(create_recipe(user=self.user), b'two'))
+        for index in range(5):
+            self.write_orphan(f'uploads/recipe/orphan{index}.jpg')
+
+        seen, removed = images.scan(batch_size=2, workers=THREADS)
+
+        self.assertEqual(seen, 7)
+        self.assertEqual(len(removed), 5)
+        for name in names:
+            self.assertTrue(self.exists(name))
@@ -0,0 +1,227 @@
+"""
+Tests for database backed background jobs.
+"""
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+
+calls = []
+
+# SQLite's shared in-memory test database fails with "table is locked"
+# instead of waiting, so threads only contend on PostgreSQL.
+THREADS = 2 if connection.vendor == 'postgresql' else 1
+
+
+@jobs.task('tests.record')
+def record(job, value):
+    calls.append(value)
+    return {'value': value}
+
+
+@jobs.task('tests.explode')
+def explode(job):
+    raise RuntimeError('boom')
+
+
+@jobs.task('tests.nap')
+def nap(job, seconds):
+    time.sleep(seconds)
+
+
+@override_settings(TASKS={
+    'MAX_ATTEMPTS': 3, 'BACKOFF_BASE': 10, 'BACKOFF_MAX': 100,
+    'POLL_INTERVAL': 0.01, 'LOCK_TIMEOUT': 60, 'REQUEUE_INTERVAL': 60,
+})
+class JobTests(TestCase):
+    """Test enqueueing, claiming and running jobs."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_and_run(self):
+        """Test a due job is claimed once and its result stored."""
+        job = jobs.enqueue(record, {'value': 7})
+
+        claimed = jobs.claim('worker-1')
+        self.assertEqual([j.id for j in claimed], [job.id])
+        self.assertEqual(jobs.claim('worker-2'), [])
+
+        jobs.run(claimed[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.result, {'value': 7})
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.locked_by, '')
+        self.assertEqual(calls, [7])
+
+    def test_future_job_not_claimed(self):
+        """Test jobs are not claimed before run_at."""
+        jobs.enqueue(
+            'tests.record', {'value': 1},
+            run_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        self.assertEqual(jobs.claim('worker'), [])
+
+    def test_claim_in_run_at_order(self):
+        """Test the oldest due jobs are claimed first up to limit."""
+        now = timezone.now()
+        late = jobs.enqueue(record, {'value': 1}, run_at=now)
+        early = jobs.enqueue(
+            record, {'value': 2}, run_at=now - timedelta(minutes=1)
+        )
+        jobs.enqueue(record, {'value': 3}, run_at=now)
+
+        claimed = jobs.claim('worker', limit=2)
+
+        self.assertEqual([j.id for j in claimed], [early.id, late.id])
+
+    def test_failure_retried_with_backoff(self):
+        """Test a failing job is requeued later, then marked failed."""
+        job = jobs.enqueue(explode)
+
+        before = timezone.now()
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.run(jobs.claim('worker')[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=5))
+        self.assertLessEqual(
+            job.run_at, timezone.now() + timedelta(seconds=10)
+        )
+
+        with self.assertLogs('core.jobs', 'WARNING') as logs:
+            for attempt in range(2):
+                Job.objects.filter(id=job.id).update(run_at=timezone.now())
+                jobs.run(jobs.claim('worker')[0])
+        self.assertIn('failed permanently', logs.output[-1])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_backoff_doubles_up_to_max(self):
+        """Test retry delays grow exponentially and are capped."""
+        self.assertTrue(5 <= jobs.backoff(1) <= 10)
+        self.assertTrue(10 <= jobs.backoff(2) <= 20)
+        self.assertTrue(50 <= jobs.backoff(10) <= 100)
+
+    def test_requeue_stale(self):
+        """Test jobs abandoned by a dead worker return to the queue."""
+        job = jobs.enqueue(record, {'value': 1})
+        jobs.claim('worker')
+        Job.objects.filter(id=job.id).update(
+            locked_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+
+    def test_heartbeat_keeps_running_job(self):
+        """Test a job whose worker is alive is not requeued."""
+        job = jobs.enqueue(record, {'value': 1})
+        jobs.claim('worker')
+        Job.objects.filter(id=job.id).update(
+            locked_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        self.assertEqual(jobs.heartbeat(['worker']), 1)
+        self.assertEqual(jobs.requeue_stale(), 0)
+
+    def test_report_refreshes_lock(self):
+        """Test reporting progress also marks the job as alive."""
+        jobs.enqueue(record, {'value': 1})
+        job = jobs.claim('worker')[0]
+        Job.objects.filter(id=job.id).update(
+            locked_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        jobs.report(job, done=1)
+
+        self.assertEqual(jobs.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.progress, {'done': 1})
+
+    def test_requeued_job_outcome_not_overwritten(self):
+        """Test a worker that lost its job leaves the new run alone."""
+        jobs.enqueue(record, {'value': 1})
+        lost = jobs.claim('first')[0]
+        Job.objects.filter(id=lost.id).update(
+            locked_at=timezone.now() - timedelta(minutes=5)
+        )
+        jobs.requeue_stale()
+        jobs.claim('second')
+
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.run(lost)
+
+        job = Job.objects.get(id=lost.id)
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.locked_by, 'second')
+
+    def test_admin_retry_action(self):
+        """Test failed jobs can be retried from the admin."""
+        admin = get_user_model().objects.create_superuser(
+            'admin@example.com', 'testpass123',
+        )
+        self.client.force_login(admin)
+        job = jobs.enqueue(explode)
+        Job.objects.filter(id=job.id).update(status=Job.FAILED, attempts=3)
+
+        res = self.client.post(reverse('admin:core_job_changelist'), {
+            'action': 'retry_jobs', '_selected_action': [job.id],
+        })
+
+        self.assertEqual(res.status_code, 302)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 0)
+
+
+class WorkerCommandTests(TransactionTestCase):
+    """Test the run_worker command."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_drains_queue(self):
+        """Test --once runs every due job across threads and exits."""
+        for value in range(5):
+            jobs.enqueue(record, {'value': value})
+
+        out = StringIO()
+        call_command(
+            'run_worker', concurrency=THREADS, once=True, stdout=out,
+        )
+
+        self.assertEqual(sorted(calls), list(range(5)))
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 5)
+        self.assertIn('Worker stopped.', out.getvalue())
+
+    def test_worker_requeues_stale_jobs_periodically(self):
+        """Test a running worker keeps requeueing abandoned jobs."""
+        jobs.enqueue(nap, {'seconds': 0.7})
+
+        config = dict(settings.TASKS, REQUEUE_INTERVAL=0.1)
+        with override_settings(TASKS=config), \
+                patch.object(jobs, 'requeue_stale', return_value=0) as requeue:
+            call_command(
+                'run_worker', concurrency=1, once=True, stdout=StringIO(),
+            )
+
+        self.assertGreaterEqual(requeue.call_count, 2)
@@ -0,0 +1,74 @@
+"""
+Tests for the path aware browser middleware.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class LeanMiddlewareTests(TestCase):
+    """Test browser middleware only runs outside API paths."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser(
+            'admin@example.com', 'testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def test_api_skips_browser_middleware(self):
+        """Test API responses carry no session or clickjacking state."""
+        client = APIClient(enforce_csrf_checks=True)
+        client.cookies['sessionid'] = 'stale'
+
+        with self.assertNumQueries(2):
+            res = client.get(
+                TAGS_URL, HTTP_AUTHORIZATION=f'Token {self.token.key}'
+            )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('X-Frame-Options', res)
+        self.assertNotIn('sessionid', res.cookies)
+
+    def test_api_post_without_csrf_token(self):
+        """Test token-authenticated writes need no CSRF token."""
+        client = APIClient(enforce_csrf_checks=True)
+
+        res = client.post(
+            INGREDIENTS_URL,
+            {'name': 'Salt'},
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+
+        self.assertEqual(res.status_code, 201)
+
+    def test_admin_keeps_browser_middleware(self):
+        """Test the admin still gets sessions and clickjacking headers."""
+        self.client.force_login(self.user)
+
+        res = self.client.get(reverse('admin:index'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['X-Frame-Options'], 'DENY')
+
+    def test_api_docs_keep_browser_middleware(self):
+        """Test the Swagger page under /api/ keeps clickjacking headers."""
+        res = self.client.get(reverse('api-docs'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['X-Frame-Options'], 'DENY')
+
+    def test_admin_post_requires_csrf(self):
+        """Test CSRF protection still applies to the admin."""
+        client = APIClient(enforce_csrf_checks=True)
+        client.force_login(self.user)
+
+        res = client.post(reverse('admin:logout'))
+
+        self.assertEqual(res.status_code, 403)
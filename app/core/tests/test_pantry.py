@@ -0,0 +1,162 @@
+"""
+Tests for pantry matching and per-user change tracking.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+
+from core import changes, pantry
+from core.models import Ingredient, Recipe
+from core.pantry import PantryIndex
+from recipe.tests.test_recipe_api import create_recipe
+
+
+class PantryIndexTests(TestCase):
+    """Test matching against in-memory bitsets."""
+
+    def setUp(self):
+        # Recipe 1 needs a, b; recipe 2 needs a; recipe 3 needs a, b, c.
+        self.index = PantryIndex(0, [
+            (1, 'a'), (1, 'b'), (2, 'a'), (3, 'a'), (3, 'b'), (3, 'c'),
+        ])
+
+    def test_makeable_first_then_fewest_missing(self):
+        """Test ranking by missing count, then by size."""
+        self.assertEqual(self.index.match(['a', 'b']), [
+            (1, 0, 2), (2, 0, 1), (3, 1, 3),
+        ])
+        self.assertEqual(self.index.match([]), [
+            (2, 1, 1), (1, 2, 2), (3, 3, 3),
+        ])
+
+    def test_limit_and_max_missing(self):
+        """Test results are cut by limit and max_missing."""
+        self.assertEqual(self.index.match(['a'], limit=1), [(2, 0, 1)])
+        self.assertEqual(
+            self.index.match(['a'], max_missing=1), [(2, 0, 1), (1, 1, 2)]
+        )
+
+    def test_unknown_pantry_ingredients_ignored(self):
+        """Test pantry ids no recipe uses do not matter."""
+        self.assertEqual(
+            self.index.match(['a', 'z']), self.index.match(['a'])
+        )
+
+    def test_apply_changes(self):
+        """Test link, unlink and drop operations update the masks."""
+        self.index.apply([
+            (changes.LINK, 2, 'd'),
+            (changes.UNLINK, 3, 'c'),
+            (changes.DROP_RECIPE, 1),
+            (changes.DROP_INGREDIENT, 'b'),
+        ])
+
+        self.assertEqual(self.index.version, 1)
+        self.assertEqual(self.index.match(['a']), [(3, 0, 1), (2, 1, 2)])
+
+
+class PantryChangeTests(TransactionTestCase):
+    """Test indexes follow committed writes through core.changes."""
+
+    def setUp(self):
+        pantry.reset()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.recipe = create_recipe(user=self.user)
+        self.recipe.ingredients.add(self.salt)
+        self.user.refresh_from_db()
+
+    def test_version_bumped_once_per_transaction(self):
+        """Test several writes in one transaction bump the version once."""
+        version = self.user.data_version
+        with transaction.atomic():
+            self.recipe.ingredients.add(self.rice)
+            self.recipe.title = 'Renamed'
+            self.recipe.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.data_version, version + 1)
+
+    def test_index_follows_local_writes(self):
+        """Test committed changes are applied without a rebuild."""
+        index = pantry.get_index(self.user)
+        self.assertEqual(index.match([self.salt.id]), [(self.recipe.id, 0, 1)])
+
+        with transaction.atomic():
+            self.recipe.ingredients.add(self.rice)
+        self.user.refresh_from_db()
+
+        with self.assertNumQueries(0):
+            same = pantry.get_index(self.user)
+        self.assertIs(same, index)
+        self.assertEqual(index.match([self.salt.id]), [(self.recipe.id, 1, 2)])
+
+    def test_index_rebuilt_after_foreign_write(self):
+        """Test a version bump this process did not see forces a rebuild."""
+        other = create_recipe(user=self.user)
+        self.user.refresh_from_db()
+        index = pantry.get_index(self.user)
+        # As another process would: the write and bump, but no callback.
+        Recipe.ingredients.through.objects.create(
+            recipe=other, ingredient=self.rice,
+        )
+        get_user_model().objects.filter(id=self.user.id).update(
+            data_version=F('data_version') + 1
+        )
+        self.user.refresh_from_db()
+
+        rebuilt = pantry.get_index(self.user)
+
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.match([self.rice.id])[0], (other.id, 0, 1))
+
+    def test_rolled_back_changes_not_applied(self):
+        """Test changes in a rolled back savepoint never reach the index."""
+        index = pantry.get_index(self.user)
+
+        try:
+            with transaction.atomic():
+                self.recipe.ingredients.add(self.rice)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertEqual(index.version, self.user.data_version)
+        self.assertEqual(index.match([self.salt.id]), [(self.recipe.id, 0, 1)])
+
+    def test_rolled_back_savepoint_ops_dropped(self):
+        """Test ops from a rolled back savepoint are not applied on commit."""
+        index = pantry.get_index(self.user)
+
+        with transaction.atomic():
+            self.recipe.ingredients.add(self.rice)
+            try:
+                with transaction.atomic():
+                    self.recipe.ingredients.remove(self.salt)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.user.refresh_from_db()
+
+        self.assertEqual(index.version, self.user.data_version)
+        self.assertEqual(index.match([self.salt.id]), [(self.recipe.id, 1, 2)])
+
+    def test_rolled_back_bump_repeated(self):
+        """Test a bump undone with its savepoint is made again."""
+        version = self.user.data_version
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    self.recipe.ingredients.add(self.rice)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.recipe.ingredients.remove(self.salt)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.data_version, version + 1)
@@ -0,0 +1,155 @@
+"""
+Tests for the sampling profiler.
+"""
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import profiling
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def profiler_settings(directory, **params):
+    config = {
+        'ENABLED': True,
+        'SAMPLE_RATE': 0.0,
+        'INTERVAL': 0.001,
+        'DIR': directory,
+        'MAX_FILES': 3,
+    }
+    config.update(params)
+    return override_settings(PROFILER=config)
+
+
+class ProfilerTests(TestCase):
+    """Test opt-in profiling of requests."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = APIClient()
+        self.staff = get_user_model().objects.create_user(
+            email='staff@example.com',
+            password='testpass123',
+            is_staff=True,
+        )
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _get(self, user, **headers):
+        token = Token.objects.get_or_create(user=user)[0]
+        return self.client.get(
+            RECIPE_URL,
+            HTTP_AUTHORIZATION=f'Token {token.key}',
+            **headers,
+        )
+
+    def test_staff_opt_in_writes_profile(self):
+        """Test a staff request with the header is profiled."""
+        with profiler_settings(self.tmp.name):
+            res = self._get(self.staff, HTTP_X_PROFILE='1')
+            names = profiling.list_profiles()
+
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(len(names), 1)
+            data = profiling.load_profile(names[0])
+            self.assertEqual(data['path'], RECIPE_URL)
+            self.assertEqual(data['view'], 'recipe:recipe-list')
+
+    def test_query_string_not_stored(self):
+        """Test the profile keeps the path without its query string."""
+        with profiler_settings(self.tmp.name, SAMPLE_RATE=1.0):
+            self.client.get(RECIPE_URL, {'token': 'secret'})
+            data = profiling.load_profile(profiling.list_profiles()[0])
+
+        self.assertEqual(data['path'], RECIPE_URL)
+
+    def test_non_staff_opt_in_ignored(self):
+        """Test the opt-in header is ignored for regular users."""
+        with profiler_settings(self.tmp.name):
+            self._get(self.user, HTTP_X_PROFILE='1')
+
+            self.assertEqual(profiling.list_profiles(), [])
+
+    def test_disabled_ignores_opt_in(self):
+        """Test nothing is profiled when the profiler is disabled."""
+        with profiler_settings(self.tmp.name, ENABLED=False):
+            self._get(self.staff, HTTP_X_PROFILE='1')
+
+            self.assertEqual(profiling.list_profiles(), [])
+
+    def test_sample_rate_profiles_anonymous(self):
+        """Test random sampling applies to every request."""
+        with profiler_settings(self.tmp.name, SAMPLE_RATE=1.0):
+            self.client.get(RECIPE_URL)
+
+            self.assertEqual(len(profiling.list_profiles()), 1)
+
+    def test_write_failure_does_not_fail_request(self):
+        """Test an unwritable profile directory still serves the request."""
+        with profiler_settings(self.tmp.name, SAMPLE_RATE=1.0), \
+                patch.object(profiling, 'write_profile',
+                             side_effect=OSError('disk full')), \
+                self.assertLogs('core.profiling', level='ERROR'):
+            res = self._get(self.staff)
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_ring_buffer_is_bounded(self):
+        """Test the oldest profiles are dropped past MAX_FILES."""
+        with profiler_settings(self.tmp.name):
+            for i in range(5):
+                profiling.write_profile({'i': i})
+            names = profiling.list_profiles()
+
+            self.assertEqual(len(names), 3)
+            kept = [profiling.load_profile(n)['i'] for n in names]
+            self.assertEqual(kept, [2, 3, 4])
+
+    def test_command_exports_collapsed_stacks(self):
+        """Test the profiles command exports collapsed stacks."""
+        data = {
+            'method': 'GET', 'path': '/api/', 'status': 200,
+            'duration_ms': 1.0, 'samples': 3,
+            'stacks': {'main;handler;query': 2, 'main;handler': 1},
+        }
+        with profiler_settings(self.tmp.name):
+            name = profiling.write_profile(data)
+            out = StringIO()
+            call_command('profiles', export=name, stdout=out)
+
+            self.assertEqual(
+                out.getvalue(), 'main;handler;query 2\nmain;handler 1\n'
+            )
+
+    def test_sampler_collects_stacks(self):
+        """Test the sampler records the sampled thread's stack."""
+        import threading
+        import time
+
+        sampler = profiling.StackSampler(threading.get_ident(), 0.001)
+        sampler.start()
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        sampler.stop()
+
+        self.assertGreater(sampler.samples, 0)
+        self.assertTrue(any(
+            'test_sampler_collects_stacks' in stack
+            for stack in sampler.stacks
+        ))
@@ -0,0 +1,112 @@
+"""
+Tests for resized image renditions.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from PIL import Image
+from django.test import SimpleTestCase, override_settings
+
+from core import renditions
+
+
+RENDITIONS = {
+    'DIR': 'renditions',
+    'WIDTHS': [160, 320],
+    'FORMATS': ['jpeg', 'png', 'webp'],
+    'QUALITY': 80,
+    'MAX_BYTES': 10 ** 9,
+    'EVICT_FRACTION': 0.05,
+}
+
+
+class RenditionTests(SimpleTestCase):
+    """Test rendering and caching renditions."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(
+            MEDIA_ROOT=self.media_root, RENDITIONS=RENDITIONS,
+        )
+        self.override.enable()
+        self.source = 'uploads/recipe/ab/source.png'
+        os.makedirs(os.path.join(self.media_root, 'uploads/recipe/ab'))
+        Image.new('RGBA', (400, 200)).save(self.path(self.source))
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.media_root, name)
+
+    def test_resizes_keeping_aspect_ratio(self):
+        """Test the rendition is scaled to the width in the new format."""
+        name = renditions.get_rendition(self.source, 160, 'jpeg')
+
+        self.assertTrue(name.endswith('.jpg'))
+        with Image.open(self.path(name)) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (160, 80))
+
+    def test_does_not_upscale(self):
+        """Test widths above the source keep the original size."""
+        name = renditions.get_rendition(self.source, 1280, 'webp')
+
+        with Image.open(self.path(name)) as image:
+            self.assertEqual(image.size, (400, 200))
+
+    def test_cache_hit_does_not_render(self):
+        """Test a second request reuses the cached file."""
+        first = renditions.get_rendition(self.source, 160, 'png')
+        with patch('core.renditions.resize') as resize:
+            second = renditions.get_rendition(self.source, 160, 'png')
+
+        self.assertEqual(first, second)
+        resize.assert_not_called()
+
+    def test_concurrent_requests_render_once(self):
+        """Test identical requests wait for one render."""
+        calls = []
+        real_resize = renditions.resize
+
+        def slow_resize(*args):
+            calls.append(args)
+            time.sleep(0.05)
+            real_resize(*args)
+
+        with patch('core.renditions.resize', side_effect=slow_resize):
+            threads = [
+                threading.Thread(
+                    target=renditions.get_rendition,
+                    args=(self.source, 320, 'webp'),
+                )
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+
+    def test_evict_removes_least_recently_used(self):
+        """Test eviction drops the oldest renditions first."""
+        directory = self.path('renditions/aa')
+        os.makedirs(directory)
+        now = time.time()
+        for age, filename in enumerate(['new.png', 'mid.png', 'old.png']):
+            with open(os.path.join(directory, filename), 'wb') as f:
+                f.write(b'x' * 100)
+            os.utime(f.name, (now - age, now - age))
+
+        freed = renditions.evict(max_bytes=250)
+
+        self.assertEqual(freed, 100)
+        self.assertEqual(
+            sorted(os.listdir(directory)), ['mid.png', 'new.png']
+        )
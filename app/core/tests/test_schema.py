@@ -0,0 +1,117 @@
+"""
+Tests for the prebuilt OpenAPI schema.
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core import schema
+
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaTests(SimpleTestCase):
+    """Test building and serving the schema artifact."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'openapi.json')
+        schema.reset()
+
+    def tearDown(self):
+        schema.reset()
+        self.tmp.cleanup()
+
+    def test_artifact_matches_live_generation(self):
+        """Test the built artifact matches a fresh generation."""
+        call_command('build_schema', file=self.path, stdout=StringIO())
+
+        with open(self.path) as f:
+            artifact = json.load(f)
+        self.assertEqual(
+            artifact, schema.build_artifact(schema.generate_schema())
+        )
+        self.assertIn('/api/recipe/recipes/', artifact['schema']['paths'])
+
+    def test_clone_operation_ids_distinct(self):
+        """Test the single and bulk clone actions get their own ids."""
+        paths = schema.generate_schema()['paths']
+
+        self.assertEqual(
+            paths['/api/recipe/recipes/{id}/clone/']['post']['operationId'],
+            'recipe_recipes_clone',
+        )
+        self.assertEqual(
+            paths['/api/recipe/recipes/clone/']['post']['operationId'],
+            'recipe_recipes_bulk_clone',
+        )
+
+    def test_built_artifact_is_current(self):
+        """Test the deployed artifact, if built, matches the code."""
+        if not os.path.exists(settings.SCHEMA_FILE):
+            self.skipTest('No schema artifact has been built.')
+
+        call_command('build_schema', check=True, stdout=StringIO())
+
+    def test_check_fails_for_stale_artifact(self):
+        """Test --check rejects an artifact that differs from live."""
+        schema.write_artifact(schema.build_artifact({'paths': {}}), self.path)
+
+        with self.assertRaises(CommandError):
+            call_command('build_schema', file=self.path, check=True)
+
+    def test_view_serves_artifact_with_cache_headers(self):
+        """Test the schema is served from the artifact with an ETag."""
+        artifact = schema.build_artifact({'openapi': '3.0.3', 'paths': {}})
+        schema.write_artifact(artifact, self.path)
+
+        with override_settings(SCHEMA_FILE=self.path):
+            res = self.client.get(
+                SCHEMA_URL, HTTP_ACCEPT='application/vnd.oai.openapi+json'
+            )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(json.loads(res.content), artifact['schema'])
+        self.assertEqual(res['ETag'], f'"{artifact["version"]}"')
+        self.assertIn('max-age=', res['Cache-Control'])
+
+    def test_view_not_modified(self):
+        """Test a matching If-None-Match returns 304."""
+        artifact = schema.build_artifact({'openapi': '3.0.3', 'paths': {}})
+        schema.write_artifact(artifact, self.path)
+
+        with override_settings(SCHEMA_FILE=self.path):
+            res = self.client.get(
+                SCHEMA_URL, HTTP_IF_NONE_MATCH=f'"{artifact["version"]}"'
+            )
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_view_not_modified_weak_etag(self):
+        """Test a weakened ETag from the compression layer still matches."""
+        artifact = schema.build_artifact({'openapi': '3.0.3', 'paths': {}})
+        schema.write_artifact(artifact, self.path)
+
+        with override_settings(SCHEMA_FILE=self.path):
+            res = self.client.get(
+                SCHEMA_URL,
+                HTTP_IF_NONE_MATCH=f'"other", W/"{artifact["version"]}"',
+            )
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_view_generates_when_artifact_missing(self):
+        """Test the schema is generated once if no artifact was built."""
+        with override_settings(SCHEMA_FILE=self.path):
+            res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'/api/recipe/recipes/', res.content)
@@ -0,0 +1,237 @@
+"""
+Tests for precomputed similar recipes.
+"""
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from core import similarity
+from core.models import Ingredient, Job, SimilarRecipe, Tag
+from recipe.tests.test_recipe_api import create_recipe
+
+
+def neighbour_ids(recipe):
+    return list(
+        SimilarRecipe.objects.filter(recipe=recipe)
+        .order_by('rank').values_list('similar_id', flat=True)
+    )
+
+
+class NeighboursTests(TestCase):
+    """Test scoring recipes by shared features."""
+
+    def test_jaccard_ranking(self):
+        """Test recipes are ranked by Jaccard similarity."""
+        features = {
+            1: {'a', 'b', 'c'},
+            2: {'a', 'b', 'c', 'd'},
+            3: {'a', 'e'},
+            4: {'z'},
+        }
+
+        result = similarity.neighbours(features, [1, 4], k=5)
+
+        self.assertEqual(result[1], [(0.75, 2), (0.25, 3)])
+        self.assertEqual(result[4], [])
+
+    def test_top_k(self):
+        """Test only the k best neighbours are kept."""
+        features = {1: {'a'}, 2: {'a'}, 3: {'a', 'b'}}
+
+        result = similarity.neighbours(features, [1], k=1)
+
+        self.assertEqual(result[1], [(1.0, 2)])
+
+
+class RefreshTests(TestCase):
+    """Test neighbour rows are rebuilt from the database."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+        self.r1 = create_recipe(user=self.user)
+        self.r2 = create_recipe(user=self.user)
+        self.r3 = create_recipe(user=self.user)
+        self.r1.tags.add(self.vegan)
+        self.r1.ingredients.add(self.rice, self.tofu)
+        self.r2.tags.add(self.vegan)
+        self.r2.ingredients.add(self.rice)
+        self.r3.ingredients.add(self.tofu)
+
+    def test_full_refresh(self):
+        """Test every recipe gets its ranked neighbours."""
+        self.assertEqual(similarity.refresh(self.user.id), 3)
+
+        self.assertEqual(neighbour_ids(self.r1), [self.r2.id, self.r3.id])
+        self.assertEqual(neighbour_ids(self.r2), [self.r1.id])
+        self.assertEqual(neighbour_ids(self.r3), [self.r1.id])
+
+    def test_incremental_refresh(self):
+        """Test only the rows a change can affect are rewritten."""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        salted = [create_recipe(user=self.user) for i in range(6)]
+        for recipe in salted:
+            recipe.ingredients.add(salt)
+        r4 = create_recipe(user=self.user)
+        similarity.refresh(self.user.id)
+        self.r3.ingredients.set([self.rice])
+        untouched = list(SimilarRecipe.objects.filter(
+            recipe=salted[0]).values_list('pk', flat=True))
+
+        similarity.refresh(self.user.id, [self.r3.id, r4.id])
+
+        self.assertEqual(neighbour_ids(self.r3), [self.r2.id, self.r1.id])
+        self.assertEqual(neighbour_ids(self.r2), [self.r1.id, self.r3.id])
+        self.assertEqual(neighbour_ids(r4), [])
+        self.assertEqual(
+            list(SimilarRecipe.objects.filter(
+                recipe=salted[0]).values_list('pk', flat=True)),
+            untouched,
+        )
+
+    def test_deleted_recipe_dropped(self):
+        """Test a deleted recipe disappears from other lists."""
+        similarity.refresh(self.user.id)
+
+        self.r2.delete()
+
+        self.assertEqual(neighbour_ids(self.r1), [self.r3.id])
+
+    def test_recipe_deleted_during_refresh(self):
+        """Test no row is written for a recipe deleted mid-refresh."""
+        similarity.refresh(self.user.id)
+        compute = similarity.neighbours
+
+        def neighbours(*args, **kwargs):
+            result = compute(*args, **kwargs)
+            self.r2.delete()
+            return result
+
+        with patch('core.similarity.neighbours', side_effect=neighbours):
+            similarity.refresh(self.user.id, [self.r1.id])
+
+        self.assertFalse(
+            SimilarRecipe.objects.filter(similar_id=self.r2.id).exists()
+        )
+        self.assertEqual(neighbour_ids(self.r1), [self.r3.id])
+
+    def test_refresh_missing_user(self):
+        """Test a refresh for a deleted user does nothing."""
+        self.assertEqual(similarity.refresh(self.user.id + 1), 0)
+
+    def test_build_similar_command(self):
+        """Test the command rebuilds neighbours for every user."""
+        out = StringIO()
+
+        call_command('build_similar', stdout=out)
+
+        self.assertIn('3 recipes', out.getvalue())
+        self.assertEqual(neighbour_ids(self.r3), [self.r1.id])
+
+
+class ScheduleTests(TestCase):
+    """Test refreshes are merged into one queued job per user."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+
+    def test_merged_into_queued_job(self):
+        """Test a second change widens the queued job."""
+        first = similarity.schedule(self.user.id, [3, 1])
+        second = similarity.schedule(self.user.id, [2, 3])
+
+        self.assertEqual(first.pk, second.pk)
+        first.refresh_from_db()
+        self.assertEqual(
+            first.payload, {'user_id': self.user.id, 'ids': [1, 2, 3]}
+        )
+
+        similarity.schedule(self.user.id)
+        first.refresh_from_db()
+        self.assertIsNone(first.payload['ids'])
+
+    def test_running_job_not_merged(self):
+        """Test changes after a worker claimed the job get a new one."""
+        first = similarity.schedule(self.user.id, [1])
+        Job.objects.filter(pk=first.pk).update(status=Job.RUNNING)
+
+        second = similarity.schedule(self.user.id, [2])
+
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(second.payload['ids'], [2])
+
+
+class FollowChangesTests(TransactionTestCase):
+    """Test committed link changes schedule a refresh."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        self.recipe = create_recipe(user=self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+
+    def test_link_change_scheduled(self):
+        """Test adding a tag queues a refresh of the recipe."""
+        with transaction.atomic():
+            self.recipe.tags.add(self.tag)
+
+        job = Job.objects.get(task=similarity.TASK)
+        self.assertEqual(job.payload['ids'], [self.recipe.id])
+
+    def test_tag_delete_schedules_full_refresh(self):
+        """Test deleting a tag refreshes all the user's recipes."""
+        self.tag.delete()
+
+        job = Job.objects.get(task=similarity.TASK)
+        self.assertIsNone(job.payload['ids'])
+
+    def test_field_change_not_scheduled(self):
+        """Test edits that keep the links queue nothing."""
+        self.recipe.title = 'Renamed'
+        self.recipe.save()
+
+        self.assertFalse(Job.objects.filter(task=similarity.TASK).exists())
+
+
+class RefreshRaceTests(TransactionTestCase):
+    """Test a refresh computed from outdated data is not written."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.r1 = create_recipe(user=self.user)
+        self.r2 = create_recipe(user=self.user)
+        with transaction.atomic():
+            self.r1.tags.add(tag)
+            self.r2.tags.add(tag)
+        Job.objects.all().delete()
+
+    def test_changed_during_refresh_requeued(self):
+        """Test a change committed mid-refresh queues it again."""
+        compute = similarity.neighbours
+
+        def neighbours(*args, **kwargs):
+            result = compute(*args, **kwargs)
+            self.r2.title = 'Renamed'
+            self.r2.save()
+            return result
+
+        with patch('core.similarity.neighbours', side_effect=neighbours):
+            self.assertEqual(similarity.refresh(self.user.id, [self.r1.id]), 0)
+
+        self.assertFalse(SimilarRecipe.objects.exists())
+        job = Job.objects.get(task=similarity.TASK)
+        self.assertEqual(job.payload['ids'], [self.r1.id])
@@ -0,0 +1,104 @@
+"""
+Tests for the slow-query log.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import slow_queries
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def slow_query_settings(**params):
+    config = {
+        'ENABLED': True,
+        'THRESHOLD_MS': 0,
+        'EXPLAIN': True,
+        'LOG_FILE': None,
+        'LOG_MAX_BYTES': 1024,
+        'LOG_BACKUP_COUNT': 1,
+    }
+    config.update(params)
+    return override_settings(SLOW_QUERY=config)
+
+
+class SlowQueryTests(TestCase):
+    """Test capturing slow queries."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_slow_queries_logged_with_view(self):
+        """Test queries above the threshold are logged with their view."""
+        with slow_query_settings(), \
+                self.assertLogs('core.slow_queries', 'INFO') as logs:
+            self.client.get(RECIPE_URL)
+            slow_queries.flush()
+
+        entries = [json.loads(line.split(':', 2)[2]) for line in logs.output]
+        recipe_queries = [e for e in entries if 'core_recipe' in e['sql']]
+        self.assertEqual(len(recipe_queries), 1)
+        self.assertEqual(recipe_queries[0]['view'], 'recipe:recipe-list')
+        self.assertIn('plan', recipe_queries[0])
+        self.assertNotIn('params', recipe_queries[0])
+
+    def test_query_string_not_logged(self):
+        """Test the logged path leaves out the query string."""
+        with slow_query_settings(), \
+                self.assertLogs('core.slow_queries', 'INFO') as logs:
+            self.client.get(RECIPE_URL, {'token': 'secret'})
+            slow_queries.flush()
+
+        self.assertNotIn('secret', '\n'.join(logs.output))
+
+    def test_params_not_logged(self):
+        """Test query parameters are kept out of the log."""
+        with self.assertLogs('core.slow_queries', 'INFO') as logs:
+            slow_queries.process({
+                'alias': 'default',
+                'sql': 'SELECT 1 FROM authtoken_token WHERE key = %s',
+                'params': ['secret-token-key'],
+            })
+
+        self.assertNotIn('secret-token-key', logs.output[0])
+
+    def test_analyze_only_plain_selects(self):
+        """Test statements with side effects get a plain EXPLAIN."""
+        self.assertTrue(slow_queries.analyzable(
+            'SELECT "core_recipe"."id" FROM "core_recipe"'
+        ))
+        for sql in (
+            'UPDATE "core_user" SET "data_version" = 1',
+            'WITH gone AS (DELETE FROM "core_job" RETURNING id) '
+            'SELECT * FROM gone',
+            'SELECT "core_job"."id" FROM "core_job" '
+            'FOR UPDATE SKIP LOCKED',
+            'SELECT "core_user"."id" FROM "core_user" FOR NO KEY UPDATE',
+            'SELECT "core_tag"."id" FROM "core_tag" FOR SHARE',
+        ):
+            self.assertFalse(slow_queries.analyzable(sql), sql)
+
+    def test_fast_queries_not_logged(self):
+        """Test queries below the threshold are not queued."""
+        with slow_query_settings(THRESHOLD_MS=60000):
+            self.client.get(RECIPE_URL)
+
+        self.assertTrue(slow_queries._queue.empty())
+
+    def test_disabled_skips_wrapping(self):
+        """Test nothing is captured while the log is disabled."""
+        with slow_query_settings(ENABLED=False):
+            self.client.get(RECIPE_URL)
+
+        self.assertTrue(slow_queries._queue.empty())
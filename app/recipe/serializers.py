@@ -1,8 +1,22 @@
 """
 Serializer for Recipes
 """
-from rest_framework.serializers import ModelSerializer
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.serializers import (
+    BooleanField,
+    CharField,
+    DecimalField,
+    FloatField,
+    ImageField,
+    IntegerField,
+    ListField,
+    ModelSerializer,
+    Serializer,
+    ValidationError,
+)
 
+from core.media import media_version
 from core.models import (
     Recipe,
     Tag,
@@ -10,6 +24,22 @@ from core.models import (
 )
 
 
+class RecipeImageField(ImageField):
+    """Image field that links to the owner-only image endpoint."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        # Names are content hashes, so the version changes with the image
+        # and the response can be cached as immutable.
+        url = reverse('recipe:recipe-image', args=[value.instance.pk])
+        url = f'{url}?v={media_version(value.name)}'
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
 class IngredientSerializer(ModelSerializer):
 
     class Meta:
@@ -58,6 +88,7 @@ class RecipeSerializer(ModelSerializer):
             elif Type == Ingredient:
                 recipe.ingredients.add(item_obj)
 
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe"""
         tags = validated_data.pop('tags', [])
@@ -67,6 +98,7 @@ class RecipeSerializer(ModelSerializer):
         self._get_or_create_item(ingredients, recipe, Ingredient)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Update recipe."""
         print(validated_data)
@@ -87,6 +119,7 @@ class RecipeSerializer(ModelSerializer):
 
 class RecipleDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view."""
+    image = RecipeImageField(required=False, allow_null=True)
 
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ['description', 'image']
@@ -94,9 +127,94 @@ class RecipleDetailSerializer(RecipeSerializer):
 
 class RecipeImageSerializer(ModelSerializer):
     """Serializer for uploading images to recipes."""
+    image = RecipeImageField(required=True)
 
     class Meta:
         model = Recipe
         fields = ['id', 'image']
         read_only_fields = ['id']
-        extra_kwargs = {'image': {'required': 'True'}}
+
+
+class RecipeBulkDeleteSerializer(Serializer):
+    """Serializer selecting recipes to delete in the background."""
+    ids = ListField(
+        child=IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=10000,
+    )
+    all = BooleanField(default=False)
+
+    def validate(self, attrs):
+        if attrs['all'] == ('ids' in attrs):
+            raise ValidationError('Provide either ids or all.')
+        return attrs
+
+
+class RecipeCloneSerializer(Serializer):
+    """Serializer for options when cloning a recipe."""
+    title = CharField(max_length=255, required=False)
+
+
+class RecipeBulkCloneSerializer(Serializer):
+    """Serializer selecting recipes to clone."""
+    ids = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+
+class RecipeLinksSerializer(Serializer):
+    """Serializer for ids of tags or ingredients to add or remove."""
+    ids = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+
+class ShoppingListRequestSerializer(RecipeBulkCloneSerializer):
+    """Serializer selecting recipes for a shopping list."""
+
+
+class ShoppingListItemSerializer(Serializer):
+    """Serializer for an ingredient on a shopping list."""
+    id = IntegerField()
+    name = CharField()
+    recipe_count = IntegerField()
+
+
+class ShoppingListSerializer(Serializer):
+    """Serializer for the aggregated shopping list."""
+    recipe_count = IntegerField()
+    total_price = DecimalField(max_digits=12, decimal_places=2)
+    total_time_minutes = IntegerField()
+    ingredients = ShoppingListItemSerializer(many=True)
+
+
+class CookableRecipeSerializer(RecipeSerializer):
+    """Serializer for a recipe matched against a pantry."""
+    missing_count = IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['missing_count']
+
+
+class SimilarRecipeSerializer(RecipeSerializer):
+    """Serializer for a recipe similar to another one."""
+    score = FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['score']
+
+
+class FacetItemSerializer(ShoppingListItemSerializer):
+    """Serializer for the recipe count of one tag or ingredient."""
+
+
+class FacetsSerializer(Serializer):
+    """Serializer for tag and ingredient counts of filtered recipes."""
+    recipe_count = IntegerField()
+    tags = FacetItemSerializer(many=True)
+    ingredients = FacetItemSerializer(many=True)
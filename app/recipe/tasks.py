@@ -0,0 +1,39 @@
+"""
+Background tasks for recipes.
+"""
+from django.conf import settings
+
+from core import deletion, jobs, renditions, similarity
+from core.jobs import task
+from core.models import Recipe
+
+
+@task('recipe.prerender_renditions')
+def prerender_renditions(job, name):
+    """Render the common sizes of a new image ahead of the first request."""
+    rendered = []
+    for width, fmt in settings.RENDITIONS['PRERENDER']:
+        try:
+            rendered.append(renditions.get_rendition(name, width, fmt))
+        except FileNotFoundError:
+            # The image was replaced and collected before the job ran.
+            break
+    return rendered
+
+
+@task('recipe.delete_recipes')
+def delete_recipes(job, user_id, ids=None):
+    """Delete the user's recipes, or only those in ids, in batches."""
+    queryset = Recipe.objects.filter(user_id=user_id)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    deleted = deletion.delete_recipes(
+        queryset, on_progress=lambda progress: jobs.report(job, **progress),
+    )
+    return {'deleted': deleted}
+
+
+@task(similarity.TASK)
+def refresh_similar(job, user_id, ids=None):
+    """Recompute the neighbours of the user's changed recipes."""
+    return {'recipes': similarity.refresh(user_id, ids)}
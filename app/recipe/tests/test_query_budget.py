@@ -0,0 +1,367 @@
+"""
+Query budget tests for the recipe APIs.
+"""
+import tempfile
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import pantry, similarity
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from core.tests.query_budget import (
+    QueryBudgetMixin,
+    seed_recipes,
+)
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test query budgets for recipe endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _seed(self, size):
+        seed_recipes(self.user, size)
+        return Recipe.objects.filter(user=self.user).latest('id')
+
+    def _seed_with_extras(self, size):
+        recipe = self._seed(size)
+        ingredient = Ingredient.objects.create(user=self.user, name='Extra')
+        recipe.ingredients.add(ingredient)
+        return recipe, ingredient
+
+    def test_list(self):
+        self.assertQueryBudget(
+            3, self._seed,
+            lambda _: self.client.get(RECIPE_URL),
+            status.HTTP_200_OK,
+        )
+
+    def test_list_filtered(self):
+        def seed(size):
+            self._seed(size)
+            return ','.join(str(t.id) for t in Tag.objects.all()[:5])
+
+        self.assertQueryBudget(
+            3, seed,
+            lambda tag_ids: self.client.get(RECIPE_URL, {'tags': tag_ids}),
+            status.HTTP_200_OK,
+        )
+
+    def test_retrieve(self):
+        self.assertQueryBudget(
+            3, self._seed,
+            lambda recipe: self.client.get(detail_url(recipe.id)),
+            status.HTTP_200_OK,
+        )
+
+    def test_create_with_nested_tags(self):
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '5.00',
+            'tags': [{'name': 'Thai'}, {'name': 'Dinner'}],
+            'ingredients': [{'name': 'Rice'}],
+        }
+        self.assertQueryBudget(
+            27, self._seed,
+            lambda _: self.client.post(RECIPE_URL, payload, format='json'),
+            status.HTTP_201_CREATED,
+        )
+
+    def test_update(self):
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '5.00',
+            'tags': [{'name': 'Thai'}],
+        }
+        self.assertQueryBudget(
+            16, self._seed,
+            lambda recipe: self.client.put(
+                detail_url(recipe.id), payload, format='json'
+            ),
+            status.HTTP_200_OK,
+        )
+
+    def test_partial_update(self):
+        self.assertQueryBudget(
+            7, self._seed,
+            lambda recipe: self.client.patch(
+                detail_url(recipe.id), {'title': 'New'}, format='json'
+            ),
+            status.HTTP_200_OK,
+        )
+
+    def test_destroy(self):
+        self.assertQueryBudget(
+            9, self._seed,
+            lambda recipe: self.client.delete(detail_url(recipe.id)),
+            status.HTTP_204_NO_CONTENT,
+        )
+
+    def test_clone(self):
+        self.assertQueryBudget(
+            15, self._seed,
+            lambda recipe: self.client.post(
+                reverse('recipe:recipe-clone', args=[recipe.id])
+            ),
+            status.HTTP_201_CREATED,
+        )
+
+    def test_bulk_clone(self):
+        def seed(size):
+            self._seed(size)
+            return list(
+                Recipe.objects.filter(user=self.user).values_list(
+                    'id', flat=True)
+            )
+
+        self.assertQueryBudget(
+            15, seed,
+            lambda ids: self.client.post(
+                reverse('recipe:recipe-bulk-clone'), {'ids': ids},
+                format='json',
+            ),
+            status.HTTP_201_CREATED,
+        )
+
+    def test_add_ingredients(self):
+        def seed(size):
+            recipe = self._seed(size)
+            ids = [
+                Ingredient.objects.create(user=self.user, name=f'New {i}').id
+                for i in range(15)
+            ]
+            return recipe, ids
+
+        self.assertQueryBudget(
+            7, seed,
+            lambda seeded: self.client.patch(
+                reverse('recipe:recipe-add-ingredients', args=[seeded[0].id]),
+                {'ids': seeded[1]}, format='json',
+            ),
+            status.HTTP_204_NO_CONTENT,
+        )
+
+    def test_remove_tags(self):
+        def seed(size):
+            recipe = self._seed(size)
+            return recipe, list(recipe.tags.values_list('id', flat=True))
+
+        self.assertQueryBudget(
+            8, seed,
+            lambda seeded: self.client.patch(
+                reverse('recipe:recipe-remove-tags', args=[seeded[0].id]),
+                {'ids': seeded[1]}, format='json',
+            ),
+            status.HTTP_204_NO_CONTENT,
+        )
+
+    def test_shopping_list(self):
+        def seed(size):
+            self._seed(size)
+            return list(
+                Recipe.objects.filter(user=self.user).values_list(
+                    'id', flat=True)
+            )
+
+        self.assertQueryBudget(
+            1, seed,
+            lambda ids: self.client.post(
+                reverse('recipe:recipe-shopping-list'), {'ids': ids},
+                format='json',
+            ),
+            status.HTTP_200_OK,
+        )
+
+    def test_cookable(self):
+        def seed(size):
+            # Ids and versions repeat between rolled back runs.
+            pantry.reset()
+            recipe, ingredient = self._seed_with_extras(size)
+            return ingredient.id
+
+        self.assertQueryBudget(
+            4, seed,
+            lambda ingredient_id: self.client.get(
+                reverse('recipe:recipe-cookable'),
+                {'ingredients': ingredient_id},
+            ),
+            status.HTTP_200_OK,
+        )
+
+    def test_similar(self):
+        def seed(size):
+            recipe = self._seed(size)
+            similarity.refresh(self.user.id)
+            return recipe
+
+        self.assertQueryBudget(
+            4, seed,
+            lambda recipe: self.client.get(
+                reverse('recipe:recipe-similar', args=[recipe.id]),
+            ),
+            status.HTTP_200_OK,
+        )
+
+    def test_facets(self):
+        def seed(size):
+            # Versions repeat between rolled back runs.
+            cache.clear()
+            recipe, ingredient = self._seed_with_extras(size)
+            self.user.refresh_from_db()
+            return ingredient.id
+
+        self.assertQueryBudget(
+            1, seed,
+            lambda ingredient_id: self.client.get(
+                reverse('recipe:recipe-facets'),
+                {'ingredients': ingredient_id},
+            ),
+            status.HTTP_200_OK,
+        )
+
+    def test_upload_image(self):
+        def request(recipe):
+            url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+            with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+                Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+                image_file.seek(0)
+                return self.client.post(
+                    url, {'image': image_file}, format='multipart'
+                )
+
+        self.assertQueryBudget(7, self._seed, request, status.HTTP_200_OK)
+
+    def test_add_ingredient(self):
+        def request(seeded):
+            recipe, ingredient = seeded
+            url = reverse('recipe:add-ingredient',
+                          args=[recipe.id, ingredient.id])
+            return self.client.patch(url)
+
+        self.assertQueryBudget(
+            4, self._seed_with_extras, request, status.HTTP_200_OK
+        )
+
+    def test_remove_ingredient(self):
+        def request(seeded):
+            recipe, ingredient = seeded
+            url = reverse('recipe:remove-ingredient',
+                          args=[recipe.id, ingredient.id])
+            return self.client.patch(url)
+
+        self.assertQueryBudget(
+            5, self._seed_with_extras, request, status.HTTP_204_NO_CONTENT
+        )
+
+
+class RecipeAttributeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test query budgets for tag and ingredient endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _seed(self, size):
+        seed_recipes(self.user, size, tags=size, ingredients=size)
+        return (
+            Tag.objects.filter(user=self.user).latest('id'),
+            Ingredient.objects.filter(user=self.user).latest('id'),
+        )
+
+    def test_list_tags(self):
+        self.assertQueryBudget(
+            1, self._seed,
+            lambda _: self.client.get(TAGS_URL),
+            status.HTTP_200_OK,
+        )
+
+    def test_list_tags_assigned_only(self):
+        self.assertQueryBudget(
+            1, self._seed,
+            lambda _: self.client.get(TAGS_URL, {'assigned_only': 1}),
+            status.HTTP_200_OK,
+        )
+
+    def test_update_tag(self):
+        self.assertQueryBudget(
+            3, self._seed,
+            lambda seeded: self.client.patch(
+                reverse('recipe:tag-detail', args=[seeded[0].id]),
+                {'name': 'New'},
+            ),
+            status.HTTP_200_OK,
+        )
+
+    def test_destroy_tag(self):
+        self.assertQueryBudget(
+            4, self._seed,
+            lambda seeded: self.client.delete(
+                reverse('recipe:tag-detail', args=[seeded[0].id])
+            ),
+            status.HTTP_204_NO_CONTENT,
+        )
+
+    def test_list_ingredients(self):
+        self.assertQueryBudget(
+            1, self._seed,
+            lambda _: self.client.get(INGREDIENTS_URL),
+            status.HTTP_200_OK,
+        )
+
+    def test_create_ingredient(self):
+        self.assertQueryBudget(
+            2, self._seed,
+            lambda _: self.client.post(INGREDIENTS_URL, {'name': 'Salt'}),
+            status.HTTP_201_CREATED,
+        )
+
+    def test_update_ingredient(self):
+        self.assertQueryBudget(
+            3, self._seed,
+            lambda seeded: self.client.patch(
+                reverse('recipe:ingredient-detail', args=[seeded[1].id]),
+                {'name': 'New'},
+            ),
+            status.HTTP_200_OK,
+        )
+
+    def test_destroy_ingredient(self):
+        self.assertQueryBudget(
+            4, self._seed,
+            lambda seeded: self.client.delete(
+                reverse('recipe:ingredient-detail', args=[seeded[1].id])
+            ),
+            status.HTTP_204_NO_CONTENT,
+        )
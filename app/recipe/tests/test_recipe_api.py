@@ -4,17 +4,23 @@ Tests for recipe
 from decimal import Decimal
 import tempfile
 import os
+from unittest import skipUnless
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core import jobs, pantry, similarity
 from core.models import (
+    Job,
     Recipe,
     Tag,
     Ingredient
@@ -26,6 +32,10 @@ from recipe.serializers import (
 )
 
 RECIPE_URL = reverse('recipe:recipe-list')
+BULK_DELETE_URL = reverse('recipe:recipe-bulk-delete')
+SHOPPING_LIST_URL = reverse('recipe:recipe-shopping-list')
+COOKABLE_URL = reverse('recipe:recipe-cookable')
+FACETS_URL = reverse('recipe:recipe-facets')
 
 
 def detail_url(recipe_id):
@@ -38,6 +48,16 @@ def image_upload_url(recipe_id):
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 
+def similar_url(recipe_id):
+    """Create and return a similar recipes URL."""
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+def image_url(recipe_id):
+    """Create and return a recipe image URL"""
+    return reverse('recipe:recipe-image', args=[recipe_id])
+
+
 def create_recipe(user, **params):
     """create and return a sample recipe"""
     defaults = {
@@ -79,6 +99,9 @@ class PrivateRecipeAPITests(TestCase):
         self.user = create_user(email="user@example.com",
                                 password='testpassword123')
         self.client.force_authenticate(self.user)
+        # Ids and versions repeat between rolled back tests.
+        pantry.reset()
+        cache.clear()
 
     def test_retrieve_recipes(self):
         """Test retrieving a list of recipes"""
@@ -214,6 +237,93 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
         self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
 
+    def test_bulk_delete_recipes(self):
+        """Test bulk delete removes only the user's listed recipes."""
+        mine = [create_recipe(user=self.user) for _ in range(3)]
+        other = create_recipe(user=create_user(
+            email='other@example.com', password='test1234549z',
+        ))
+
+        res = self.client.post(BULK_DELETE_URL, {
+            'ids': [mine[0].id, mine[1].id, other.id],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(Recipe.objects.count(), 4)
+        jobs.run(jobs.claim('worker')[0])
+
+        job = Job.objects.get(id=res.data['id'])
+        self.assertEqual(job.result, {'deleted': 2})
+        self.assertEqual(job.progress, {'deleted': 2, 'total': 2})
+        self.assertEqual(
+            set(Recipe.objects.values_list('id', flat=True)),
+            {mine[2].id, other.id},
+        )
+
+    def test_bulk_delete_requires_ids_or_all(self):
+        """Test bulk delete rejects an empty or ambiguous selection."""
+        for payload in ({}, {'ids': []}, {'ids': [1], 'all': True}):
+            res = self.client.post(BULK_DELETE_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
+
+    def test_clone_recipe(self):
+        """Test cloning copies fields, tags and ingredients."""
+        recipe = create_recipe(user=self.user, description='Spicy')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Thai'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Chili')
+        )
+        url = reverse('recipe:recipe-clone', args=[recipe.id])
+
+        res = self.client.post(url, {'title': 'Milder'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        copy = Recipe.objects.get(id=res.data['id'])
+        self.assertNotEqual(copy.id, recipe.id)
+        self.assertEqual(copy.title, 'Milder')
+        self.assertEqual(copy.description, 'Spicy')
+        self.assertEqual(copy.user, self.user)
+        self.assertEqual(list(copy.tags.all()), list(recipe.tags.all()))
+        self.assertEqual(
+            list(copy.ingredients.all()), list(recipe.ingredients.all())
+        )
+
+    def test_bulk_clone_recipes(self):
+        """Test cloning several recipes, in the order given."""
+        tag = Tag.objects.create(user=self.user, name='Thai')
+        first = create_recipe(user=self.user, title='First')
+        second = create_recipe(user=self.user, title='Second')
+        first.tags.add(tag)
+
+        res = self.client.post(
+            reverse('recipe:recipe-bulk-clone'),
+            {'ids': [second.id, first.id, first.id]}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [item['title'] for item in res.data],
+            ['Second', 'First', 'First'],
+        )
+        self.assertEqual(Recipe.objects.filter(tags=tag).count(), 3)
+
+    def test_bulk_clone_other_users_recipe(self):
+        """Test bulk clone rejects recipes the user does not own."""
+        other = create_recipe(user=create_user(
+            email='other@example.com', password='test1234549z',
+        ))
+        mine = create_recipe(user=self.user)
+
+        res = self.client.post(
+            reverse('recipe:recipe-bulk-clone'),
+            {'ids': [mine.id, other.id]}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Recipe.objects.count(), 2)
+
     def test_create_recipe_with_new_tags(self):
         """Test creating a recipe with new tags"""
         payload = {
@@ -368,6 +478,338 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn(ingredient, recipe.ingredients.all())
 
+    def test_add_ingredient_of_other_user(self):
+        """Test another user's ingredient cannot be added."""
+        recipe = create_recipe(user=self.user)
+        other = create_user(email='other@example.com', password='pass1234')
+        ingredient = Ingredient.objects.create(user=other, name='Salt')
+        url = reverse('recipe:add-ingredient', args=[recipe.id, ingredient.id])
+
+        res = self.client.patch(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(recipe.ingredients.exists())
+
+    def test_add_and_remove_ingredients(self):
+        """Test adding and removing several ingredients at once."""
+        recipe = create_recipe(user=self.user)
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Salt', 'Pepper', 'Oil')
+        ]
+        recipe.ingredients.add(ingredients[0])
+        ids = [ingredient.id for ingredient in ingredients]
+
+        res = self.client.patch(
+            reverse('recipe:recipe-add-ingredients', args=[recipe.id]),
+            {'ids': ids}, format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(recipe.ingredients.count(), 3)
+        self.assertEqual(
+            set(Ingredient.objects.filter(id__in=ids)
+                .values_list('recipe_count', flat=True)),
+            {1},
+        )
+
+        res = self.client.patch(
+            reverse('recipe:recipe-remove-ingredients', args=[recipe.id]),
+            {'ids': ids[:2]}, format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(recipe.ingredients.all()), ingredients[2:])
+        self.assertEqual(
+            list(Ingredient.objects.filter(id__in=ids).order_by('id')
+                 .values_list('recipe_count', flat=True)),
+            [0, 0, 1],
+        )
+
+    def test_add_and_remove_tags(self):
+        """Test adding and removing several tags at once."""
+        recipe = create_recipe(user=self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Quick')
+        ]
+        ids = [tag.id for tag in tags]
+
+        self.client.patch(
+            reverse('recipe:recipe-add-tags', args=[recipe.id]),
+            {'ids': ids}, format='json',
+        )
+        self.assertEqual(recipe.tags.count(), 2)
+
+        self.client.patch(
+            reverse('recipe:recipe-remove-tags', args=[recipe.id]),
+            {'ids': ids}, format='json',
+        )
+        self.assertFalse(recipe.tags.exists())
+
+    def test_add_tags_of_other_user(self):
+        """Test ids the user does not own reject the whole change."""
+        recipe = create_recipe(user=self.user)
+        mine = Tag.objects.create(user=self.user, name='Vegan')
+        other = create_user(email='other@example.com', password='pass1234')
+        theirs = Tag.objects.create(user=other, name='Keto')
+
+        res = self.client.patch(
+            reverse('recipe:recipe-add-tags', args=[recipe.id]),
+            {'ids': [mine.id, theirs.id]}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(theirs.id), str(res.data['ids']))
+        self.assertFalse(recipe.tags.exists())
+
+    def test_shopping_list(self):
+        """Test ingredients are merged with per-ingredient counts."""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        rice = Ingredient.objects.create(user=self.user, name='rice')
+        r1 = create_recipe(
+            user=self.user, price=Decimal('2.50'), time_minutes=10,
+        )
+        r2 = create_recipe(
+            user=self.user, price=Decimal('4.25'), time_minutes=30,
+        )
+        r3 = create_recipe(
+            user=self.user, price=Decimal('1.00'), time_minutes=5,
+        )
+        r1.ingredients.add(salt, rice)
+        r2.ingredients.add(salt)
+
+        res = self.client.post(
+            SHOPPING_LIST_URL, {'ids': [r1.id, r2.id, r3.id]}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 3)
+        self.assertEqual(res.data['total_price'], '7.75')
+        self.assertEqual(res.data['total_time_minutes'], 45)
+        self.assertEqual(res.data['ingredients'], [
+            {'id': rice.id, 'name': 'rice', 'recipe_count': 1},
+            {'id': salt.id, 'name': 'Salt', 'recipe_count': 2},
+        ])
+
+    def test_shopping_list_other_users_recipe(self):
+        """Test recipes of other users are not aggregated."""
+        mine = create_recipe(user=self.user)
+        other = create_recipe(user=create_user(
+            email='other@example.com', password='pass1234',
+        ))
+
+        res = self.client.post(
+            SHOPPING_LIST_URL, {'ids': [mine.id, other.id]}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cookable(self):
+        """Test recipes are ranked by how many ingredients are missing."""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        rice = Ingredient.objects.create(user=self.user, name='Rice')
+        fish = Ingredient.objects.create(user=self.user, name='Fish')
+        r1 = create_recipe(user=self.user, title='Fish and rice')
+        r2 = create_recipe(user=self.user, title='Salted rice')
+        r3 = create_recipe(user=self.user, title='Plain rice')
+        r1.ingredients.add(salt, rice, fish)
+        r2.ingredients.add(salt, rice)
+        r3.ingredients.add(rice)
+        other = create_recipe(user=create_user(
+            email='other@example.com', password='pass1234',
+        ))
+        other.ingredients.add(rice)
+
+        res = self.client.get(
+            COOKABLE_URL, {'ingredients': f'{salt.id},{rice.id}'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r['id'], r['missing_count']) for r in res.data],
+            [(r2.id, 0), (r3.id, 0), (r1.id, 1)],
+        )
+
+    def test_cookable_max_missing(self):
+        """Test recipes missing too many ingredients are left out."""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        rice = Ingredient.objects.create(user=self.user, name='Rice')
+        r1 = create_recipe(user=self.user)
+        r2 = create_recipe(user=self.user)
+        r1.ingredients.add(salt)
+        r2.ingredients.add(salt, rice)
+
+        res = self.client.get(
+            COOKABLE_URL, {'ingredients': '', 'max_missing': 1}
+        )
+
+        self.assertEqual([r['id'] for r in res.data], [r1.id])
+
+    def test_cookable_invalid_params(self):
+        """Test non numeric parameters are rejected."""
+        res = self.client.get(COOKABLE_URL, {'ingredients': 'salt'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        for limit in ('many', '-1', '\u00b2'):
+            res = self.client.get(COOKABLE_URL, {'limit': limit})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPE_URL, {'min_time': '\u00b2'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_similar(self):
+        """Test recipes sharing the most tags and ingredients come first."""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        rice = Ingredient.objects.create(user=self.user, name='Rice')
+        r1 = create_recipe(user=self.user)
+        r2 = create_recipe(user=self.user)
+        r3 = create_recipe(user=self.user)
+        create_recipe(user=self.user)
+        r1.tags.add(vegan)
+        r1.ingredients.add(rice)
+        r2.tags.add(vegan)
+        r2.ingredients.add(rice)
+        r3.ingredients.add(rice)
+        similarity.refresh(self.user.id)
+
+        res = self.client.get(similar_url(r1.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r['id'], r['score']) for r in res.data],
+            [(r2.id, 1.0), (r3.id, 0.5)],
+        )
+
+        res = self.client.get(similar_url(r1.id), {'limit': 1})
+        self.assertEqual([r['id'] for r in res.data], [r2.id])
+
+    def test_similar_other_users_recipe(self):
+        """Test neighbours of another user's recipe are not returned."""
+        other = create_recipe(user=create_user(
+            email='other@example.com', password='pass1234',
+        ))
+
+        res = self.client.get(similar_url(other.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_facets(self):
+        """Test tag and ingredient counts follow the list filters."""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        rice = Ingredient.objects.create(user=self.user, name='Rice')
+        r1 = create_recipe(user=self.user)
+        r2 = create_recipe(user=self.user)
+        create_recipe(user=self.user)
+        r1.tags.add(vegan, quick)
+        r1.ingredients.add(rice)
+        r2.tags.add(vegan)
+        other = create_recipe(user=create_user(
+            email='other@example.com', password='pass1234',
+        ))
+        other.ingredients.add(rice)
+
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 3)
+        self.assertEqual(res.data['tags'], [
+            {'id': vegan.id, 'name': 'Vegan', 'recipe_count': 2},
+            {'id': quick.id, 'name': 'Quick', 'recipe_count': 1},
+        ])
+        self.assertEqual(res.data['ingredients'], [
+            {'id': rice.id, 'name': 'Rice', 'recipe_count': 1},
+        ])
+
+        res = self.client.get(FACETS_URL, {'tags': str(quick.id)})
+
+        self.assertEqual(res.data['recipe_count'], 1)
+        self.assertEqual(
+            [t['recipe_count'] for t in res.data['tags']], [1, 1]
+        )
+
+    def test_facets_invalid_ids(self):
+        """Test non numeric filters are rejected."""
+        res = self.client.get(FACETS_URL, {'tags': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_price_and_time(self):
+        """Test filtering recipes by price and time ranges."""
+        cheap = create_recipe(
+            user=self.user, price=Decimal('2.00'), time_minutes=10,
+        )
+        pricey = create_recipe(
+            user=self.user, price=Decimal('9.00'), time_minutes=10,
+        )
+        slow = create_recipe(
+            user=self.user, price=Decimal('3.00'), time_minutes=90,
+        )
+
+        res = self.client.get(RECIPE_URL, {'max_price': '5'})
+        self.assertEqual(
+            [r['id'] for r in res.data], [slow.id, cheap.id]
+        )
+
+        res = self.client.get(
+            RECIPE_URL, {'min_price': '2.50', 'max_time': 60}
+        )
+        self.assertEqual([r['id'] for r in res.data], [pricey.id])
+
+        res = self.client.get(RECIPE_URL, {'min_time': 30})
+        self.assertEqual([r['id'] for r in res.data], [slow.id])
+
+    def test_invalid_range_filter(self):
+        """Test malformed range filters are rejected."""
+        for params in ({'min_price': 'cheap'}, {'max_price': 'NaN'},
+                       {'min_time': '-5'}):
+            res = self.client.get(RECIPE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering(self):
+        """Test sorting by a field with id breaking ties."""
+        r1 = create_recipe(user=self.user, title='B', price=Decimal('5.00'))
+        r2 = create_recipe(user=self.user, title='A', price=Decimal('5.00'))
+        r3 = create_recipe(user=self.user, title='C', price=Decimal('1.00'))
+
+        res = self.client.get(RECIPE_URL, {'ordering': 'price'})
+        self.assertEqual(
+            [r['id'] for r in res.data], [r3.id, r1.id, r2.id]
+        )
+
+        res = self.client.get(RECIPE_URL, {'ordering': '-price'})
+        self.assertEqual(
+            [r['id'] for r in res.data], [r2.id, r1.id, r3.id]
+        )
+
+        res = self.client.get(RECIPE_URL, {'ordering': 'title'})
+        self.assertEqual(
+            [r['id'] for r in res.data], [r2.id, r1.id, r3.id]
+        )
+
+    def test_invalid_ordering(self):
+        """Test only the indexed fields can be sorted on."""
+        for value in ('description', '--title'):
+            res = self.client.get(RECIPE_URL, {'ordering': value})
+
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, value
+            )
+
+    @skipUnless(connection.vendor == 'sqlite', 'Needs EXPLAIN QUERY PLAN.')
+    def test_ordering_read_from_index(self):
+        """Test every sort is served by an index instead of sorting."""
+        create_recipe(user=self.user)
+        orderings = [None, '-price', 'time_minutes', 'title']
+        for ordering in orderings:
+            params = {'ordering': ordering} if ordering else {}
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(RECIPE_URL, params)
+            sql = ctx.captured_queries[0]['sql']
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = ' '.join(str(row) for row in cursor.fetchall())
+            self.assertNotIn('TEMP B-TREE', plan, ordering)
+
     def test_filter_by_tags(self):
         """Test filtering recipes by tags"""
         r1 = create_recipe(user=self.user, title='Thai Vegetable Curry')
@@ -416,6 +858,34 @@ class PrivateRecipeAPITests(TestCase):
         self.assertNotIn(s2.data, res.data)
 
 
+class FacetsCacheTests(TransactionTestCase):
+    """Test facet counts are cached per committed data version."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com',
+                                password='testpassword123')
+        self.client.force_authenticate(self.user)
+
+    def test_facets_cached_per_version(self):
+        """Test counts are cached until the user's data changes."""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(user=self.user)
+        self.user.refresh_from_db()
+        self.client.get(FACETS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(FACETS_URL)
+        self.assertEqual(res.data['tags'], [])
+
+        recipe.tags.add(vegan)
+        self.user.refresh_from_db()
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.data['tags'][0]['recipe_count'], 1)
+
+
 class ImageUploadTests(TestCase):
 
     def setUp(self):
@@ -453,3 +923,139 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _upload(self):
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new("RGB", (10, 10))
+            img.save(image_file, format='JPEG')
+            image_file.seek(0)
+            return self.client.post(
+                url, {'image': image_file}, format='multipart'
+            )
+
+    def _upload_other(self):
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            Image.new('RGB', (12, 12), 'red').save(image_file, format='PNG')
+            image_file.seek(0)
+            return self.client.post(
+                url, {'image': image_file}, format='multipart'
+            )
+
+    def test_upload_returns_protected_url(self):
+        """Test the image URL points at the owner-only endpoint."""
+        res = self._upload()
+
+        self.recipe.refresh_from_db()
+        version = os.path.basename(self.recipe.image.name)[:16]
+
+        self.assertTrue(res.data['image'].endswith(
+            f'{image_url(self.recipe.id)}?v={version}'
+        ))
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=True)
+    def test_serve_image_with_accel_redirect(self):
+        """Test the image is handed to nginx with immutable caching."""
+        url = self._upload().data['image']
+        self.recipe.refresh_from_db()
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            '/protected/media/' + self.recipe.image.name,
+        )
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('private', res['Cache-Control'])
+        self.assertEqual(res.content, b'')
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=True)
+    def test_serve_image_stale_version_revalidated(self):
+        """Test an image URL without the current version is not immutable."""
+        old_url = self._upload().data['image']
+        self._upload_other()
+
+        for url in (old_url, image_url(self.recipe.id)):
+            res = self.client.get(url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn('immutable', res['Cache-Control'])
+            self.assertIn('no-cache', res['Cache-Control'])
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=False)
+    def test_serve_image_without_proxy(self):
+        """Test the image is streamed by Django without the proxy."""
+        self._upload()
+
+        res = self.client.get(image_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(b''.join(res.streaming_content))
+        res.close()
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=True)
+    def test_serve_resized_rendition(self):
+        """Test w and fmt return a cached rendition of the image."""
+        self._upload()
+
+        res = self.client.get(image_url(self.recipe.id), {
+            'w': 160, 'fmt': 'webp',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/webp')
+        self.assertTrue(
+            res['X-Accel-Redirect'].startswith('/protected/media/renditions/')
+        )
+
+    def test_rendition_size_not_allowed(self):
+        """Test widths and formats outside the allowlist are rejected."""
+        self._upload()
+
+        res = self.client.get(image_url(self.recipe.id), {
+            'w': 321, 'fmt': 'gif',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'w', 'fmt'})
+
+    def test_rendition_width_not_a_number(self):
+        """Test a width int() can't parse is a 400, not a 500."""
+        self._upload()
+
+        res = self.client.get(image_url(self.recipe.id), {'w': '\u00b2'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'w'})
+
+    def test_serve_image_missing(self):
+        """Test a recipe without an image returns 404."""
+        res = self.client.get(image_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=False)
+    def test_serve_image_source_file_missing(self):
+        """Test a recipe whose image file is gone returns 404."""
+        self._upload()
+        self.recipe.refresh_from_db()
+        os.remove(self.recipe.image.path)
+
+        res = self.client.get(image_url(self.recipe.id))
+        rendition = self.client.get(image_url(self.recipe.id), {'w': 160})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(rendition.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_serve_image_other_user(self):
+        """Test another user's recipe image is not served."""
+        self._upload()
+        other = create_user(email='other@example.com', password='pass123')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(image_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -160,3 +160,26 @@ class PrivateTagAPiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
         self.assertEqual(len(res.data), 1)
+
+    def test_order_by_popularity(self):
+        """Test sorting tags by how many recipes use them."""
+        rare = Tag.objects.create(user=self.user, name="Rare")
+        common = Tag.objects.create(user=self.user, name="Common")
+        unused = Tag.objects.create(user=self.user, name="Unused")
+        for i in range(2):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(common)
+        recipe.tags.add(rare)
+
+        res = self.client.get(TAGS_URL, {'ordering': '-recipe_count'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [t['id'] for t in res.data], [common.id, rare.id, unused.id]
+        )
+
+    def test_invalid_ordering(self):
+        """Test a doubled - prefix is rejected."""
+        res = self.client.get(TAGS_URL, {'ordering': '--recipe_count'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
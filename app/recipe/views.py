@@ -1,6 +1,8 @@
 """
 Views for recipe APIs.
 """
+from decimal import Decimal, InvalidOperation
+
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -17,16 +19,51 @@ from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from core.models import (
     Recipe,
     Tag,
     Ingredient
 )
-from recipe import serializers
+from core import (
+    changes,
+    cloning,
+    counters,
+    facets,
+    jobs,
+    pantry,
+    renditions,
+    shopping,
+)
+from core.media import media_version, serve_media
+from recipe import serializers, tasks
+from user.serializers import JobSerializer
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 
 
+def ordering(request, fields):
+    """
+    Return order_by() arguments for ?ordering=[-]field, newest first by
+    default. id breaks ties, so every order is total.
+    """
+    value = request.query_params.get('ordering')
+    if not value:
+        return ['-id']
+    field = value[1:] if value.startswith('-') else value
+    if field not in fields:
+        raise ValidationError({
+            'ordering': f'Must be one of {fields}, optionally prefixed '
+                        f'with -.',
+        })
+    descending = '-' if value.startswith('-') else ''
+    return [value, f'{descending}id']
+
+
 @extend_schema_view(
     list=extend_schema(
         parameters=[
@@ -35,6 +72,12 @@ from django.shortcuts import get_object_or_404
                 OpenApiTypes.INT, enum=[0, 1],  # 0 all 1 assigned
                 description="Filter by items assigned to recipes."
             ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR,
+                enum=['recipe_count', '-recipe_count'],
+                description="Sort by usage, newest first by default"
+            ),
         ]
     )
 )
@@ -44,6 +87,8 @@ class BaseRecipeAttViewSet(mixins.ListModelMixin,
                            viewsets.GenericViewSet):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    # Served by the (user, recipe_count, id) index.
+    ordering_fields = ['recipe_count']
 
     def get_queryset(self):
         """Retrieve recipes for authenticated user."""
@@ -52,10 +97,11 @@ class BaseRecipeAttViewSet(mixins.ListModelMixin,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(recipe_count__gt=0)
 
-        return queryset.filter(
-            user=self.request.user).order_by('-id').distinct()
+        return queryset.filter(user=self.request.user).order_by(
+            *ordering(self.request, self.ordering_fields)
+        )
 
 
 @extend_schema_view(
@@ -71,6 +117,29 @@ class BaseRecipeAttViewSet(mixins.ListModelMixin,
                 OpenApiTypes.STR,
                 description="Comma separated list of IDs to filter"
             ),
+            OpenApiParameter(
+                'min_price', OpenApiTypes.DECIMAL,
+                description="Only recipes costing at least this much"
+            ),
+            OpenApiParameter(
+                'max_price', OpenApiTypes.DECIMAL,
+                description="Only recipes costing at most this much"
+            ),
+            OpenApiParameter(
+                'min_time', OpenApiTypes.INT,
+                description="Only recipes taking at least this many minutes"
+            ),
+            OpenApiParameter(
+                'max_time', OpenApiTypes.INT,
+                description="Only recipes taking at most this many minutes"
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR,
+                enum=['title', '-title', 'price', '-price',
+                      'time_minutes', '-time_minutes'],
+                description="Sort order, newest first by default"
+            ),
         ]
     )
 )
@@ -80,6 +149,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    # Actions that read nested tags and ingredients of the queried rows.
+    # Updates are left out since UpdateModelMixin drops the prefetch cache.
+    nested_actions = ['list', 'retrieve']
+    link_actions = [
+        'add_ingredients', 'remove_ingredients', 'add_tags', 'remove_tags',
+    ]
+    # Fields the list can be ordered by. The id tie-break makes each a
+    # total order, matching a (user, field, id) index on Recipe, so it
+    # is read from an index scan and can be paged with a keyset cursor.
+    ordering_fields = ['title', 'price', 'time_minutes']
 
     def _params_to_ints(self, qs):
         return [int(str_id) for str_id in qs.split(',')]
@@ -90,16 +169,39 @@ class RecipeViewSet(viewsets.ModelViewSet):
         ingredients = self.request.query_params.get('ingredients')
         queryset = self.queryset
 
+        # EXISTS rather than joins, so no DISTINCT is needed and the sort
+        # can be read from an index.
         if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = queryset.filter(Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe_id=OuterRef('pk'),
+                    tag_id__in=self._ids_param('tags'),
+                )
+            ))
 
         if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = queryset.filter(Exists(
+                Recipe.ingredients.through.objects.filter(
+                    recipe_id=OuterRef('pk'),
+                    ingredient_id__in=self._ids_param('ingredients'),
+                )
+            ))
 
-        return queryset.filter(user=self.request.user
-                               ).order_by('-id').distinct()
+        ranges = {
+            'price__gte': self._decimal_param('min_price'),
+            'price__lte': self._decimal_param('max_price'),
+            'time_minutes__gte': self._int_param('min_time', None),
+            'time_minutes__lte': self._int_param('max_time', None),
+        }
+        queryset = queryset.filter(
+            user=self.request.user,
+            **{lookup: value for lookup, value in ranges.items()
+               if value is not None},
+        ).order_by(*ordering(self.request, self.ordering_fields))
+        if self.action in self.nested_actions:
+            queryset = queryset.prefetch_related('tags', 'ingredients')
+
+        return queryset
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
@@ -107,6 +209,20 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'bulk_delete':
+            return serializers.RecipeBulkDeleteSerializer
+        elif self.action == 'clone':
+            return serializers.RecipeCloneSerializer
+        elif self.action == 'bulk_clone':
+            return serializers.RecipeBulkCloneSerializer
+        elif self.action == 'cookable':
+            return serializers.CookableRecipeSerializer
+        elif self.action == 'similar':
+            return serializers.SimilarRecipeSerializer
+        elif self.action == 'shopping_list':
+            return serializers.ShoppingListRequestSerializer
+        elif self.action in self.link_actions:
+            return serializers.RecipeLinksSerializer
 
         return self.serializer_class
 
@@ -122,28 +238,384 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            jobs.enqueue(tasks.prerender_renditions, {
+                'name': recipe.image.name,
+            })
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _cloned_response(self, copies, many):
+        queryset = Recipe.objects.filter(
+            id__in=[copy.id for copy in copies]
+        ).order_by('id').prefetch_related('tags', 'ingredients')
+        if many:
+            serializer = serializers.RecipeSerializer(
+                queryset, many=True, context=self.get_serializer_context(),
+            )
+        else:
+            serializer = serializers.RecipleDetailSerializer(
+                queryset.get(), context=self.get_serializer_context(),
+            )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        operation_id='recipe_recipes_clone',
+        responses={201: serializers.RecipleDetailSerializer},
+    )
+    @action(methods=['POST'], detail=True, url_path='clone')
+    def clone(self, request, pk=None):
+        """Copy a recipe with its tags and ingredients."""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        copies = cloning.clone_recipes([recipe], **serializer.validated_data)
+        return self._cloned_response(copies, many=False)
+
+    @extend_schema(
+        operation_id='recipe_recipes_bulk_clone',
+        responses={201: serializers.RecipeSerializer(many=True)},
+    )
+    @action(methods=['POST'], detail=False, url_path='clone',
+            url_name='bulk-clone')
+    def bulk_clone(self, request):
+        """Copy several recipes at once."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        recipes = {
+            recipe.id: recipe
+            for recipe in Recipe.objects.filter(user=request.user, id__in=ids)
+        }
+        missing = [recipe_id for recipe_id in ids if recipe_id not in recipes]
+        if missing:
+            raise ValidationError({'ids': f'Recipes not found: {missing}.'})
+        copies = cloning.clone_recipes(
+            recipes[recipe_id] for recipe_id in ids
+        )
+        return self._cloned_response(copies, many=True)
+
+    def _ids_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return []
+        try:
+            return self._params_to_ints(value)
+        except ValueError:
+            raise ValidationError({name: 'Must be IDs.'})
+
+    def _decimal_param(self, name):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            number = None
+        if number is None or not number.is_finite():
+            raise ValidationError({name: 'Must be a number.'})
+        return number
+
+    def _int_param(self, name, default, maximum=None):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            value = -1
+        if value < 0:
+            raise ValidationError({name: 'Must be a whole number.'})
+        return min(value, maximum) if maximum is not None else value
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'ingredients',
+                OpenApiTypes.STR,
+                description="Comma separated list of ingredient IDs in "
+                            "the pantry"
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description="Number of recipes to return, at most 100."
+            ),
+            OpenApiParameter(
+                'max_missing',
+                OpenApiTypes.INT,
+                description="Skip recipes missing more ingredients."
+            ),
+        ]
+    )
+    @action(methods=['GET'], detail=False, url_path='cookable')
+    def cookable(self, request):
+        """Rank recipes by how much of them the pantry covers."""
+        ingredient_ids = self._ids_param('ingredients')
+        limit = self._int_param('limit', 20, maximum=100)
+        max_missing = self._int_param('max_missing', None)
+
+        matches = pantry.get_index(request.user).match(
+            ingredient_ids, limit=limit, max_missing=max_missing,
+        )
+        recipes = Recipe.objects.filter(
+            user=request.user
+        ).prefetch_related('tags', 'ingredients').in_bulk(
+            [recipe_id for recipe_id, missing, total in matches]
+        )
+        results = []
+        for recipe_id, missing, total in matches:
+            # Deleted by another process since the index was built.
+            if recipe_id in recipes:
+                recipes[recipe_id].missing_count = missing
+                results.append(recipes[recipe_id])
+        serializer = self.get_serializer(results, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description="Number of recipes to return, at most "
+                            "SIMILAR_RECIPES['TOP_K']."
+            ),
+        ]
+    )
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """List the recipes sharing the most tags and ingredients."""
+        recipe = self.get_object()
+        limit = self._int_param(
+            'limit', 10, maximum=settings.SIMILAR_RECIPES['TOP_K'],
+        )
+        # Neighbours are precomputed by core.similarity, so this is one
+        # read of the (recipe, rank) index.
+        recipes = Recipe.objects.filter(
+            neighbour_of__recipe=recipe,
+        ).annotate(
+            score=F('neighbour_of__score'),
+        ).order_by('neighbour_of__rank').prefetch_related(
+            'tags', 'ingredients',
+        )[:limit]
+        serializer = self.get_serializer(recipes, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'tags',
+                OpenApiTypes.STR,
+                description="Comma separated list of IDs to filter"
+            ),
+            OpenApiParameter(
+                'ingredients',
+                OpenApiTypes.STR,
+                description="Comma separated list of IDs to filter"
+            ),
+        ],
+        responses={200: serializers.FacetsSerializer},
+    )
+    @action(methods=['GET'], detail=False)
+    def facets(self, request):
+        """Count the filtered recipes using each tag and ingredient."""
+        result = facets.facets(
+            request.user,
+            tag_ids=self._ids_param('tags'),
+            ingredient_ids=self._ids_param('ingredients'),
+        )
+        return Response(serializers.FacetsSerializer(result).data)
+
+    @extend_schema(responses={200: serializers.ShoppingListSerializer})
+    @action(methods=['POST'], detail=False, url_path='shopping-list')
+    def shopping_list(self, request):
+        """Aggregate the ingredients and totals of several recipes."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data['ids'])
+        result = shopping.shopping_list(request.user, ids)
+        if result['recipe_count'] != len(ids):
+            raise ValidationError({'ids': 'Some recipes were not found.'})
+        return Response(serializers.ShoppingListSerializer(result).data)
+
+    @extend_schema(responses={202: JobSerializer})
+    @action(methods=['POST'], detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Delete many recipes in the background."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = jobs.enqueue(tasks.delete_recipes, {
+            'user_id': request.user.id,
+            'ids': serializer.validated_data.get('ids'),
+        }, owner=request.user)
+        return Response(
+            JobSerializer(job, context={'request': request}).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'w',
+                OpenApiTypes.INT,
+                enum=settings.RENDITIONS['WIDTHS'],
+                description="Maximum width of a resized rendition."
+            ),
+            OpenApiParameter(
+                'fmt',
+                OpenApiTypes.STR,
+                enum=settings.RENDITIONS['FORMATS'],
+                description="Format of the rendition, defaults to the "
+                            "original format."
+            ),
+        ],
+        responses={(200, 'image/*'): OpenApiTypes.BINARY},
+    )
+    @action(methods=['GET'], detail=True, url_path='image')
+    def image(self, request, pk=None):
+        """Serve the recipe image, optionally resized, to its owner."""
+        width, fmt = self._rendition_params()
+        recipe = self.get_object()
+        if not recipe.image:
+            raise Http404
+        name = recipe.image.name
+        # Only a URL naming the current image may be cached for good.
+        immutable = request.query_params.get('v') == media_version(name)
+        if width is None and fmt is None:
+            try:
+                return serve_media(name, immutable=immutable)
+            except FileNotFoundError:
+                raise Http404
+        fmt = fmt or renditions.source_format(name)
+        try:
+            rendition = renditions.get_rendition(name, width or 0, fmt)
+        except FileNotFoundError:
+            raise Http404
+        return serve_media(
+            rendition, content_type=f'image/{fmt}', immutable=immutable,
+        )
+
+    def _rendition_params(self):
+        """Validate w and fmt against the configured allowlists."""
+        config = settings.RENDITIONS
+        width = self.request.query_params.get('w')
+        fmt = self.request.query_params.get('fmt')
+        errors = {}
+        if width is not None:
+            try:
+                width = int(width)
+            except ValueError:
+                width = None
+            if width not in config['WIDTHS']:
+                errors['w'] = f'Must be one of {config["WIDTHS"]}.'
+        if fmt is not None and fmt not in config['FORMATS']:
+            errors['fmt'] = f'Must be one of {config["FORMATS"]}.'
+        if errors:
+            raise ValidationError(errors)
+        return width, fmt
+
     @action(methods=['PATCH'], detail=True,
             url_path=r'remove-ingredient/(?P<ingredient_id>\d+)')
     def remove_ingredient(self, request, pk=None, ingredient_id=None):
         """Remove an ingredient from a recipe."""
         recipe = self.get_object()
-        ingredient = get_object_or_404(Ingredient, id=ingredient_id)
+        ingredient = get_object_or_404(
+            Ingredient, id=ingredient_id, user=request.user
+        )
         recipe.ingredients.remove(ingredient)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(methods=['PATCH'], detail=True,
             url_path=r'add-ingredient/(?P<ingredient_id>\d+)')
     def add_ingredient(self, request, pk=None, ingredient_id=None):
-        """Remove an ingredient from a recipe."""
+        """Add an ingredient to a recipe."""
         recipe = self.get_object()
-        ingredient = get_object_or_404(Ingredient, id=ingredient_id)
+        ingredient = get_object_or_404(
+            Ingredient, id=ingredient_id, user=request.user
+        )
         recipe.ingredients.add(ingredient)
         return Response(status=status.HTTP_200_OK)
 
+    def _owned_ids(self, model):
+        """Return the ids in the request, all owned by the user."""
+        serializer = self.get_serializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data['ids'])
+        owned = set(
+            model.objects.filter(user=self.request.user, id__in=ids)
+            .values_list('id', flat=True)
+        )
+        missing = sorted(ids - owned)
+        if missing:
+            raise ValidationError({'ids': f'Not found: {missing}.'})
+        return ids
+
+    def _add_links(self, field, model):
+        """Link the requested rows to the recipe in one insert."""
+        recipe = self.get_object()
+        ids = self._owned_ids(model)
+        through = getattr(Recipe, field).through
+        column = f'{model._meta.model_name}_id'
+        with transaction.atomic():
+            ids -= set(through.objects.filter(
+                recipe_id=recipe.id, **{f'{column}__in': ids}
+            ).values_list(column, flat=True))
+            through.objects.bulk_create(
+                [through(recipe_id=recipe.id, **{column: id}) for id in ids],
+                ignore_conflicts=True,
+            )
+            counters.adjust(model, {id: 1 for id in ids})
+            self._record_links(recipe, model, True, ids)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def _remove_links(self, field, model):
+        """Unlink the requested rows from the recipe in one delete."""
+        recipe = self.get_object()
+        ids = self._owned_ids(model)
+        through = getattr(Recipe, field).through
+        column = f'{model._meta.model_name}_id'
+        links = through.objects.filter(
+            recipe_id=recipe.id, **{f'{column}__in': ids}
+        )
+        with transaction.atomic():
+            ids = set(links.values_list(column, flat=True))
+            links.delete()
+            counters.adjust(model, {id: -1 for id in ids})
+            self._record_links(recipe, model, False, ids)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def _record_links(self, recipe, model, linked, ids):
+        """Record through table writes, which send no m2m signals."""
+        if model is Tag:
+            op = changes.TAG_LINK if linked else changes.TAG_UNLINK
+        else:
+            op = changes.LINK if linked else changes.UNLINK
+        changes.record(recipe.user_id, [(op, recipe.id, id) for id in ids])
+
+    @extend_schema(responses={204: None})
+    @action(methods=['PATCH'], detail=True, url_path='add-ingredients')
+    def add_ingredients(self, request, pk=None):
+        """Add the ingredients in ids to a recipe."""
+        return self._add_links('ingredients', Ingredient)
+
+    @extend_schema(responses={204: None})
+    @action(methods=['PATCH'], detail=True, url_path='remove-ingredients')
+    def remove_ingredients(self, request, pk=None):
+        """Remove the ingredients in ids from a recipe."""
+        return self._remove_links('ingredients', Ingredient)
+
+    @extend_schema(responses={204: None})
+    @action(methods=['PATCH'], detail=True, url_path='add-tags')
+    def add_tags(self, request, pk=None):
+        """Add the tags in ids to a recipe."""
+        return self._add_links('tags', Tag)
+
+    @extend_schema(responses={204: None})
+    @action(methods=['PATCH'], detail=True, url_path='remove-tags')
+    def remove_tags(self, request, pk=None):
+        """Remove the tags in ids from a recipe."""
+        return self._remove_links('tags', Tag)
+
 
 class TagViewSet(BaseRecipeAttViewSet):
     """Manage tags in the database."""
@@ -0,0 +1,53 @@
+"""
+Authentication for signed job links.
+"""
+from django.contrib.auth.models import AnonymousUser
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+)
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import BasePermission
+
+from core import jobs
+
+
+class JobTokenAuthentication(BaseAuthentication):
+    """
+    Accept ?token= from jobs.sign() in place of a user login.
+
+    request.auth is the id of the one job the token covers. The token
+    outlives the user's own login, so a deleted account's job can still
+    be followed to the end.
+    """
+
+    def authenticate(self, request):
+        token = request.query_params.get('token')
+        if token is None:
+            return None
+        job_id = jobs.unsign(token)
+        if job_id is None:
+            raise AuthenticationFailed('Invalid or expired job token.')
+        return AnonymousUser(), job_id
+
+    def authenticate_header(self, request):
+        # Listed first on its view, so this answers for logins too.
+        return TokenAuthentication.keyword
+
+
+class JobTokenScheme(OpenApiAuthenticationExtension):
+    target_class = JobTokenAuthentication
+    name = 'jobToken'
+
+    def get_security_definition(self, auto_schema):
+        return {'type': 'apiKey', 'in': 'query', 'name': 'token'}
+
+
+class HasJobToken(BasePermission):
+    """Allow requests authenticated by JobTokenAuthentication."""
+
+    def has_permission(self, request, view):
+        return isinstance(
+            request.successful_authenticator, JobTokenAuthentication
+        )
@@ -6,8 +6,12 @@ from django.contrib.auth import (
     authenticate
     )
 from django.utils.translation import gettext as _
+from django.urls import reverse
 from rest_framework import serializers
 
+from core import jobs
+from core.models import Job
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object."""
@@ -56,3 +60,25 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for background job status."""
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'url', 'task', 'status', 'progress', 'attempts',
+            'created_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+    def get_url(self, job) -> str:
+        url = reverse('user:job', args=[job.id])
+        if self.context.get('signed'):
+            url = f'{url}?token={jobs.sign(job)}'
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
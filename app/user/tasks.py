@@ -0,0 +1,19 @@
+"""
+Background tasks for users.
+"""
+from django.contrib.auth import get_user_model
+
+from core import deletion, jobs
+from core.jobs import task
+
+
+@task('user.delete_account')
+def delete_account(job, user_id):
+    """Delete a deactivated user and their data in batches."""
+    user = get_user_model().objects.filter(id=user_id).first()
+    if user is None:
+        return {'deleted': False}
+    progress = deletion.delete_user(
+        user, on_progress=lambda progress: jobs.report(job, **progress),
+    )
+    return {'deleted': True, **progress}
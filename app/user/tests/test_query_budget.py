@@ -0,0 +1,77 @@
+"""
+Query budget tests for the user API.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.tests.query_budget import (
+    QueryBudgetMixin,
+    seed_recipes,
+)
+
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+ME_URL = reverse('user:me')
+
+
+class UserQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test query budgets for user endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+
+    def _seed(self, size):
+        seed_recipes(self.user, size)
+        existing = get_user_model().objects.count()
+        get_user_model().objects.bulk_create([
+            get_user_model()(email=f'seed{existing + i}@example.com')
+            for i in range(size)
+        ])
+        return size
+
+    def test_create_user(self):
+        self.assertQueryBudget(
+            2, self._seed,
+            lambda size: self.client.post(CREATE_USER_URL, {
+                'email': f'new{size}@example.com',
+                'password': 'testpass123',
+                'name': 'New',
+            }),
+            status.HTTP_201_CREATED,
+        )
+
+    def test_create_token(self):
+        self.assertQueryBudget(
+            5, self._seed,
+            lambda _: self.client.post(TOKEN_URL, {
+                'email': 'user@example.com',
+                'password': 'testpass123',
+            }),
+            status.HTTP_200_OK,
+        )
+
+    def test_retrieve_me(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(
+            0, self._seed,
+            lambda _: self.client.get(ME_URL),
+            status.HTTP_200_OK,
+        )
+
+    def test_update_me(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(
+            2, self._seed,
+            lambda _: self.client.patch(ME_URL, {'name': 'Updated'}),
+            status.HTTP_200_OK,
+        )
@@ -5,9 +5,13 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core import jobs
+from core.models import Job, Tag
+
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse("user:token")
 ME_URL = reverse("user:me")
@@ -168,3 +172,74 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_delete_user_in_background(self):
+        """Test deleting the account deactivates it and queues a job."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        job = Job.objects.get(id=res.data['id'])
+        self.assertEqual(job.task, 'user.delete_account')
+
+        jobs.run(jobs.claim('worker')[0])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.progress['tags'], {'deleted': 1, 'total': 1})
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+
+    def test_poll_deletion_job_after_delete(self):
+        """Test the deleted user can follow their job with the signed link."""
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        url = client.delete(ME_URL).data['url']
+        res = client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], Job.QUEUED)
+
+        jobs.run(jobs.claim('worker')[0])
+        res = APIClient().get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], Job.DONE)
+
+    def test_job_token_limited_to_its_job(self):
+        """Test a signed job link grants access to that job only."""
+        job = jobs.enqueue('recipe.delete_recipes', owner=self.user)
+        other_job = jobs.enqueue('recipe.delete_recipes', owner=self.user)
+        client = APIClient()
+
+        res = client.get(
+            reverse('user:job', args=[other_job.id]),
+            {'token': jobs.sign(job)},
+        )
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        res = client.get(
+            reverse('user:job', args=[job.id]), {'token': 'forged'},
+        )
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = client.get(reverse('user:job', args=[job.id]))
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_job_status_for_owner_only(self):
+        """Test job progress is visible to the user who started it."""
+        job = jobs.enqueue('recipe.delete_recipes', owner=self.user)
+        other = create_user(email='other@example.com', password='pass1234')
+        other_job = jobs.enqueue('recipe.delete_recipes', owner=other)
+
+        res = self.client.get(reverse('user:job', args=[job.id]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], Job.QUEUED)
+
+        res = self.client.get(reverse('user:job', args=[other_job.id]))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,12 +1,21 @@
 """
 Views for the user API
 """
-from rest_framework import generics, authentication, permissions
+from django.db import transaction
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, authentication, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+
+from core import jobs
+from core.models import Job
+from user import tasks
+from user.authentication import HasJobToken, JobTokenAuthentication
 from user.serializers import (
     UserSerializer,
-    AuthTokenSerializer
+    AuthTokenSerializer,
+    JobSerializer,
 )
 
 
@@ -21,7 +30,7 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
     authentication_classes = [authentication.TokenAuthentication]
@@ -30,3 +39,37 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         """Retrieve and return the authenticated user."""
         return self.request.user
+
+    @extend_schema(responses={202: JobSerializer})
+    def delete(self, request, *args, **kwargs):
+        """Deactivate the user and delete their data in the background."""
+        user = self.get_object()
+        with transaction.atomic():
+            user.is_active = False
+            user.save(update_fields=['is_active'])
+            job = jobs.enqueue(
+                tasks.delete_account, {'user_id': user.id}, owner=user,
+            )
+        # The user can no longer log in, so the link carries its own token.
+        return Response(
+            JobSerializer(
+                job, context={'request': request, 'signed': True},
+            ).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class JobView(generics.RetrieveAPIView):
+    """Report progress of a background job started by the user."""
+    serializer_class = JobSerializer
+    authentication_classes = [
+        JobTokenAuthentication, authentication.TokenAuthentication,
+    ]
+    permission_classes = [permissions.IsAuthenticated | HasJobToken]
+
+    def get_queryset(self):
+        if isinstance(
+            self.request.successful_authenticator, JobTokenAuthentication
+        ):
+            return Job.objects.filter(id=self.request.auth)
+        return self.request.user.jobs.all()
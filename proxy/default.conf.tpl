@@ -1,10 +1,39 @@
 server {
     listen ${LISTEN_PORT};
 
+    # Compress upstream JSON. Level 5 gets nearly all of level 9's ratio
+    # on recipe lists for a fraction of the CPU, and bodies under 1KB
+    # are not worth the extra round of framing.
+    gzip                on;
+    gzip_proxied        any;
+    gzip_comp_level     5;
+    gzip_min_length     1024;
+    gzip_vary           on;
+    gzip_types          application/json
+                        application/vnd.oai.openapi
+                        application/vnd.oai.openapi+json;
+
+    # Media is only reachable through X-Accel-Redirect from Django, which
+    # checks ownership first. Cache headers come from the app response.
+    location /static/media {
+        return 404;
+    }
+
+    location /protected/media/ {
+        internal;
+        alias /vol/static/media/;
+    }
+
     location /static {
         alias /vol/static;
     }
 
+    location ~ ^/(healthz|readyz)$ {
+        access_log off;
+        uwsgi_pass              ${APP_HOST}:${APP_PORT};
+        include                 /etc/nginx/uwsgi_params;
+    }
+
     location / {
         access_log /var/log/nginx/access.log;
         error_log /var/log/nginx/error.log debug;
@@ -0,0 +1,72 @@
+"""
+Report the slowest imports when loading the WSGI application.
+
+Runs ``python -X importtime -c "import <module>"`` and lists the imports
+with the largest cumulative and self times. Run it from the app directory:
+
+    python /scripts/importtime.py --top 20
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+
+def profile(module):
+    """Return (self_us, cumulative_us, name, depth) for every import."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), name.strip(), depth))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--module', default='app.wsgi')
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    rows = profile(args.module)
+    total = max(row[1] for row in rows)
+    by_cumulative = sorted(rows, key=lambda r: r[1], reverse=True)
+    by_self = sorted(rows, key=lambda r: r[0], reverse=True)
+
+    if args.json:
+        json.dump({
+            'module': args.module,
+            'total_ms': total / 1000,
+            'cumulative': [
+                {'name': r[2], 'ms': r[1] / 1000}
+                for r in by_cumulative[:args.top]
+            ],
+            'self': [
+                {'name': r[2], 'ms': r[0] / 1000}
+                for r in by_self[:args.top]
+            ],
+        }, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+        return
+
+    print(f'Importing {args.module} took {total / 1000:.1f}ms\n')
+    print(f'{"cumulative ms":>14}  {"self ms":>8}  module')
+    for self_us, cumulative_us, name, depth in by_cumulative[:args.top]:
+        print(f'{cumulative_us / 1000:14.1f}  {self_us / 1000:8.1f}  '
+              f'{"  " * depth}{name}')
+    print(f'\n{"self ms":>14}  module')
+    for self_us, _, name, _ in by_self[:args.top]:
+        print(f'{self_us / 1000:14.1f}  {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+#!/bin/sh
+
+# One-shot release phase, run once per deploy before serving.
+set -e
+python manage.py wait_for_db
+python manage.py collectstatic --noinput
+python manage.py migrate --noinput
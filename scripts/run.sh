@@ -1,11 +1,97 @@
 #!/bin/sh
 
 set -e
-echo "Printing all environment variables:"
-env
-echo 'ALLOWED_HOSTS:' $ALLOWED_HOSTS
-python manage.py wait_for_db
-python manage.py collectstatic --noinput
-python manage.py migrate
-
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi --buffer-size=32768
\ No newline at end of file
+
+# Serve phase only. collectstatic and migrate run once per deploy from
+# release.sh; set RUN_RELEASE=1 to run them here instead.
+if [ "${RUN_RELEASE:-0}" = "1" ]; then
+    release.sh
+fi
+
+# Size uWSGI from the container's CPU and memory limits unless set.
+cpu_count() {
+    if [ -r /sys/fs/cgroup/cpu.max ]; then
+        read -r quota period < /sys/fs/cgroup/cpu.max
+    elif [ -r /sys/fs/cgroup/cpu/cpu.cfs_quota_us ]; then
+        quota=$(cat /sys/fs/cgroup/cpu/cpu.cfs_quota_us)
+        period=$(cat /sys/fs/cgroup/cpu/cpu.cfs_period_us)
+    fi
+    if [ -n "$quota" ] && [ "$quota" != "max" ] && [ "$quota" -gt 0 ]; then
+        echo $(( (quota + period - 1) / period ))
+    else
+        nproc
+    fi
+}
+
+memory_limit_mb() {
+    limit=""
+    if [ -r /sys/fs/cgroup/memory.max ]; then
+        limit=$(cat /sys/fs/cgroup/memory.max)
+    elif [ -r /sys/fs/cgroup/memory/memory.limit_in_bytes ]; then
+        limit=$(cat /sys/fs/cgroup/memory/memory.limit_in_bytes)
+    fi
+    # cgroup v1 reports "no limit" as a huge number.
+    if [ -z "$limit" ] || [ "$limit" = "max" ] || \
+        [ ${#limit} -gt 15 ]; then
+        limit=$(awk '/MemTotal/ { print $2 * 1024 }' /proc/meminfo)
+    fi
+    echo $(( limit / 1024 / 1024 ))
+}
+
+CPUS=$(cpu_count)
+MEMORY_MB=$(memory_limit_mb)
+UWSGI_WORKER_MEMORY_MB=${UWSGI_WORKER_MEMORY_MB:-150}
+UWSGI_RELOAD_ON_RSS=${UWSGI_RELOAD_ON_RSS:-256}
+UWSGI_MAX_REQUESTS=${UWSGI_MAX_REQUESTS:-5000}
+UWSGI_THREADS=${UWSGI_THREADS:-2}
+
+if [ -z "$UWSGI_WORKERS" ]; then
+    UWSGI_WORKERS=$(( CPUS * 2 + 1 ))
+    # Leave a quarter of memory for the master and page cache.
+    MEMORY_WORKERS=$(( MEMORY_MB * 3 / 4 / UWSGI_WORKER_MEMORY_MB ))
+    if [ "$MEMORY_WORKERS" -lt "$UWSGI_WORKERS" ]; then
+        UWSGI_WORKERS=$MEMORY_WORKERS
+    fi
+    if [ "$UWSGI_WORKERS" -lt 1 ]; then
+        UWSGI_WORKERS=1
+    fi
+fi
+
+if [ -z "$UWSGI_LISTEN" ]; then
+    UWSGI_LISTEN=$(( UWSGI_WORKERS * UWSGI_THREADS * 32 ))
+    SOMAXCONN=$(cat /proc/sys/net/core/somaxconn 2>/dev/null || echo 128)
+    if [ "$UWSGI_LISTEN" -gt "$SOMAXCONN" ]; then
+        UWSGI_LISTEN=$SOMAXCONN
+    fi
+    if [ "$UWSGI_LISTEN" -lt 100 ]; then
+        UWSGI_LISTEN=100
+    fi
+fi
+
+# Cheaper mode keeps a quarter of the workers warm when idle.
+CHEAPER_ARGS=""
+if [ "${UWSGI_CHEAPER:-1}" = "1" ] && [ "$UWSGI_WORKERS" -gt 2 ]; then
+    CHEAPER=$(( UWSGI_WORKERS / 4 ))
+    [ "$CHEAPER" -lt 1 ] && CHEAPER=1
+    CHEAPER_ARGS="--cheaper-algo spare --cheaper $CHEAPER \
+        --cheaper-initial $CHEAPER --cheaper-step 1"
+fi
+
+echo "uWSGI: $UWSGI_WORKERS workers x $UWSGI_THREADS threads," \
+    "listen $UWSGI_LISTEN ($CPUS CPUs, ${MEMORY_MB}MB)"
+
+# Without --lazy-apps the app (and every view, see app/wsgi.py) is
+# loaded once in the master and shared copy-on-write with workers.
+exec uwsgi --socket :9000 \
+    --master \
+    --module app.wsgi \
+    --workers "$UWSGI_WORKERS" \
+    --threads "$UWSGI_THREADS" \
+    --listen "$UWSGI_LISTEN" \
+    --max-requests "$UWSGI_MAX_REQUESTS" \
+    --reload-on-rss "$UWSGI_RELOAD_ON_RSS" \
+    --single-interpreter \
+    --die-on-term \
+    --vacuum \
+    --buffer-size=32768 \
+    $CHEAPER_ARGS